@@ -1,13 +1,7 @@
 import streamlit as st
-import folium
-from folium import Polygon, PolyLine
-from streamlit_folium import st_folium
-import shapely.geometry as geom
-import pandas as pd
-import plotly.express as px
-import numpy as np
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+
+from catenella.geometria import dms_to_decimal, punto_en_area
 
 # Configuración de página
 st.set_page_config(
@@ -37,58 +31,16 @@ st.markdown("""
 st.markdown("<h1 class='title'>🌊 Programa de Vigilancia Alexandrium catenella</h1>", unsafe_allow_html=True)
 st.markdown("Sistema de monitoreo de áreas restringidas para control de Marea Roja")
 
-# Definir los puntos de restricción (coordenadas)
-coords = [
-    (-73.114044, -43.435339),
-    (-73.042636, -43.568214),
-    (-73.043861, -43.642142),
-    (-73.058528, -43.734786),
-    (-73.198778, -43.734714),
-    (-73.513663, -43.664611),
-    (-73.428572, -43.440469),
-    (-73.114044, -43.435339)  # Cierra el polígono
-]
-
-# Crear polígono con shapely para intersecciones
-polygon = geom.Polygon(coords)
-
-# Función para convertir DMS a decimal
-def dms_to_decimal(degrees, minutes, seconds, direction):
-    decimal = degrees + minutes / 60 + seconds / 3600
-    if direction in ["S", "W"]:
-        decimal = -decimal
-    return decimal
-
-# Calcular línea de "cierre compuertas"
-cierre_compuertas_lat = dms_to_decimal(43, 34, 53, "S")
-
 # Crear datos simulados para dashboard
-def generar_datos_simulados():
-    # Generar 30 días de datos
-    fechas = [datetime.now() - timedelta(days=i) for i in range(30)]
-    fechas = sorted(fechas)
-    
-    # Estaciones de monitoreo simuladas
-    estaciones = ["Estación A", "Estación B", "Estación C", "Estación D"]
-    
-    datos = []
-    for fecha in fechas:
-        for estacion in estaciones:
-            # Simulamos distintos niveles de concentración
-            nivel = random.randint(0, 200)
-            riesgo = "Alto" if nivel > 100 else "Medio" if nivel > 50 else "Bajo"
-            
-            datos.append({
-                "fecha": fecha,
-                "estacion": estacion,
-                "concentracion": nivel,
-                "nivel_riesgo": riesgo
-            })
-    
-    return pd.DataFrame(datos)
-
-# Generar datos simulados
-df_monitoreo = generar_datos_simulados()
+# Se cachea por día: los datos no cambian entre reruns del mismo día. Con
+# cache_resource todas las sesiones reciben el mismo DataFrame (cache_data
+# entregaría una copia por llamada); es de solo lectura, no modificarlo.
+@st.cache_resource
+def generar_datos_simulados(hoy):
+    # Generar 30 días de datos para 4 estaciones de monitoreo simuladas
+    # (vectorizado con NumPy y con semilla fija, ver catenella/sintetico.py)
+    from catenella.sintetico import generar_monitoreo
+    return generar_monitoreo(dias=30, hasta=hoy)
 
 # Inicializar variables para guardar coordenadas
 if 'last_lat' not in st.session_state:
@@ -109,8 +61,7 @@ with col1:
         submit = st.form_submit_button("Verificar Coordenada")
 
     if submit:
-        point = geom.Point(lng, lat)
-        if polygon.contains(point):
+        if punto_en_area(lng, lat):
             st.error("⚠️ ¡Alerta! La coordenada está dentro del área restringida.")
         else:
             st.success("✅ La coordenada está fuera del área restringida.")
@@ -138,26 +89,27 @@ with col1:
 with col2:
     st.markdown("<h3 class='subtitle'>🗺️ Mapa de Monitoreo</h3>", unsafe_allow_html=True)
     
-    # Crear mapa
-    m = folium.Map(location=[-43.5, -73.1], zoom_start=8)
-    folium.Polygon(locations=coords, color='blue', fill=True, fill_opacity=0.2).add_to(m)
-    
-    # Añadir marcador si hay coordenadas
+    # folium y streamlit_folium se cargan recién al dibujar el mapa
+    from catenella.mapa import capa_marcador, mostrar_mapa
+    from catenella.zonas import cargar_registro
+
+    # Mapa base compartido (solo las zonas) y capa con el marcador, si hay coordenadas
     if st.session_state.marker_status:
-        folium.Marker(
-            location=[st.session_state.last_lat, st.session_state.last_lng],
-            popup="Ubicación Ingresada",
-            icon=folium.Icon(color='red')
-        ).add_to(m)
+        capa = capa_marcador(st.session_state.last_lat, st.session_state.last_lng)
+    else:
+        capa = capa_marcador()
     
     # Mostrar mapa en Streamlit
-    st_folium(m, width=700, height=500)
+    mostrar_mapa(cargar_registro(), capa, width=700, height=500, cierre=False)
 
     st.markdown("<h3 class='subtitle'>📊 Gráfico de Concentraciones</h3>", unsafe_allow_html=True)
     
-    # Gráfico de concentraciones
-    fig = px.line(df_monitoreo, x='fecha', y='concentracion', color='estacion', title='Concentración de Alexandrium catenella')
-    st.plotly_chart(fig)
+    # Generar datos simulados (solo al llegar a esta sección)
+    df_monitoreo = generar_datos_simulados(datetime.now().date())
+
+    # Gráfico de concentraciones (plotly se importa al construirlo)
+    from catenella.graficos import grafico_concentraciones
+    st.plotly_chart(grafico_concentraciones(df_monitoreo))
 
 # Finalizar la aplicación
 if __name__ == "__main__":
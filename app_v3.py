@@ -1,13 +1,7 @@
 import streamlit as st
-import folium
-from folium import Polygon, PolyLine, Marker, Icon
-from streamlit_folium import st_folium
-import shapely.geometry as geom
-import pandas as pd
-import plotly.express as px
-import numpy as np
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+
+from catenella.geometria import gm_to_decimal, punto_en_area
 
 # Configuración de página
 st.set_page_config(
@@ -37,58 +31,38 @@ st.markdown("""
 st.markdown("<h1 class='title'>🌊 Programa de Vigilancia Alexandrium catenella</h1>", unsafe_allow_html=True)
 st.markdown("Sistema de monitoreo de áreas restringidas para control de Marea Roja")
 
-# Definir los puntos de restricción (coordenadas)
-coords = [
-    (-73.114044, -43.435339),
-    (-73.042636, -43.568214),
-    (-73.043861, -43.642142),
-    (-73.058528, -43.734786),
-    (-73.198778, -43.734714),
-    (-73.513663, -43.664611),
-    (-73.428572, -43.440469),
-    (-73.114044, -43.435339)  # Cierra el polígono
-]
-
-# Crear polígono con shapely para intersecciones
-polygon = geom.Polygon(coords)
-
-# Función para convertir grados y minutos decimales a decimal
-def gm_to_decimal(degrees, minutes, direction):
-    decimal = abs(degrees) + abs(minutes) / 60
-    if (direction in ["S", "W"]) or degrees < 0:
-        decimal = -decimal
-    return decimal
-
-# Calcular línea de "cierre compuertas"
-cierre_compuertas_lat = gm_to_decimal(43, 34.88, "S")
-
 # Crear datos simulados para dashboard
-def generar_datos_simulados():
-    # Generar 30 días de datos
-    fechas = [datetime.now() - timedelta(days=i) for i in range(30)]
-    fechas = sorted(fechas)
-    
-    # Estaciones de monitoreo simuladas
-    estaciones = ["Estación A", "Estación B", "Estación C", "Estación D"]
-    
-    datos = []
-    for fecha in fechas:
-        for estacion in estaciones:
-            # Simulamos distintos niveles de concentración
-            nivel = random.randint(0, 200)
-            riesgo = "Alto" if nivel > 100 else "Medio" if nivel > 50 else "Bajo"
-            
-            datos.append({
-                "fecha": fecha,
-                "estacion": estacion,
-                "concentracion": nivel,
-                "nivel_riesgo": riesgo
-            })
-    
-    return pd.DataFrame(datos)
-
-# Generar datos simulados
-df_monitoreo = generar_datos_simulados()
+# Se cachea por día: los datos no cambian entre reruns del mismo día. Con
+# cache_resource todas las sesiones reciben el mismo DataFrame (cache_data
+# entregaría una copia por llamada); es de solo lectura, no modificarlo.
+@st.cache_resource
+def generar_datos_simulados(hoy):
+    # Generar 30 días de datos para 4 estaciones de monitoreo simuladas
+    # (vectorizado con NumPy y con semilla fija, ver catenella/sintetico.py)
+    from catenella.sintetico import generar_monitoreo
+    return generar_monitoreo(dias=30, hasta=hoy)
+
+# Ancho del gráfico de concentraciones: cada serie se reduce a ~1 punto por píxel
+ANCHO_GRAFICO = 700
+
+
+# Acercar el gráfico al tramo seleccionado con la herramienta de caja: el rango
+# pasa al control de fechas y la serie se vuelve a leer con más detalle
+def acercar_grafico():
+    import pandas as pd
+
+    cajas = st.session_state.grafico_concentraciones.selection.box
+    if not cajas:
+        return
+    inicio, fin = st.session_state.concentracion_limites
+    x0, x1 = sorted(pd.Timestamp(x) for x in cajas[0]['x'])
+    desde, hasta = max(x0, pd.Timestamp(inicio)), min(x1, pd.Timestamp(fin))
+    if desde < hasta:
+        st.session_state.concentracion_rango = (desde.to_pydatetime(), hasta.to_pydatetime())
+
+
+def ver_todo():
+    st.session_state.concentracion_rango = st.session_state.concentracion_limites
 
 # Inicializar variables para el estado de la sesión
 if 'lat' not in st.session_state:
@@ -115,8 +89,7 @@ with col1:
     if submit:
         lat = gm_to_decimal(lat_deg, lat_min , "S")
         lng = gm_to_decimal(lng_deg, lng_min, "W")
-        point = geom.Point(lng, lat)
-        if polygon.contains(point):
+        if punto_en_area(lng, lat):
             st.error("⚠️ ¡Alerta! La coordenada está dentro del área restringida.")
         else:
             st.success("✅ La coordenada está fuera del área restringida.")
@@ -130,41 +103,51 @@ with col1:
 with col2:
     st.markdown("<h3 class='subtitle'>🗺️ Mapa de Monitoreo</h3>", unsafe_allow_html=True)
     
-    # Crear mapa
-    m = folium.Map(location=[-43.5, -73.1], zoom_start=8)
-    folium.Polygon(locations=coords, color='blue', fill=True, fill_opacity=0.2).add_to(m)
-    
-    # Añadir línea de cierre de compuertas
-    folium.Marker(
-        location=[cierre_compuertas_lat, -73.1],  # Longitud de ejemplo
-        popup="Cierre de Compuertas",
-        icon=folium.Icon(color='green')
-    ).add_to(m)
-
-    # Añadir línea punteada en la coordenada 43° 34.88' S
-    folium.PolyLine(
-        locations=[(cierre_compuertas_lat, -75.5), (cierre_compuertas_lat, -72.5)],
-        color='red',
-        weight=2,
-        dash_array='5, 5'  # Estilo de línea punteada
-    ).add_to(m)
-
-    # Añadir marcador si hay coordenadas
+    # folium y streamlit_folium se cargan recién al dibujar el mapa
+    from catenella.mapa import capa_marcador, mostrar_mapa
+    from catenella.zonas import cargar_registro
+
+    # Mapa base compartido (zonas, cierre de compuertas) y capa con el marcador
     if st.session_state.show_marker:
-        folium.Marker(
-            location=[st.session_state.lat, st.session_state.lng],
-            popup="Ubicación Ingresada",
-            icon=folium.Icon(color='red')
-        ).add_to(m)
+        capa = capa_marcador(st.session_state.lat, st.session_state.lng)
+    else:
+        capa = capa_marcador()
     
     # Mostrar mapa en Streamlit
-    st_folium(m, width=700, height=500)
+    mostrar_mapa(cargar_registro(), capa, width=700, height=500)
 
     st.markdown("<h3 class='subtitle'>📊 Gráfico de Concentraciones</h3>", unsafe_allow_html=True)
     
-    # Gráfico de concentraciones
-    fig = px.line(df_monitoreo, x='fecha', y='concentracion', color='estacion', title='Concentración de Alexandrium catenella')
-    st.plotly_chart(fig)
+    # Generar datos simulados (solo al llegar a esta sección)
+    df_monitoreo = generar_datos_simulados(datetime.now().date())
+
+    # Gráfico de concentraciones (plotly se importa al construirlo)
+    from catenella.graficos import grafico_concentraciones
+    from catenella.reduccion import reducir_series
+
+    # Rango visible: todo el historial o el tramo elegido (control o zoom)
+    inicio = df_monitoreo['fecha'].min().to_pydatetime()
+    fin = df_monitoreo['fecha'].max().to_pydatetime()
+    st.session_state.concentracion_limites = (inicio, fin)
+    rango = st.session_state.get('concentracion_rango')
+    if rango is None or rango[0] < inicio or rango[1] > fin:
+        st.session_state.concentracion_rango = (inicio, fin)
+    if inicio < fin:
+        st.slider("Rango de fechas:", min_value=inicio, max_value=fin, format="DD/MM/YYYY", key="concentracion_rango")
+
+    # Cada estación se reduce en el servidor (LTTB) al ancho del gráfico, así
+    # el tamaño enviado al navegador no depende del largo del historial
+    visibles = reducir_series(df_monitoreo, 'fecha', 'concentracion', ANCHO_GRAFICO, color='estacion',
+                              rango=st.session_state.concentracion_rango)
+    st.plotly_chart(
+        grafico_concentraciones(visibles),
+        width=ANCHO_GRAFICO,
+        key="grafico_concentraciones",
+        on_select=acercar_grafico,
+        selection_mode="box"
+    )
+    st.caption(f"{len(visibles)} de {len(df_monitoreo)} puntos. Seleccione un tramo para verlo con más detalle.")
+    st.button("Ver todo", on_click=ver_todo)
 
 # Finalizar la aplicación
 if __name__ == "__main__":
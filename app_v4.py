@@ -1,11 +1,18 @@
 # Importar librerías necesarias
 import streamlit as st
-import folium
-from folium import Polygon, PolyLine, Marker, Icon
-from streamlit_folium import st_folium
-import shapely.geometry as geom
-import pandas as pd
-import plotly.express as px
+import os
+import uuid
+from datetime import date, timedelta
+
+# Solo el núcleo liviano al inicio: pandas, folium y plotly se importan dentro
+# del panel que los usa, así la página empieza a mostrarse sin esperarlos
+from catenella import instrumentacion
+from catenella.distancias import METROS_POR_MILLA, distancias_area, distancias_registro
+from catenella.instrumentacion import etapa, instrumentar
+from catenella.recursos import memoria_proceso
+from catenella.geometria import gm_to_decimal, cierre_compuertas_lat
+from catenella.zonas import cargar_registro
+from catenella.lote import COLUMNAS_REQUERIDAS, leer_posiciones, verificar_lote, resumen_lote
 
 # Configuración de página
 st.set_page_config(
@@ -35,64 +42,8 @@ st.markdown("""
 st.markdown("<h1 class='title'>🌊 Programa de Vigilancia Alexandrium catenella</h1>", unsafe_allow_html=True)
 st.markdown("Sistema de monitoreo de áreas restringidas para control de Marea Roja")
 
-# Definir los puntos de restricción (coordenadas)
-coords = [
-    (-73.114044, -43.435339),
-    (-73.042636, -43.568214),
-    (-73.043861, -43.642142),
-    (-73.058528, -43.734786),
-    (-73.198778, -43.734714),
-    (-73.513663, -43.664611),
-    (-73.428572, -43.440469),
-    (-73.114044, -43.435339)  # Cierra el polígono
-]
-
-# Crear polígono con shapely para intersecciones
-polygon = geom.Polygon(coords)
-
-# Función para convertir grados y minutos decimales a decimal
-def gm_to_decimal(degrees, minutes, direction):
-    decimal = abs(degrees) + abs(minutes) / 60
-    if (direction in ["S", "W"]) or degrees < 0:
-        decimal = -decimal
-    return decimal
-
-# Calcular línea de "cierre compuertas"
-cierre_compuertas_lat = gm_to_decimal(43, 34.88, "S")
-
-# Intentar leer datos desde el archivo plotly_resultados.csv
-try:
-    # Leer el archivo CSV con punto y coma como separador
-    df_resultados = pd.read_csv('plotly_resultados.csv', sep=';')
-    
-    # Normalizar nombres de columnas
-    df_resultados.columns = [col.lower().strip() for col in df_resultados.columns]
-    
-    # Convertir año y mes a numérico
-    df_resultados['año'] = pd.to_numeric(df_resultados['año'], errors='coerce')
-    df_resultados['mes'] = pd.to_numeric(df_resultados['mes'], errors='coerce')
-    
-    # Mapear meses numéricos a nombres
-    meses_nombres = {
-        1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 
-        5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto', 
-        9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
-    }
-    df_resultados['nombre_mes'] = df_resultados['mes'].map(meses_nombres)
-    
-    # Crear columna de resultado normalizado
-    df_resultados['resultado_normalizado'] = df_resultados['resultado'].str.strip().str.upper()
-
-    # Filtrar datos por año seleccionado
-    df_filtrado = pd.DataFrame()  # Inicializar el DataFrame filtrado
-    año_seleccionado = None  # Inicializar la variable del año seleccionado
-
-except FileNotFoundError:
-    st.error("No se encontró el archivo de datos 'plotly_resultados.csv'")
-    conteo_mensual = pd.DataFrame(columns=['Positivo', 'Negativo'])
-except Exception as e:
-    st.error(f"Error al procesar el archivo CSV: {e}")
-    conteo_mensual = pd.DataFrame(columns=['Positivo', 'Negativo'])
+# Registro de zonas de restricción y monitoreo (directorio zonas/)
+registro = cargar_registro()
 
 # Inicializar variables para el estado de la sesión
 if 'lat' not in st.session_state:
@@ -102,109 +53,457 @@ if 'lng' not in st.session_state:
 if 'show_marker' not in st.session_state:
     st.session_state.show_marker = False 
 
-# Crear layout en columnas
-col1, col2 = st.columns([1, 1.5])
+if 'zonas_verificadas' not in st.session_state:
+    st.session_state.zonas_verificadas = None
+if 'distancias_verificadas' not in st.session_state:
+    st.session_state.distancias_verificadas = None
+if 'lote_resultado' not in st.session_state:
+    st.session_state.lote_resultado = None
+    st.session_state.lote_error = None
+
+# Identificador de la sesión para separar sus mediciones de las de otras
+if 'diagnostico_sesion' not in st.session_state:
+    st.session_state.diagnostico_sesion = uuid.uuid4().hex[:8]
+
+
+# Medición de tiempos por rerun: con CATENELLA_INSTRUMENTACION=1 o activada
+# desde la barra lateral (visible con ?diagnostico=1 en la URL)
+def medicion_activa():
+    return st.session_state.get("diagnostico_medir", False)
+
+
+def contexto_sesion():
+    return {"sesion": st.session_state.diagnostico_sesion}
+
+
+def medir(nombre):
+    return instrumentar(nombre, medicion_activa, contexto_sesion)
+
+# Cada panel es un fragmento con su propio estado: interactuar con uno solo
+# vuelve a ejecutar ese panel (y el mapa, cuando cambia el marcador)
+
+
+# Verificar el archivo de posiciones al subirlo o quitarlo (callback del
+# control de archivos). El resultado queda en la sesión para el resumen y para
+# dibujar las posiciones en el mapa.
+def verificar_archivo_lote():
+    archivo_lote = st.session_state.verificador_archivo_lote
+    st.session_state.lote_resultado = None
+    st.session_state.lote_error = None
+    if archivo_lote is not None:
+        try:
+            st.session_state.lote_resultado = verificar_lote(leer_posiciones(archivo_lote), registro, fecha=date.today())
+        except Exception as e:
+            st.session_state.lote_error = str(e)
+
+    # Las posiciones nuevas (o su ausencia) solo afectan al verificador y al mapa
+    st.rerun(["verificador", "mapa"])
+
+
+# Verificar la coordenada del formulario (callback del botón)
+def verificar_coordenada():
+    lat = gm_to_decimal(st.session_state.verificador_lat_deg, st.session_state.verificador_lat_min, "S")
+    lng = gm_to_decimal(st.session_state.verificador_lng_deg, st.session_state.verificador_lng_min, "W")
+
+    # Todas las zonas vigentes que contienen el punto (consulta al STRtree)
+    zonas_punto = registro.zonas_en(lng, lat, fecha=date.today())
+    st.session_state.zonas_verificadas = [f"{z.nombre} ({z.tipo})" for z in zonas_punto]
+
+    # Distancias al borde de la zona que contiene el punto (o de la vigente
+    # más cercana) y a la línea de cierre de compuertas
+    distancias = distancias_registro(registro)
+    zona = int(distancias.zona_cercana(lng, lat, fecha=date.today())[0])
+    st.session_state.distancias_verificadas = {
+        'cierre_m': float(distancias_area().al_cierre(lat)[0]),
+        'al_sur': lat < cierre_compuertas_lat,
+        'zona': None,
+    }
+    if zona >= 0:
+        borde, segmento = distancias.de_zona(zona).al_borde(lng, lat, con_segmento=True)
+        st.session_state.distancias_verificadas.update({
+            'zona': distancias.zonas[zona].nombre,
+            'borde_m': float(borde[0]),
+            'segmento': distancias.extremos(zona, segmento[0]),
+        })
+
+    # Guardar coordenadas en el estado de sesión
+    st.session_state.lat = lat
+    st.session_state.lng = lng
+    st.session_state.show_marker = True
 
-# Columna 1: Formularios y controles
-with col1:
+    # El nuevo marcador solo afecta al verificador y al mapa
+    st.rerun(["verificador", "mapa"])
+
+
+@st.fragment(key="verificador")
+@medir("verificador")
+def panel_verificador():
     st.markdown("<h3 class='subtitle'>📍 Verificar Coordenadas</h3>", unsafe_allow_html=True)
-    
+
     with st.form("check_form"):
-        lat_deg = st.number_input("Grados de Latitud:", value=-43)
-        lat_min = st.number_input("Minutos de Latitud:", value=30.0)
-        lng_deg = st.number_input("Grados de Longitud:", value=-73)
-        lng_min = st.number_input("Minutos de Longitud:", value=10.0)
-        submit = st.form_submit_button("Verificar Coordenada")
-
-    if submit:
-        lat = gm_to_decimal(lat_deg, lat_min, "S")
-        lng = gm_to_decimal(lng_deg, lng_min, "W")
-        point = geom.Point(lng, lat)
-        
-        if polygon.contains(point):
-            st.error("⚠️ ¡Alerta! La coordenada está dentro del área restringida.")
-        else:
-            st.success("✅ La coordenada está fuera del área restringida.")
-        
-        # Guardar coordenadas en el estado de sesión
-        st.session_state.lat = lat
-        st.session_state.lng = lng
-        st.session_state.show_marker = True
-
-# Columna 2: Mapa y gráfico
-with col2:
+        st.number_input("Grados de Latitud:", value=-43, key="verificador_lat_deg")
+        st.number_input("Minutos de Latitud:", value=30.0, key="verificador_lat_min")
+        st.number_input("Grados de Longitud:", value=-73, key="verificador_lng_deg")
+        st.number_input("Minutos de Longitud:", value=10.0, key="verificador_lng_min")
+        st.form_submit_button("Verificar Coordenada", on_click=verificar_coordenada)
+
+    if st.session_state.zonas_verificadas:
+        nombres = ", ".join(st.session_state.zonas_verificadas)
+        st.error(f"⚠️ ¡Alerta! La coordenada está dentro de: {nombres}.")
+    elif st.session_state.zonas_verificadas is not None:
+        st.success("✅ La coordenada está fuera del área restringida.")
+
+    distancias = st.session_state.distancias_verificadas
+    if distancias and distancias['zona'] is not None:
+        c_borde, c_cierre = st.columns(2)
+        c_borde.metric(f"Al borde de {distancias['zona']}", f"{distancias['borde_m']:,.0f} m",
+                       help=f"{distancias['borde_m'] / METROS_POR_MILLA:.2f} millas náuticas")
+        c_cierre.metric("A la línea de cierre", f"{distancias['cierre_m']:,.0f} m",
+                        help=f"{distancias['cierre_m'] / METROS_POR_MILLA:.2f} millas náuticas")
+        (lat0, lng0), (lat1, lng1) = distancias['segmento']
+        st.caption(
+            f"{distancias['borde_m'] / METROS_POR_MILLA:.2f} mn al borde · "
+            f"{distancias['cierre_m'] / METROS_POR_MILLA:.2f} mn al "
+            f"{'sur' if distancias['al_sur'] else 'norte'} de la línea de cierre. "
+            f"Tramo de borde más cercano: ({lat0:.5f}, {lng0:.5f}) – ({lat1:.5f}, {lng1:.5f})"
+        )
+    elif distancias:
+        st.metric("A la línea de cierre", f"{distancias['cierre_m']:,.0f} m",
+                  help=f"{distancias['cierre_m'] / METROS_POR_MILLA:.2f} millas náuticas")
+
+    st.markdown("<h3 class='subtitle'>📂 Verificación por Lote</h3>", unsafe_allow_html=True)
+
+    st.file_uploader(
+        "Archivo de posiciones (CSV o Excel):",
+        type=["csv", "xlsx", "xls"],
+        help="Columnas requeridas: " + ", ".join(COLUMNAS_REQUERIDAS),
+        key="verificador_archivo_lote",
+        on_change=verificar_archivo_lote
+    )
+
+    if st.session_state.lote_error is not None:
+        st.error(f"Error al procesar el archivo de posiciones: {st.session_state.lote_error}")
+    elif st.session_state.lote_resultado is not None:
+        resultado_lote = st.session_state.lote_resultado
+        resumen = resumen_lote(resultado_lote)
+
+        # Conteos de resumen
+        c_total, c_dentro, c_fuera = st.columns(3)
+        c_total.metric("Posiciones", resumen['total'])
+        c_dentro.metric("Dentro del área", resumen['dentro'])
+        c_fuera.metric("Fuera del área", resumen['fuera'])
+
+        st.download_button(
+            "Descargar resultado",
+            data=resultado_lote.to_csv(index=False, sep=';').encode('utf-8'),
+            file_name="verificacion_lote.csv",
+            mime="text/csv"
+        )
+
+
+@st.fragment(key="mapa")
+@medir("mapa")
+def panel_mapa():
+    from catenella.mapa import MAX_MARCADORES, MODOS_CAPA, capa_marcador, capa_puntos, modo_capa, mostrar_mapa
+
     st.markdown("<h3 class='subtitle'>🗺️ Mapa de Monitoreo</h3>", unsafe_allow_html=True)
-    
-    # Crear mapa
-    m = folium.Map(location=[-43.5, -73.1], zoom_start=8)
-    folium.Polygon(locations=coords, color='blue', fill=True, fill_opacity=0.2).add_to(m)
-    
-    # Añadir línea de cierre de compuertas
-    folium.Marker(
-        location=[cierre_compuertas_lat, -73.1],  # Longitud de ejemplo
-        popup="Cierre de Compuertas",
-        icon=folium.Icon(color='green')
-    ).add_to(m)
-
-    # Añadir línea punteada en la coordenada 43° 34.88' S
-    folium.PolyLine(
-        locations=[(cierre_compuertas_lat, -75.5), (cierre_compuertas_lat, -72.5)],
-        color='red',
-        weight=2,
-        dash_array='5, 5'  # Estilo de línea punteada
-    ).add_to(m)
-
-    # Añadir marcador si hay coordenadas
+
+    # Mapa base cacheado por versión de las zonas; en cada rerun solo se
+    # envían las capas con el marcador de la coordenada ingresada y, si hay,
+    # las posiciones del lote
     if st.session_state.show_marker:
-        folium.Marker(
-            location=[st.session_state.lat, st.session_state.lng],
-            popup="Ubicación Ingresada",
-            icon=folium.Icon(color='red')
-        ).add_to(m)
-    
+        capas = [capa_marcador(st.session_state.lat, st.session_state.lng)]
+    else:
+        capas = [capa_marcador()]
+
+    # Las posiciones del lote se dibujan según su cantidad: marcadores,
+    # grupos armados en el navegador o mapa de calor
+    lote = st.session_state.lote_resultado
+    if lote is not None and len(lote):
+        lat, lng = lote['lat'].to_numpy(), lote['lng'].to_numpy()
+        # Un marcador por punto solo se ofrece para lotes chicos
+        modos = [m for m in MODOS_CAPA if m != "marcadores" or len(lat) <= 10 * MAX_MARCADORES]
+        modo = st.radio("Posiciones del lote:", ["auto"] + modos, horizontal=True, key="mapa_modo_lote",
+                        format_func=lambda m: f"automático ({modo_capa(len(lat))})" if m == "auto" else m)
+        with etapa("capa_lote"):
+            capas.append(capa_puntos(lat, lng, lote['dentro_area'].to_numpy(dtype=bool), modo=modo,
+                                     nombre="Posiciones del lote"))
+
     # Mostrar mapa en Streamlit
-    st_folium(m, width=700, height=500)
+    with etapa("st_folium"):
+        mostrar_mapa(registro, capas, width=700, height=500)
+
+
+@st.fragment(key="alertas")
+@medir("alertas")
+def panel_alertas():
+    from catenella.alertas import actualizar_alertas, ultimas_alertas
+
+    st.markdown("<h3 class='subtitle'>🚨 Alertas</h3>", unsafe_allow_html=True)
+
+    try:
+        # Evalúa solo los resultados nuevos desde la última actualización
+        actualizar_alertas()
+    except Exception as e:
+        st.error(f"Error al actualizar las alertas: {e}")
+        return
+
+    alertas = ultimas_alertas(10)
+    if not alertas:
+        st.info("Sin alertas registradas.")
+        return
+    for alerta in alertas:
+        st.warning(f"**{alerta['wellboat']}** · {alerta['fecha']}  \n{alerta['detalle']}")
+
+
+@st.fragment(key="grafico")
+@medir("grafico")
+def panel_grafico():
+    from catenella.agregados import cubo_mensual
+    from catenella.basedatos import base_resultados
+    from catenella.graficos import grafico_mensual
 
     st.markdown("<h3 class='subtitle'>📊 Casos Positivos y Negativos por Mes</h3>", unsafe_allow_html=True)
-    
+
+    # Intentar leer datos desde el archivo plotly_resultados.csv
+    try:
+        # Cubo de conteos año × mes × resultado: se construye una vez por versión
+        # de los datos y se reutiliza (desde memoria o disco) en cada rerun.
+        # Con CATENELLA_BD=sqlite (o duckdb) los conteos se calculan en la base
+        # embebida, con la misma interfaz que el cubo.
+        motor_bd = os.environ.get("CATENELLA_BD")
+        with etapa("datos"):
+            cubo = base_resultados(motor_bd) if motor_bd else cubo_mensual()
+    except FileNotFoundError:
+        st.error("No se encontró el archivo de datos 'plotly_resultados.csv'")
+        return
+    except Exception as e:
+        st.error(f"Error al procesar el archivo CSV: {e}")
+        return
+
     # Verificar si hay datos disponibles
-    if not df_resultados.empty:
-        # Selector de año
-        año_seleccionado = st.selectbox("Selecciona el año:", df_resultados['año'].dropna().unique())
-        df_filtrado = df_resultados[df_resultados['año'] == año_seleccionado]
-
-        # Contar casos positivos y negativos por mes
-        conteo_mensual = df_filtrado.groupby('nombre_mes')['resultado_normalizado'].value_counts().unstack(fill_value=0)
-        conteo_mensual = conteo_mensual.reindex(meses_nombres.values(), fill_value=0)  # Asegurar que todos los meses estén presentes
-
-        # Gráfico de barras
-        if not conteo_mensual.empty:
-            fig = px.bar(
-                conteo_mensual.reset_index(), 
-                x='nombre_mes', 
-                y=conteo_mensual.columns,
-                title='Casos Positivos y Negativos por Mes',
-                labels={'nombre_mes': 'Mes', 'value': 'Número de Casos'},
-                barmode='group'
-            )
-            
-            # Personalizar el diseño
-            fig.update_layout(
-                xaxis_title='Mes',
-                yaxis_title='Número de Casos',
-                height=400,
-                width=700
-            )
-            
-            st.plotly_chart(fig)
-            
-            # Tabla de resumen
-            st.markdown("### Resumen de Casos por Mes")
-            st.dataframe(conteo_mensual)
+    if not cubo.años:
+        st.warning("No hay datos disponibles para mostrar.")
+        return
+
+    # Selector de año y, opcionalmente, de wellboat
+    año_seleccionado = st.selectbox("Selecciona el año:", cubo.años, key="grafico_año")
+    wellboat_seleccionado = st.selectbox("Wellboat:", ["Todos"] + cubo.wellboats, key="grafico_wellboat")
+
+    # Contar casos positivos y negativos por mes (corte directo del cubo)
+    conteo_mensual = cubo.conteo_mensual(
+        año_seleccionado,
+        None if wellboat_seleccionado == "Todos" else wellboat_seleccionado
+    )
+
+    # Gráfico de barras
+    with etapa("figura_plotly"):
+        fig = grafico_mensual(conteo_mensual)
+    
+    with etapa("plotly_chart"):
+        st.plotly_chart(fig)
+    
+    # Tabla de resumen
+    st.markdown("### Resumen de Casos por Mes")
+    with etapa("tabla_resumen"):
+        st.dataframe(conteo_mensual)
+
+
+@st.fragment(key="consulta")
+@medir("consulta")
+def panel_consulta():
+    import pandas as pd
+    from catenella.consultas import indice_resultados
+
+    st.markdown("<h3 class='subtitle'>🔎 Consulta de Muestras</h3>", unsafe_allow_html=True)
+
+    try:
+        with etapa("datos"):
+            indice = indice_resultados()
+    except Exception as e:
+        st.error(f"Error al cargar los resultados: {e}")
+        return
+    if not len(indice):
+        st.warning("No hay datos disponibles para mostrar.")
+        return
+
+    c_periodo, c_wellboats = st.columns([1, 2])
+    with c_periodo:
+        periodo = st.selectbox(
+            "Período:",
+            ["Últimos 30 días", "Temporada (dic–mar)", "Rango de fechas"],
+            key="consulta_periodo"
+        )
+        ultima_fecha = pd.Timestamp(indice.fechas[-1]).date()
+        if periodo == "Últimos 30 días":
+            desde, hasta = ultima_fecha - timedelta(days=29), ultima_fecha
+        elif periodo == "Temporada (dic–mar)":
+            años = sorted({int(a) for a in indice.df['año'].unique()}, reverse=True)
+            año = st.selectbox("Temporada que termina en:", años, key="consulta_temporada")
+            desde, hasta = date(año - 1, 12, 1), date(año, 3, 31)
         else:
-            st.warning("No hay datos disponibles para mostrar.")
-    else:
+            rango = st.date_input(
+                "Desde / hasta:",
+                value=(ultima_fecha - timedelta(days=364), ultima_fecha),
+                key="consulta_rango"
+            )
+            desde, hasta = (rango[0], rango[-1]) if rango else (None, None)
+    with c_wellboats:
+        seleccion = st.multiselect("Wellboats (vacío = todos):", indice.wellboats, key="consulta_wellboats")
+
+    # Búsqueda binaria sobre el índice ordenado por fecha
+    with etapa("filtro"):
+        filas = indice.filas(desde, hasta, seleccion or None)
+        conteo = indice.conteo_resultados(filas)
+
+    st.caption(f"{len(filas)} muestras entre {desde} y {hasta}")
+    c_neg, c_pos = st.columns(2)
+    c_neg.metric("Negativos", int(conteo.get('NEGATIVO', 0)))
+    c_pos.metric("Positivos", int(conteo.get('POSITIVO', 0)))
+    with etapa("tabla"):
+        st.dataframe(indice.df.iloc[filas[::-1][:1000]], hide_index=True)
+
+
+@st.fragment(key="flota")
+@medir("flota")
+def panel_flota():
+    from catenella.analitica import analitica_flota
+    from catenella.graficos import grafico_positividad
+
+    st.markdown("<h3 class='subtitle'>🚢 Positividad por Wellboat</h3>", unsafe_allow_html=True)
+
+    try:
+        # Indicadores de toda la flota, calculados una vez por versión de los datos
+        with etapa("datos"):
+            analitica = analitica_flota()
+    except Exception as e:
+        st.error(f"Error al cargar los resultados: {e}")
+        return
+    with etapa("indicadores"):
+        tabla = analitica.tabla()
+    if tabla.empty:
         st.warning("No hay datos disponibles para mostrar.")
+        return
+
+    st.caption(f"Indicadores al {tabla['ultima_muestra'].max():%d-%m-%Y} (última muestra registrada)")
+    st.dataframe(
+        tabla,
+        hide_index=True,
+        column_config={
+            "wellboat": "Wellboat",
+            "muestras": "Muestras",
+            "positivos": "Positivos",
+            "muestras_7d": "Muestras 7 días",
+            "positividad_7d": st.column_config.ProgressColumn("Positividad 7 días", format="percent", min_value=0, max_value=1),
+            "muestras_30d": "Muestras 30 días",
+            "positividad_30d": st.column_config.ProgressColumn("Positividad 30 días", format="percent", min_value=0, max_value=1),
+            "racha_actual": "Racha actual",
+            "racha_maxima": "Racha máxima",
+            "dias_desde_positivo": "Días desde último positivo",
+            "ultima_muestra": st.column_config.DateColumn("Última muestra", format="DD-MM-YYYY"),
+        },
+    )
+
+    # Evolución de la positividad móvil de una embarcación
+    wellboat = st.selectbox("Evolución de:", tabla['wellboat'].tolist(), key="flota_wellboat")
+    with etapa("figura_plotly"):
+        fig = grafico_positividad(analitica.serie(wellboat), wellboat)
+    with etapa("plotly_chart"):
+        st.plotly_chart(fig)
+
+
+def perfilar_proximo_rerun():
+    st.session_state.diagnostico_perfilar = True
+
+
+# Panel de diagnóstico: desglose por etapa de los últimos reruns de la sesión
+# (incluidos los de fragmentos) y el perfil del último rerun perfilado
+def panel_diagnostico():
+    if not (instrumentacion.ACTIVO_POR_ENTORNO or st.query_params.get("diagnostico") == "1"):
+        return
+    import pandas as pd
+
+    with st.sidebar:
+        st.markdown("### ⏱️ Diagnóstico")
+        st.checkbox("Medir reruns", value=instrumentacion.ACTIVO_POR_ENTORNO, key="diagnostico_medir")
+        st.button("Perfilar el próximo rerun", on_click=perfilar_proximo_rerun)
+
+        # Memoria del proceso del servidor (compartida por todas las sesiones)
+        # y lo que ocupan los datos, agregados y geometría compartidos
+        memoria = memoria_proceso()
+        if memoria['memoria_kb'] is not None:
+            st.metric("Memoria del proceso", f"{memoria['memoria_kb'] / 1024:.0f} MB",
+                      help=f"PID {os.getpid()}; recursos compartidos: {memoria['recursos_kb'] / 1024:.1f} MB")
+        if memoria['recursos']:
+            recursos = pd.DataFrame(memoria['recursos'])
+            recursos['MB'] = recursos['bytes'] / 2 ** 20
+            st.dataframe(
+                recursos[['recurso', 'entradas', 'MB']],
+                hide_index=True,
+                column_config={"MB": st.column_config.NumberColumn("MB", format="%.1f")},
+            )
+
+        mediciones = instrumentacion.ultimas_mediciones(20, st.session_state.diagnostico_sesion)
+        if not mediciones:
+            st.caption("Sin mediciones en esta sesión.")
+            return
+
+        ultima = mediciones[0]
+        c_tiempo, c_memoria = st.columns(2)
+        c_tiempo.metric(f"Rerun «{ultima['rerun']}»", f"{ultima['total_s'] * 1000:.0f} ms")
+        if ultima['memoria_total_kb'] is not None:
+            c_memoria.metric("Memoria", f"{ultima['memoria_total_kb'] / 1024:.0f} MB",
+                             f"{(ultima['memoria_kb'] or 0) / 1024:+.1f} MB", delta_color="inverse")
+
+        etapas = pd.DataFrame(ultima['etapas'], columns=['etapa', 'nivel', 'segundos', 'memoria_kb'])
+        etapas['ms'] = etapas['segundos'] * 1000
+        st.dataframe(
+            etapas[['etapa', 'ms', 'memoria_kb']],
+            hide_index=True,
+            column_config={
+                "etapa": "Etapa",
+                "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                "memoria_kb": st.column_config.NumberColumn("Δ memoria (KB)", format="%d"),
+            },
+        )
+
+        st.caption("Reruns recientes")
+        st.dataframe(
+            pd.DataFrame({
+                'fecha': [m['fecha'][11:] for m in mediciones],
+                'rerun': [m['rerun'] for m in mediciones],
+                'ms': [m['total_s'] * 1000 for m in mediciones],
+            }),
+            hide_index=True,
+            column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")},
+        )
+
+        perfilada = next((m for m in mediciones if 'perfil' in m), None)
+        if perfilada is not None:
+            with st.expander(f"Perfil cProfile ({perfilada['fecha'][11:]})"):
+                st.code(perfilada['perfil'], language=None)
+
+
+# El rerun completo se mide como un registro; los paneles son sus etapas
+perfilar = st.session_state.pop("diagnostico_perfilar", False)
+with instrumentacion.rerun("app_v4", medicion_activa() or perfilar, perfil=perfilar, contexto=contexto_sesion()):
+    # Crear layout en columnas
+    col1, col2 = st.columns([1, 1.5])
+
+    # Columna 1: Formularios y controles
+    with col1:
+        panel_verificador()
+        panel_alertas()
+
+    # Columna 2: Mapa y gráfico
+    with col2:
+        panel_mapa()
+        panel_grafico()
+
+    panel_consulta()
+    panel_flota()
+
+panel_diagnostico()
 
 # Finalizar la aplicación
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+# Núcleo compartido del programa de vigilancia Alexandrium catenella
+#
+# Los módulos importan solo lo que usan: la geometría y las zonas no cargan
+# pandas, y folium, streamlit_folium y plotly se importan recién en el módulo
+# (o la función) que dibuja. Así los scripts de Streamlit y las herramientas
+# de línea de comandos arrancan sin pagar por secciones que no ejecutan.
+import os
+
+# Directorio raíz del repositorio (datos, zonas y archivos derivados)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,177 @@
+# Cubo de conteos año × mes × resultado × wellboat
+#
+# Se construye una vez por versión de los datos y se guarda junto al CSV,
+# de modo que el gráfico mensual y su tabla resumen son cortes directos del
+# cubo en lugar de un filtrado + groupby sobre todo el DataFrame. Cuando a los
+# datos solo se les agregaron filas, el cubo anterior se actualiza sumando
+# esas filas en vez de reconstruirse.
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catenella.datos import (FUENTES_RESULTADOS, MESES_NOMBRES, RUTA_ALMACEN, cargar_resultados,
+                             filas_agregadas, version_datos)
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class CuboMensual:
+    def __init__(self, años, resultados, wellboats, conteos, version):
+        self.años = [int(a) for a in años]
+        self.resultados = [str(r) for r in resultados]
+        self.wellboats = [str(w) for w in wellboats]
+        # conteos[año, mes - 1, resultado, wellboat]
+        self.conteos = conteos
+        self.version = version
+        # Total de la flota, precalculado para el corte más frecuente
+        self.por_mes = conteos.sum(axis=3)
+        self._indice_año = {a: i for i, a in enumerate(self.años)}
+        self._indice_wellboat = {w: i for i, w in enumerate(self.wellboats)}
+        self._tablas = {}
+
+    # Tabla mes × resultado para un año (y opcionalmente un wellboat)
+    def conteo_mensual(self, año, wellboat=None):
+        clave = (int(año), wellboat)
+        tabla = self._tablas.get(clave)
+        if tabla is not None:
+            return tabla
+
+        i = self._indice_año.get(int(año))
+        if i is None:
+            valores = np.zeros((12, len(self.resultados)), dtype=self.conteos.dtype)
+        elif wellboat is None:
+            valores = self.por_mes[i]
+        else:
+            valores = self.conteos[i, :, :, self._indice_wellboat[wellboat]]
+
+        tabla = pd.DataFrame(
+            valores,
+            index=pd.Index(list(MESES_NOMBRES.values()), name='nombre_mes'),
+            columns=pd.Index(self.resultados, name='resultado'),
+        )
+        self._tablas[clave] = tabla
+        return tabla
+
+    # Cubo nuevo con las filas agregadas sumadas; los ejes crecen si aparecen
+    # años, resultados o wellboats que no estaban
+    def agregar(self, filas, version):
+        filas = _filas_validas(filas)
+        años = sorted(set(self.años) | set(int(a) for a in filas['año'].unique()))
+        resultados = sorted(set(self.resultados) | set(_etiquetas(filas['resultado'])))
+        wellboats = sorted(set(self.wellboats) | set(_etiquetas(filas['wellboat'])))
+
+        forma = (len(años), 12, len(resultados), len(wellboats))
+        conteos = np.zeros(forma, dtype=self.conteos.dtype)
+        conteos[np.ix_(
+            np.searchsorted(años, self.años),
+            np.arange(12),
+            np.searchsorted(resultados, self.resultados),
+            np.searchsorted(wellboats, self.wellboats),
+        )] = self.conteos
+        conteos += _contar(filas, años, resultados, wellboats)
+        return CuboMensual(años, resultados, wellboats, conteos, version)
+
+
+def _filas_validas(df):
+    df = df.dropna(subset=['año', 'mes'])
+    return df[df['mes'].between(1, 12)]
+
+
+# Etiquetas presentes en una columna, ordenadas. Se trabaja sobre las
+# categorías y sus códigos, sin convertir cada fila a texto.
+def _etiquetas(columna):
+    columna = columna.astype('category')
+    codigos = columna.cat.codes.to_numpy()
+    presentes = np.flatnonzero(np.bincount(codigos[codigos >= 0], minlength=len(columna.cat.categories)))
+    return np.sort(columna.cat.categories[presentes].astype(str).to_numpy())
+
+
+# Posición de cada fila en un eje ordenado de etiquetas
+def _posiciones(columna, eje):
+    columna = columna.astype('category')
+    por_categoria = np.searchsorted(eje, columna.cat.categories.astype(str).to_numpy())
+    return por_categoria[columna.cat.codes.to_numpy()]
+
+
+# Conteos de las filas sobre los ejes indicados (ya ordenados)
+def _contar(df, años, resultados, wellboats):
+    i_año = np.searchsorted(años, df['año'].to_numpy())
+    i_mes = df['mes'].to_numpy().astype(int) - 1
+    i_res = _posiciones(df['resultado'], resultados)
+    i_wb = _posiciones(df['wellboat'], wellboats)
+
+    forma = (len(años), 12, len(resultados), len(wellboats))
+    plano = np.ravel_multi_index((i_año, i_mes, i_res, i_wb), forma)
+    return np.bincount(plano, minlength=int(np.prod(forma))).astype(np.int32).reshape(forma)
+
+
+# Construir el cubo a partir del DataFrame normalizado
+def construir_cubo(df, version=''):
+    df = _filas_validas(df)
+    años = np.sort(df['año'].unique()).astype(int)
+    resultados = _etiquetas(df['resultado'])
+    wellboats = _etiquetas(df['wellboat'])
+    conteos = _contar(df, años, resultados, wellboats)
+    return CuboMensual(años, resultados, wellboats, conteos, version)
+
+
+# Cubo persistido junto al almacén de resultados
+RUTA_CUBO = os.path.splitext(RUTA_ALMACEN)[0] + '.cubo.npz'
+
+
+# Leer el cubo persistido; con version=None se acepta cualquier versión
+def _leer_cubo(ruta_npz, version=None):
+    try:
+        with np.load(ruta_npz) as archivo:
+            guardada = str(archivo['version'])
+            if version is not None and guardada != version:
+                return None
+            return CuboMensual(
+                archivo['años'], archivo['resultados'], archivo['wellboats'],
+                archivo['conteos'], guardada,
+            )
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        return None
+
+
+def _escribir_cubo(cubo, ruta_npz):
+    temporal = f"{ruta_npz}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(
+            temporal,
+            version=np.array(cubo.version),
+            años=np.array(cubo.años, dtype=np.int64),
+            resultados=np.array(cubo.resultados, dtype=str),
+            wellboats=np.array(cubo.wellboats, dtype=str),
+            conteos=cubo.conteos,
+        )
+        os.replace(temporal, ruta_npz)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# Devuelve el cubo de la versión actual de los datos (memoria, disco o nuevo)
+def cubo_mensual(fuentes=FUENTES_RESULTADOS, ruta_npz=RUTA_CUBO):
+    fuentes = tuple(fuentes)
+    version = version_datos(fuentes)
+    with _lock:
+        en_cache = _cache.get(fuentes)
+        if en_cache is not None and en_cache.version == version:
+            return en_cache
+
+        cubo = en_cache or _leer_cubo(ruta_npz)
+        if cubo is None or cubo.version != version:
+            df = cargar_resultados(fuentes)
+            nuevas = filas_agregadas(fuentes, cubo.version) if cubo is not None else None
+            if nuevas is not None:
+                cubo = cubo.agregar(nuevas, version)
+            else:
+                cubo = construir_cubo(df, version)
+            _escribir_cubo(cubo, ruta_npz)
+
+        _cache[fuentes] = cubo
+        return cubo
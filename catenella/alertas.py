@@ -0,0 +1,250 @@
+# Motor de alertas sobre los resultados de laboratorio
+#
+# Cada regla guarda por wellboat un estado mínimo (una racha, o las muestras
+# de su ventana) y evalúa cada resultado nuevo en tiempo constante. Las
+# alertas se escriben en un registro de eventos (alertas.jsonl) que muestra
+# el dashboard; el estado se guarda junto a la versión de los datos que lo
+# produjo, de modo que al llegar resultados nuevos solo se procesan esas filas.
+# Si los datos cambiaron de otra forma, o si alguna fila nueva tiene fecha
+# anterior al último resultado ya procesado de su wellboat (las reglas dependen
+# del orden), se reprocesa el historial completo.
+#
+# Uso:  python -m catenella.alertas            (reprocesar e imprimir alertas)
+import argparse
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from catenella.datos import FUENTES_RESULTADOS, RAIZ, cargar_resultados, filas_agregadas, version_datos
+
+POSITIVO = 'POSITIVO'
+
+RUTA_ALERTAS = os.path.join(RAIZ, 'alertas.jsonl')
+RUTA_ESTADO_ALERTAS = os.path.join(RAIZ, 'alertas.estado.json')
+
+_cache = {}
+_lock = threading.Lock()
+
+
+# N resultados positivos seguidos del mismo wellboat
+class ReglaConsecutivos:
+    def __init__(self, n=3):
+        self.n = n
+        self.nombre = f'positivos_consecutivos_{n}'
+
+    def estado_inicial(self):
+        return [0]  # racha actual
+
+    def a_json(self, estado):
+        return estado
+
+    def desde_json(self, valor):
+        return list(valor)
+
+    def evaluar(self, estado, dia, positivo):
+        estado[0] = estado[0] + 1 if positivo else 0
+        # Se avisa una vez, al alcanzar la racha
+        if estado[0] == self.n:
+            return f"{self.n} resultados POSITIVO consecutivos"
+        return None
+
+
+# Positividad sobre el umbral en los últimos `dias` días (con un mínimo de
+# muestras para no alertar por un único positivo)
+class ReglaPositividad:
+    def __init__(self, umbral=0.3, dias=30, minimo=5):
+        self.umbral = umbral
+        self.dias = dias
+        self.minimo = minimo
+        self.nombre = f'positividad_{dias}d_sobre_{umbral:g}'
+
+    def estado_inicial(self):
+        # [muestras (día, positivo) en la ventana, positivos en la ventana, alerta activa]
+        return [deque(), 0, False]
+
+    def a_json(self, estado):
+        return [list(map(list, estado[0])), estado[1], estado[2]]
+
+    def desde_json(self, valor):
+        return [deque(map(tuple, valor[0])), valor[1], valor[2]]
+
+    def evaluar(self, estado, dia, positivo):
+        ventana = estado[0]
+        ventana.append((dia, positivo))
+        estado[1] += positivo
+        while ventana[0][0] <= dia - self.dias:
+            estado[1] -= ventana.popleft()[1]
+
+        tasa = estado[1] / len(ventana)
+        supera = len(ventana) >= self.minimo and tasa > self.umbral
+        # Se avisa al cruzar el umbral y se rearma cuando la tasa vuelve a bajar
+        aviso = supera and not estado[2]
+        estado[2] = supera
+        if aviso:
+            return f"positividad {tasa:.0%} en {len(ventana)} muestras de los últimos {self.dias} días"
+        return None
+
+
+REGLAS = (ReglaConsecutivos(3), ReglaPositividad(0.3, 30, 5))
+
+
+class MotorAlertas:
+    def __init__(self, reglas=REGLAS, version=None):
+        self.reglas = list(reglas)
+        self.version = version
+        # wellboat -> [estado de cada regla]
+        self.estado = {}
+        # wellboat -> día del último resultado procesado
+        self.ultimo_dia = {}
+
+    def firma(self):
+        return [r.nombre for r in self.reglas]
+
+    # Evaluar un resultado (día como número de días desde 1970); devuelve
+    # las alertas que genera
+    def evaluar(self, dia, wellboat, positivo):
+        estados = self.estado.get(wellboat)
+        if estados is None:
+            estados = [regla.estado_inicial() for regla in self.reglas]
+            self.estado[wellboat] = estados
+        self.ultimo_dia[wellboat] = max(dia, self.ultimo_dia.get(wellboat, dia))
+        alertas = []
+        for regla, estado in zip(self.reglas, estados):
+            detalle = regla.evaluar(estado, dia, positivo)
+            if detalle is not None:
+                alertas.append({
+                    'fecha': str(np.datetime64(dia, 'D')),
+                    'wellboat': wellboat,
+                    'regla': regla.nombre,
+                    'detalle': detalle,
+                })
+        return alertas
+
+    # ¿Se pueden evaluar las filas de `df` a continuación de lo ya procesado?
+    # No, si alguna es anterior al último resultado de su wellboat.
+    def en_orden(self, df):
+        dias = _dias(df).tolist()
+        wellboats = df['wellboat'].astype(str).tolist()
+        return all(dia >= self.ultimo_dia.get(wellboat, dia) for dia, wellboat in zip(dias, wellboats))
+
+    # Evaluar las filas de un DataFrame de resultados en su orden
+    def procesar(self, df):
+        dias = _dias(df).tolist()
+        wellboats = df['wellboat'].astype(str).tolist()
+        positivos = (df['resultado'].astype(str).to_numpy() == POSITIVO).tolist()
+        alertas = []
+        for dia, wellboat, positivo in zip(dias, wellboats, positivos):
+            alertas.extend(self.evaluar(dia, wellboat, positivo))
+        return alertas
+
+    def a_json(self):
+        return {
+            'version': self.version,
+            'reglas': self.firma(),
+            'estado': {
+                wellboat: [regla.a_json(e) for regla, e in zip(self.reglas, estados)]
+                for wellboat, estados in self.estado.items()
+            },
+            'ultimo_dia': self.ultimo_dia,
+        }
+
+    @classmethod
+    def desde_json(cls, datos, reglas=REGLAS):
+        motor = cls(reglas, datos['version'])
+        if datos['reglas'] != motor.firma():
+            return None
+        motor.estado = {
+            wellboat: [regla.desde_json(e) for regla, e in zip(motor.reglas, estados)]
+            for wellboat, estados in datos['estado'].items()
+        }
+        motor.ultimo_dia = dict(datos['ultimo_dia'])
+        return motor
+
+
+def _dias(df):
+    return df['fecha'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _leer_estado(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return MotorAlertas.desde_json(json.load(f))
+    except (FileNotFoundError, OSError, ValueError, KeyError):
+        return None
+
+
+def _escribir_estado(motor, ruta):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(motor.a_json(), f)
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def _escribir_alertas(alertas, ruta, agregar):
+    try:
+        with open(ruta, 'a' if agregar else 'w', encoding='utf-8') as f:
+            for alerta in alertas:
+                f.write(json.dumps(alerta, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+
+
+# Poner el motor al día con la versión actual de los datos: procesa solo las
+# filas nuevas si se puede y, si no, reprocesa todo el historial
+def actualizar_alertas(fuentes=FUENTES_RESULTADOS, ruta_alertas=RUTA_ALERTAS, ruta_estado=RUTA_ESTADO_ALERTAS):
+    fuentes = tuple(fuentes)
+    version = version_datos(fuentes)
+    with _lock:
+        motor = _cache.get(fuentes) or _leer_estado(ruta_estado)
+        if motor is not None and motor.version == version and os.path.exists(ruta_alertas):
+            _cache[fuentes] = motor
+            return motor
+
+        df = cargar_resultados(fuentes)
+        nuevas = filas_agregadas(fuentes, motor.version) if motor is not None else None
+        if nuevas is not None:
+            # Filas de varias fuentes o incrementos: en orden de fecha, como
+            # quedan en los resultados unificados
+            nuevas = nuevas.sort_values('fecha', kind='stable')
+        if nuevas is not None and os.path.exists(ruta_alertas) and motor.en_orden(nuevas):
+            _escribir_alertas(motor.procesar(nuevas), ruta_alertas, agregar=True)
+        else:
+            motor = MotorAlertas()
+            _escribir_alertas(motor.procesar(df), ruta_alertas, agregar=False)
+        motor.version = version
+        _escribir_estado(motor, ruta_estado)
+        _cache[fuentes] = motor
+        return motor
+
+
+# Últimas alertas del registro (las más recientes primero)
+def ultimas_alertas(n=20, ruta_alertas=RUTA_ALERTAS):
+    try:
+        with open(ruta_alertas, encoding='utf-8') as f:
+            lineas = deque(f, maxlen=n)
+    except (FileNotFoundError, OSError):
+        return []
+    return [json.loads(linea) for linea in reversed(lineas) if linea.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocesa los resultados y genera el registro de alertas")
+    parser.add_argument('-n', type=int, default=20, help="Alertas a mostrar")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(RUTA_ESTADO_ALERTAS):
+        os.remove(RUTA_ESTADO_ALERTAS)
+    actualizar_alertas()
+    for alerta in ultimas_alertas(args.n):
+        print(f"{alerta['fecha']}  {alerta['wellboat']:<20} {alerta['regla']:<32} {alerta['detalle']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Indicadores de positividad por wellboat para toda la flota
+#
+# Todas las embarcaciones se procesan juntas: las filas se ordenan por
+# (código de wellboat, fecha) y las ventanas móviles, rachas y últimos
+# positivos se calculan con sumas acumuladas y búsquedas binarias sobre una
+# clave compuesta, sin recorrer embarcación por embarcación.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catenella.datos import FUENTES_RESULTADOS, cargar_resultados, version_datos
+
+POSITIVO = 'POSITIVO'
+VENTANAS = (7, 30)
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _acumular(valores):
+    return np.maximum.accumulate(valores) if len(valores) else valores
+
+
+class AnaliticaFlota:
+    def __init__(self, df, version=''):
+        self.version = version
+
+        wellboat = df['wellboat'].astype('category')
+        self.wellboats = [str(w) for w in wellboat.cat.categories]
+        codigos = wellboat.cat.codes.to_numpy().astype(np.int64)
+        dias = df['fecha'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+        # Orden por embarcación y, dentro de cada una, por fecha
+        orden = np.lexsort((dias, codigos))
+        orden = orden[codigos[orden] >= 0]
+        self._codigos = codigos[orden]
+        self._dias = dias[orden]
+        self._positivo = (df['resultado'].astype(str).to_numpy() == POSITIVO)[orden]
+
+        # Clave compuesta creciente: (código, día) -> código * paso + día relativo
+        self._origen = int(self._dias.min()) if len(self._dias) else 0
+        self._ultimo_relativo = int(self._dias.max()) - self._origen if len(self._dias) else 0
+        self._paso = self._ultimo_relativo + 3
+        self._clave = self._claves(self._codigos, self._dias)
+        self._acumulado = np.r_[0, np.cumsum(self._positivo)]
+
+        n = len(self.wellboats)
+        self._inicio = np.searchsorted(self._codigos, np.arange(n), 'left')
+        self._fin = np.searchsorted(self._codigos, np.arange(n), 'right')
+        self.ultimo_dia = int(self._dias.max()) if len(self._dias) else None
+
+        # Por fila: racha de positivos que termina en ella, racha máxima de la
+        # embarcación hasta ella y posición de su último positivo (-1 si no hay)
+        posiciones = np.arange(len(self._positivo))
+        nueva = np.r_[True, self._codigos[1:] != self._codigos[:-1]][:len(posiciones)]
+        corte = np.where(~self._positivo, posiciones, np.where(nueva, posiciones - 1, -1))
+        self._racha = np.where(self._positivo, posiciones - _acumular(corte), 0)
+        # El desplazamiento por código evita que el máximo pase de una embarcación a otra
+        desplazamiento = self._codigos * (len(posiciones) + 1)
+        self._racha_maxima = _acumular(self._racha + desplazamiento) - desplazamiento
+        ultimo = _acumular(np.where(self._positivo | nueva, posiciones, -1))
+        self._ultimo_positivo = np.where(self._positivo[ultimo], ultimo, -1)
+        self._tablas = {}
+
+    # Días fuera del rango de los datos se llevan a uno antes del primero o uno
+    # después del último, así la clave nunca invade la de otra embarcación
+    def _claves(self, codigos, dias):
+        relativos = np.clip(np.asarray(dias, dtype=np.int64) - self._origen, -1, self._ultimo_relativo + 1)
+        return codigos * self._paso + relativos
+
+    # Muestras y positivos de cada consulta (código, día) en los `ventana`
+    # días que terminan en ese día inclusive
+    def _ventana(self, codigos, dias, ventana):
+        fin = np.searchsorted(self._clave, self._claves(codigos, dias), 'right')
+        inicio = np.searchsorted(self._clave, self._claves(codigos, dias - ventana + 1), 'left')
+        return fin - inicio, self._acumulado[fin] - self._acumulado[inicio]
+
+    # Tabla de la flota a la fecha de referencia (por defecto, la última muestra)
+    def tabla(self, referencia=None):
+        if referencia is None:
+            dia = self.ultimo_dia if self.ultimo_dia is not None else 0
+        else:
+            dia = int(np.datetime64(pd.Timestamp(referencia).date(), 'D').astype(np.int64))
+        tabla = self._tablas.get(dia)
+        if tabla is not None:
+            return tabla
+
+        codigos = np.arange(len(self.wellboats))
+        # Última fila de cada embarcación hasta la fecha de referencia
+        fin = np.searchsorted(self._clave, self._claves(codigos, dia), 'right')
+        con_datos = fin > self._inicio
+        ultima = np.where(con_datos, fin - 1, 0)
+
+        columnas = {
+            'wellboat': self.wellboats,
+            'muestras': fin - self._inicio,
+            'positivos': self._acumulado[fin] - self._acumulado[self._inicio],
+        }
+        for ventana in VENTANAS:
+            total, positivos = self._ventana(codigos, dia, ventana)
+            columnas[f'muestras_{ventana}d'] = total
+            with np.errstate(invalid='ignore', divide='ignore'):
+                columnas[f'positividad_{ventana}d'] = np.where(total > 0, positivos / total, np.nan)
+
+        if len(self._dias):
+            columnas['racha_actual'] = self._racha[ultima]
+            columnas['racha_maxima'] = self._racha_maxima[ultima]
+            fila_positivo = self._ultimo_positivo[ultima]
+            columnas['dias_desde_positivo'] = pd.array(
+                np.where(fila_positivo >= 0, dia - self._dias[fila_positivo], 0), dtype='Int64')
+            columnas['dias_desde_positivo'][fila_positivo < 0] = pd.NA
+            columnas['ultima_muestra'] = self._dias[ultima].astype('datetime64[D]')
+
+        tabla = pd.DataFrame(columnas)[con_datos]
+        tabla = tabla.sort_values(['positividad_30d', 'positividad_7d', 'muestras'],
+                                  ascending=False, na_position='last').reset_index(drop=True)
+        self._tablas[dia] = tabla
+        return tabla
+
+    # Positividad móvil en cada muestra de una embarcación
+    def serie(self, wellboat):
+        c = self.wellboats.index(wellboat)
+        a, b = self._inicio[c], self._fin[c]
+        dias = self._dias[a:b]
+        serie = {'fecha': dias.astype('datetime64[D]')}
+        for ventana in VENTANAS:
+            total, positivos = self._ventana(np.full(b - a, c), dias, ventana)
+            serie[f'positividad_{ventana}d'] = positivos / total
+        return pd.DataFrame(serie).drop_duplicates('fecha', keep='last')
+
+
+# Analítica de la versión actual de los datos, cacheada en el proceso
+def analitica_flota(fuentes=FUENTES_RESULTADOS):
+    fuentes = tuple(fuentes)
+    version = version_datos(fuentes)
+    with _lock:
+        en_cache = _cache.get(fuentes)
+        if en_cache is not None and en_cache.version == version:
+            return en_cache
+
+        analitica = AnaliticaFlota(cargar_resultados(fuentes), version)
+        _cache[fuentes] = analitica
+        return analitica
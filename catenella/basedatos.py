@@ -0,0 +1,233 @@
+# Backend opcional en base de datos embebida (SQLite o DuckDB)
+#
+# Guarda los resultados en un archivo local (resultados.sqlite o
+# resultados.duckdb) con índices por fecha, wellboat y año/mes, y calcula los
+# conteos mensuales dentro del motor: a Python solo vuelve la tabla agregada.
+# Se activa en el dashboard con la variable de entorno CATENELLA_BD=sqlite
+# (o duckdb, si el paquete está instalado). Si a los datos solo se les
+# agregaron filas, se insertan esas filas en lugar de reconstruir la base.
+#
+# Uso:  python -m catenella.basedatos [--motor sqlite|duckdb]   (reconstruir)
+import argparse
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catenella.datos import (FUENTES_RESULTADOS, MESES_NOMBRES, RAIZ, cargar_resultados, filas_agregadas,
+                             liberar_resultados, resultados_en_memoria, version_datos)
+
+MOTORES = ('sqlite', 'duckdb')
+
+_ESQUEMA = [
+    """CREATE TABLE resultados (
+        fecha TEXT NOT NULL,
+        año INTEGER NOT NULL,
+        mes INTEGER NOT NULL,
+        dia INTEGER NOT NULL,
+        resultado TEXT NOT NULL,
+        wellboat TEXT NOT NULL
+    )""",
+    "CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)",
+]
+
+_INDICES = [
+    "CREATE INDEX idx_resultados_fecha ON resultados (fecha)",
+    "CREATE INDEX idx_resultados_wellboat ON resultados (wellboat, fecha)",
+    # Índice cubriente para los conteos mensuales por año
+    "CREATE INDEX idx_resultados_año_mes ON resultados (año, mes, resultado, wellboat)",
+]
+
+_lock = threading.Lock()
+_bases = {}
+
+
+def ruta_base(motor='sqlite'):
+    return os.path.join(RAIZ, f'resultados.{motor}')
+
+
+def _conectar(ruta, motor):
+    if motor == 'duckdb':
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("Para usar el backend DuckDB se necesita el paquete 'duckdb' (pip install duckdb)")
+        return duckdb.connect(ruta)
+    return sqlite3.connect(ruta, check_same_thread=False)
+
+
+def _version_guardada(con):
+    try:
+        fila = con.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+    except Exception:
+        return None
+    return fila[0] if fila else None
+
+
+# Filas de resultados en el formato de la tabla
+def _filas_tabla(df):
+    return pd.DataFrame({
+        'fecha': df['fecha'].dt.strftime('%Y-%m-%d'),
+        'año': df['año'].astype(int),
+        'mes': df['mes'].astype(int),
+        'dia': df['dia'].astype(int),
+        'resultado': df['resultado'].astype(str),
+        'wellboat': df['wellboat'].astype(str),
+    })
+
+
+def _insertar(con, motor, df):
+    filas = _filas_tabla(df)
+    if motor == 'duckdb':
+        con.register('filas_nuevas', filas)
+        con.execute("INSERT INTO resultados SELECT * FROM filas_nuevas")
+        con.unregister('filas_nuevas')
+    else:
+        con.executemany("INSERT INTO resultados VALUES (?, ?, ?, ?, ?, ?)",
+                        filas.itertuples(index=False, name=None))
+
+
+# Reconstruir la base desde los resultados (en un archivo temporal que luego
+# reemplaza al anterior, para no dejar lectores con una base a medias)
+def construir_base(fuentes=FUENTES_RESULTADOS, motor='sqlite', ruta=None):
+    ruta = ruta or ruta_base(motor)
+    version = version_datos(fuentes)
+    df = cargar_resultados(fuentes)
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+    con = _conectar(temporal, motor)
+    try:
+        for sentencia in _ESQUEMA:
+            con.execute(sentencia)
+        _insertar(con, motor, df)
+        for sentencia in _INDICES:
+            con.execute(sentencia)
+        con.execute("INSERT INTO meta VALUES ('version', ?)", [version])
+        if motor == 'sqlite':
+            con.execute("ANALYZE")
+        con.commit()
+    finally:
+        con.close()
+    os.replace(temporal, ruta)
+    return ruta
+
+
+# Agregar filas nuevas a una base existente y marcarla con la nueva versión,
+# todo en una sola transacción
+def agregar_filas(ruta, motor, df, version):
+    con = _conectar(ruta, motor)
+    try:
+        if motor == 'duckdb':
+            con.execute("BEGIN TRANSACTION")
+        if len(df):
+            _insertar(con, motor, df)
+        con.execute("UPDATE meta SET valor = ? WHERE clave = 'version'", [version])
+        con.commit()
+    finally:
+        con.close()
+
+
+class BaseResultados:
+    def __init__(self, ruta, motor='sqlite', version=''):
+        self.ruta = ruta
+        self.motor = motor
+        self.version = version
+        self._local = threading.local()
+        self._tablas = {}
+
+        # Datos chicos que el dashboard consulta en cada rerun
+        self.años = [int(f[0]) for f in self._consultar("SELECT DISTINCT año FROM resultados ORDER BY año")]
+        self.resultados = [f[0] for f in self._consultar("SELECT DISTINCT resultado FROM resultados ORDER BY resultado")]
+        self.wellboats = [f[0] for f in self._consultar("SELECT DISTINCT wellboat FROM resultados ORDER BY wellboat")]
+
+    # Una conexión por hilo (cada sesión de Streamlit corre en su propio hilo)
+    def _conexion(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = _conectar(self.ruta, self.motor)
+            self._local.con = con
+        return con
+
+    def _consultar(self, sql, parametros=()):
+        return self._conexion().execute(sql, list(parametros)).fetchall()
+
+    # Tabla mes × resultado para un año (y opcionalmente un wellboat),
+    # agregada dentro del motor; misma forma que CuboMensual.conteo_mensual
+    def conteo_mensual(self, año, wellboat=None):
+        clave = (int(año), wellboat)
+        tabla = self._tablas.get(clave)
+        if tabla is not None:
+            return tabla
+
+        sql = "SELECT mes, resultado, COUNT(*) FROM resultados WHERE año = ?"
+        parametros = [int(año)]
+        if wellboat is not None:
+            sql += " AND wellboat = ?"
+            parametros.append(wellboat)
+        sql += " GROUP BY mes, resultado"
+
+        valores = np.zeros((12, len(self.resultados)), dtype=np.int64)
+        columna = {r: i for i, r in enumerate(self.resultados)}
+        for mes, resultado, n in self._consultar(sql, parametros):
+            valores[int(mes) - 1, columna[resultado]] = n
+
+        tabla = pd.DataFrame(
+            valores,
+            index=pd.Index(list(MESES_NOMBRES.values()), name='nombre_mes'),
+            columns=pd.Index(self.resultados, name='resultado'),
+        )
+        self._tablas[clave] = tabla
+        return tabla
+
+
+# Base de la versión actual de los datos; se reconstruye si quedó desactualizada
+def base_resultados(motor='sqlite', fuentes=FUENTES_RESULTADOS, ruta=None):
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido {motor!r}; opciones: {', '.join(MOTORES)}")
+    fuentes = tuple(fuentes)
+    ruta = ruta or ruta_base(motor)
+    version = version_datos(fuentes)
+    with _lock:
+        base = _bases.get((motor, fuentes, ruta))
+        if base is not None and base.version == version:
+            return base
+
+        guardada = None
+        if os.path.exists(ruta):
+            con = _conectar(ruta, motor)
+            try:
+                guardada = _version_guardada(con)
+            finally:
+                con.close()
+        if guardada != version:
+            retenidos = resultados_en_memoria(fuentes)
+            cargar_resultados(fuentes)
+            nuevas = filas_agregadas(fuentes, guardada) if guardada is not None else None
+            if nuevas is not None:
+                agregar_filas(ruta, motor, nuevas, version)
+            else:
+                construir_base(fuentes, motor, ruta)
+            # Los conteos salen de la base: si nadie más tenía los resultados
+            # en memoria, no se retienen solo para actualizarla
+            if not retenidos:
+                liberar_resultados(fuentes)
+
+        base = BaseResultados(ruta, motor, version)
+        _bases[(motor, fuentes, ruta)] = base
+        return base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruye la base embebida de resultados")
+    parser.add_argument('--motor', choices=MOTORES, default='sqlite')
+    args = parser.parse_args(argv)
+    ruta = construir_base(FUENTES_RESULTADOS, args.motor)
+    print(f"Base {args.motor} reconstruida en {ruta}")
+
+
+if __name__ == '__main__':
+    main()
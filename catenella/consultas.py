@@ -0,0 +1,107 @@
+# Consultas por rango de fechas y wellboat sobre los resultados ordenados
+#
+# Los resultados vienen ordenados por fecha desde el almacén, así que un rango
+# de fechas se resuelve con dos búsquedas binarias. Para filtrar por wellboat
+# se guarda, por embarcación, la lista de sus filas (también ordenada por
+# fecha), de modo que el costo crece con el tamaño del resultado y no con el
+# de la tabla.
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from catenella.datos import FUENTES_RESULTADOS, cargar_resultados, version_datos
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _dia(valor):
+    return np.datetime64(pd.Timestamp(valor).date(), 'D')
+
+
+class IndiceResultados:
+    def __init__(self, df, version=''):
+        if not df['fecha'].is_monotonic_increasing:
+            df = df.sort_values('fecha', kind='stable').reset_index(drop=True)
+        self.df = df
+        self.version = version
+        self.fechas = df['fecha'].to_numpy()
+
+        # Filas de cada wellboat, contiguas y en orden de fecha:
+        # filas_wellboat[inicio[c]:inicio[c + 1]] son las filas del código c
+        wellboat = df['wellboat'].astype('category')
+        codigos = wellboat.cat.codes.to_numpy()
+        self.wellboats = [str(w) for w in wellboat.cat.categories]
+        self._codigo = {w: c for c, w in enumerate(self.wellboats)}
+        self._filas_wellboat = np.argsort(codigos, kind='stable')
+        self._fechas_wellboat = self.fechas[self._filas_wellboat]
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(self.wellboats))
+        self._inicio = np.r_[0, np.cumsum(conteos)]
+
+    def __len__(self):
+        return len(self.df)
+
+    # Límites [desde, hasta] como instantes; hasta incluye el día completo
+    def _limites(self, desde, hasta):
+        inicio = self.fechas.dtype.type(_dia(desde)) if desde is not None else None
+        fin = self.fechas.dtype.type(_dia(hasta) + np.timedelta64(1, 'D')) if hasta is not None else None
+        return inicio, fin
+
+    # Posiciones (ordenadas por fecha) de las filas que cumplen los filtros
+    def filas(self, desde=None, hasta=None, wellboats=None):
+        inicio, fin = self._limites(desde, hasta)
+
+        if wellboats is None:
+            i = 0 if inicio is None else np.searchsorted(self.fechas, inicio, 'left')
+            j = len(self.fechas) if fin is None else np.searchsorted(self.fechas, fin, 'left')
+            return np.arange(i, j)
+
+        partes = []
+        for wellboat in wellboats:
+            c = self._codigo.get(wellboat)
+            if c is None:
+                continue
+            a, b = self._inicio[c], self._inicio[c + 1]
+            fechas = self._fechas_wellboat[a:b]
+            i = 0 if inicio is None else np.searchsorted(fechas, inicio, 'left')
+            j = len(fechas) if fin is None else np.searchsorted(fechas, fin, 'left')
+            partes.append(self._filas_wellboat[a + i:a + j])
+        if not partes:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(partes), kind='stable')
+
+    def consultar(self, desde=None, hasta=None, wellboats=None):
+        return self.df.iloc[self.filas(desde, hasta, wellboats)]
+
+    # Muestras de los últimos n días hasta la fecha de referencia (hoy por defecto)
+    def ultimos_dias(self, dias, wellboats=None, referencia=None):
+        referencia = pd.Timestamp(referencia or date.today()).date()
+        return self.consultar(referencia - timedelta(days=dias - 1), referencia, wellboats)
+
+    # Muestras de una temporada que cruza el año, p. ej. diciembre a marzo.
+    # La temporada se identifica por el año en que termina.
+    def temporada(self, año, mes_inicio=12, mes_fin=3, wellboats=None):
+        año_inicio = año - 1 if mes_inicio > mes_fin else año
+        desde = date(año_inicio, mes_inicio, 1)
+        hasta = (pd.Timestamp(año, mes_fin, 1) + pd.offsets.MonthEnd(0)).date()
+        return self.consultar(desde, hasta, wellboats)
+
+    # Conteo por resultado de un subconjunto de filas
+    def conteo_resultados(self, filas):
+        return self.df['resultado'].iloc[filas].value_counts().sort_index()
+
+
+# Índice de la versión actual de los datos, cacheado en el proceso
+def indice_resultados(fuentes=FUENTES_RESULTADOS):
+    fuentes = tuple(fuentes)
+    version = version_datos(fuentes)
+    with _lock:
+        en_cache = _cache.get(fuentes)
+        if en_cache is not None and en_cache.version == version:
+            return en_cache
+
+        indice = IndiceResultados(cargar_resultados(fuentes), version)
+        _cache[fuentes] = indice
+        return indice
@@ -0,0 +1,150 @@
+# Carga de los resultados de laboratorio
+#
+# Las fuentes (plotly_resultados.csv y plotly_resultados.txt) se parsean una
+# sola vez: el resultado unificado se guarda en un almacén Parquet ordenado
+# por fecha (resultados.parquet) y se mantiene en memoria mientras ninguna
+# fuente cambie (misma fecha de modificación y mismo tamaño). Si una fuente
+# solo creció, se parsean únicamente sus líneas nuevas (ver incremental.py).
+import os
+import threading
+
+import pandas as pd
+
+from catenella import RAIZ
+from catenella.incremental import actualizar, estado_fuente
+from catenella.ingesta import escribir_almacen, leer_almacen_con_estado, leer_fuente, unificar
+from catenella.instrumentacion import etapa
+
+RUTA_RESULTADOS = os.path.join(RAIZ, 'plotly_resultados.csv')
+RUTA_RESULTADOS_TXT = os.path.join(RAIZ, 'plotly_resultados.txt')
+FUENTES_RESULTADOS = (RUTA_RESULTADOS, RUTA_RESULTADOS_TXT)
+RUTA_ALMACEN = os.path.join(RAIZ, 'resultados.parquet')
+
+# Mapear meses numéricos a nombres
+MESES_NOMBRES = {
+    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril',
+    5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto',
+    9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
+}
+
+# Caché en memoria del proceso: fuentes -> (versión, DataFrame, estado de las fuentes)
+_cache = {}
+_lock = threading.Lock()
+
+# Últimos incrementos aplicados: fuentes -> [(versión anterior, versión nueva, filas nuevas)]
+# para que los agregados derivados (cubo, base embebida) se actualicen sumando
+# solo esas filas
+_historial = {}
+MAX_HISTORIAL = 16
+
+
+# Versión del esquema en memoria; al cambiarla se invalidan los archivos
+# derivados (Parquet, cubo) generados con un esquema anterior
+VERSION_ESQUEMA = 3
+
+
+# Versión de un archivo: cambia si se reescribe o se le agregan filas
+def version_archivo(ruta):
+    info = os.stat(ruta)
+    return f"{info.st_mtime_ns}-{info.st_size}"
+
+
+# Fuentes que existen en disco (sin ninguna, no hay datos que cargar)
+def fuentes_existentes(fuentes=FUENTES_RESULTADOS):
+    existentes = [ruta for ruta in fuentes if os.path.exists(ruta)]
+    if not existentes:
+        raise FileNotFoundError(f"No se encontró ninguna fuente de datos: {', '.join(fuentes)}")
+    return existentes
+
+
+# Versión conjunta de los datos: esquema + versión de cada fuente existente
+def version_datos(fuentes=FUENTES_RESULTADOS):
+    partes = [f"v{VERSION_ESQUEMA}"]
+    for ruta in fuentes_existentes(fuentes):
+        partes.append(f"{os.path.basename(ruta)}:{version_archivo(ruta)}")
+    return '|'.join(partes)
+
+
+# Devuelve los resultados unificados, parseando las fuentes solo si cambiaron
+# (y, si solo crecieron, únicamente lo agregado).
+# El DataFrame devuelto es compartido: no debe modificarse en el lugar.
+def cargar_resultados(fuentes=FUENTES_RESULTADOS, almacen=RUTA_ALMACEN):
+    fuentes = tuple(fuentes)
+    version = version_datos(fuentes)
+    with _lock:
+        en_cache = _cache.get(fuentes)
+        if en_cache is not None and en_cache[0] == version:
+            return en_cache[1]
+
+        # Punto de partida: lo que hay en memoria o, si no, el almacén en disco
+        if en_cache is None:
+            with etapa('almacen'):
+                base = leer_almacen_con_estado(almacen)
+        else:
+            base = en_cache
+        if base is not None and base[0] == version:
+            _cache[fuentes] = base
+            return base[1]
+
+        actualizado = None
+        if base is not None and _esquema(base[0]) == _esquema(version):
+            with etapa('incremental'):
+                actualizado = actualizar(base[1], base[2], fuentes_existentes(fuentes))
+
+        if actualizado is not None:
+            df, nuevas, estado = actualizado
+            historial = _historial.setdefault(fuentes, [])
+            historial.append((base[0], version, nuevas))
+            del historial[:-MAX_HISTORIAL]
+        else:
+            rutas = fuentes_existentes(fuentes)
+            leidas = [leer_fuente(ruta) for ruta in rutas]
+            with etapa('unificar'):
+                df = unificar(leidas)
+            estado = {os.path.basename(ruta): estado_fuente(ruta, leida) for ruta, leida in zip(rutas, leidas)}
+            _historial.pop(fuentes, None)
+
+        with etapa('escribir_almacen'):
+            escribir_almacen(df, almacen, version, estado)
+        _cache[fuentes] = (version, df, estado)
+        return df
+
+
+# ¿Están en memoria los resultados de `fuentes`?
+def resultados_en_memoria(fuentes=FUENTES_RESULTADOS):
+    with _lock:
+        return tuple(fuentes) in _cache
+
+
+# Quitar de la memoria los resultados de `fuentes`; quedan en el almacén
+# Parquet y la próxima carga parte de ahí. Los incrementos ya registrados se
+# conservan para filas_agregadas.
+def liberar_resultados(fuentes=FUENTES_RESULTADOS):
+    with _lock:
+        _cache.pop(tuple(fuentes), None)
+
+
+def _esquema(version):
+    return version.split('|', 1)[0]
+
+
+# Filas agregadas a los resultados desde la versión `desde` hasta la cargada
+# en memoria, o None si no se llega a ella solo con incrementos (en cuyo caso
+# los agregados derivados deben reconstruirse)
+def filas_agregadas(fuentes, desde):
+    fuentes = tuple(fuentes)
+    with _lock:
+        en_cache = _cache.get(fuentes)
+        if en_cache is None:
+            return None
+        partes = []
+        version = desde
+        for anterior, nueva, filas in _historial.get(fuentes, []):
+            if anterior == version:
+                partes.append(filas)
+                version = nueva
+        if version != en_cache[0]:
+            return None
+        if not partes:
+            return en_cache[1].iloc[:0]
+        return pd.concat(partes, ignore_index=True)
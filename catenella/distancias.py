@@ -0,0 +1,237 @@
+# Distancias al borde del área restringida y a la línea de cierre de compuertas
+#
+# Las coordenadas se llevan a un plano local en metros: una proyección
+# equirectangular tangente en el centro del área, con los radios de curvatura
+# del elipsoide WGS84 a esa latitud (~43.6°S). Hasta un grado del área el
+# error frente a la distancia geodésica es menor a 0.5 % (típicamente 0.1 %).
+#
+# La distancia al borde es la mínima a los segmentos de los anillos del
+# polígono. Se recorre segmento por segmento sobre todos los puntos a la vez,
+# guardando el mínimo y el segmento que lo da, así la memoria crece con el
+# número de puntos y no con puntos × segmentos.
+#
+# Con un registro de zonas (DistanciasZonas) la distancia al borde se mide a
+# la zona que contiene cada punto o, si no está en ninguna, a la zona vigente
+# más cercana, que se informa en 'zona_borde'.
+import math
+import threading
+
+import numpy as np
+import shapely
+
+from catenella.geometria import cierre_compuertas_lat, polygon
+
+METROS_POR_MILLA = 1852.0
+
+# Elipsoide WGS84
+_SEMIEJE = 6378137.0
+_EXCENTRICIDAD2 = 6.69437999014e-3
+
+
+# Metros por grado de latitud y de longitud a la latitud dada
+def metros_por_grado(lat):
+    phi = math.radians(lat)
+    w = 1 - _EXCENTRICIDAD2 * math.sin(phi) ** 2
+    meridiano = _SEMIEJE * (1 - _EXCENTRICIDAD2) / w ** 1.5
+    normal = _SEMIEJE / math.sqrt(w)
+    return math.radians(1) * meridiano, math.radians(1) * normal * math.cos(phi)
+
+
+def a_millas(metros):
+    return metros / METROS_POR_MILLA
+
+
+class ProyeccionLocal:
+    def __init__(self, lat0, lng0):
+        self.lat0 = lat0
+        self.lng0 = lng0
+        self.m_lat, self.m_lng = metros_por_grado(lat0)
+
+    def proyectar(self, lng, lat):
+        x = (np.asarray(lng, dtype=float) - self.lng0) * self.m_lng
+        y = (np.asarray(lat, dtype=float) - self.lat0) * self.m_lat
+        return x, y
+
+
+# Segmentos de todos los anillos (exteriores e interiores) de la geometría,
+# como filas (lng inicial, lat inicial, lng final, lat final)
+def segmentos(geometria):
+    filas = []
+    for parte in getattr(geometria, 'geoms', [geometria]):
+        for anillo in [parte.exterior, *parte.interiors]:
+            c = np.asarray(anillo.coords)
+            filas.append(np.column_stack([c[:-1], c[1:]]))
+    return np.concatenate(filas)
+
+
+class Distancias:
+    def __init__(self, geometria=polygon, lat_cierre=cierre_compuertas_lat):
+        centro = geometria.centroid
+        self.proyeccion = ProyeccionLocal(centro.y, centro.x)
+        self.segmentos = segmentos(geometria)
+
+        # Segmentos en el plano: origen y dirección
+        self._ax, self._ay = self.proyeccion.proyectar(self.segmentos[:, 0], self.segmentos[:, 1])
+        bx, by = self.proyeccion.proyectar(self.segmentos[:, 2], self.segmentos[:, 3])
+        self._dx, self._dy = bx - self._ax, by - self._ay
+        self._largo2 = self._dx ** 2 + self._dy ** 2
+        self._y_cierre = float(self.proyeccion.proyectar(0.0, lat_cierre)[1])
+
+    # Distancia en metros de cada punto al borde del polígono y, con
+    # `con_segmento`, el índice del segmento más cercano. Los puntos con
+    # coordenadas no finitas (NaN, infinito) quedan con distancia NaN y
+    # segmento -1.
+    def al_borde(self, lng, lat, con_segmento=False):
+        x, y = self.proyeccion.proyectar(np.ravel(lng), np.ravel(lat))
+        invalidos = ~(np.isfinite(x) & np.isfinite(y))
+        if invalidos.any():
+            x = np.where(invalidos, 0.0, x)
+            y = np.where(invalidos, 0.0, y)
+        minimo = np.full(len(x), np.inf)
+        cercano = np.zeros(len(x), dtype=np.int64)
+        for i in range(len(self.segmentos)):
+            px = x - self._ax[i]
+            py = y - self._ay[i]
+            # Parámetro de la proyección del punto sobre el segmento, en [0, 1]
+            if self._largo2[i] > 0:
+                t = np.clip((px * self._dx[i] + py * self._dy[i]) / self._largo2[i], 0, 1)
+                px -= t * self._dx[i]
+                py -= t * self._dy[i]
+            d2 = px * px + py * py
+            menor = d2 < minimo
+            minimo = np.where(menor, d2, minimo)
+            cercano[menor] = i
+        distancia = np.sqrt(minimo)
+        if invalidos.any():
+            distancia[invalidos] = np.nan
+            cercano[invalidos] = -1
+        return (distancia, cercano) if con_segmento else distancia
+
+    # Distancia en metros (por el meridiano) a la línea de cierre de
+    # compuertas (NaN para latitudes no finitas)
+    def al_cierre(self, lat):
+        distancia = np.abs(self.proyeccion.proyectar(0.0, np.ravel(lat))[1] - self._y_cierre)
+        distancia[~np.isfinite(distancia)] = np.nan
+        return distancia
+
+    # Extremos (lat, lng) de un segmento del borde
+    def extremos(self, segmento):
+        lng0, lat0, lng1, lat1 = self.segmentos[segmento]
+        return (float(lat0), float(lng0)), (float(lat1), float(lng1))
+
+    # Todas las distancias de un conjunto de puntos, en metros y millas náuticas
+    def tabla(self, lng, lat):
+        borde, segmento = self.al_borde(lng, lat, con_segmento=True)
+        cierre = self.al_cierre(lat)
+        return {
+            'distancia_borde_m': borde,
+            'distancia_borde_mn': a_millas(borde),
+            'segmento_borde': segmento,
+            'distancia_cierre_m': cierre,
+            'distancia_cierre_mn': a_millas(cierre),
+        }
+
+
+# Distancias al borde de las zonas de un registro
+class DistanciasZonas:
+    def __init__(self, registro):
+        self.zonas = list(registro.zonas)
+        self.version = registro.version
+        # Zonas en un mismo plano en metros, para elegir la más cercana por
+        # distancia y no por grados (un grado de longitud mide ~0.72 de uno
+        # de latitud a esta latitud); sin zonas no hay a qué medir y todas las
+        # distancias quedan en NaN
+        centros = np.array([[z.geometria.centroid.x, z.geometria.centroid.y] for z in self.zonas]).reshape(-1, 2)
+        if len(centros):
+            self.proyeccion = ProyeccionLocal(centros[:, 1].mean(), centros[:, 0].mean())
+        else:
+            self.proyeccion = ProyeccionLocal(polygon.centroid.y, polygon.centroid.x)
+        self._planas = np.array([
+            shapely.transform(z.geometria, lambda c: np.column_stack(self.proyeccion.proyectar(c[:, 0], c[:, 1])))
+            for z in self.zonas
+        ], dtype=object)
+        self._arbol = shapely.STRtree(self._planas)
+        self._nombres = np.array([z.nombre for z in self.zonas] + [''], dtype=object)
+        # Distancias de cada zona, armadas cuando algún punto la necesita
+        self._por_zona = {}
+
+    def de_zona(self, i):
+        distancias = self._por_zona.get(i)
+        if distancias is None:
+            distancias = Distancias(self.zonas[i].geometria)
+            self._por_zona[i] = distancias
+        return distancias
+
+    # Índice de la zona (vigente en la fecha) que contiene cada punto o, si no
+    # está en ninguna, de la más cercana; -1 sin zonas vigentes o para
+    # coordenadas no finitas
+    def zona_cercana(self, lng, lat, fecha=None):
+        x, y = self.proyeccion.proyectar(np.ravel(lng), np.ravel(lat))
+        cercana = np.full(len(x), -1, dtype=np.int64)
+        validos = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        vigentes = np.array([z.vigente(fecha) for z in self.zonas], dtype=bool)
+        if not len(validos) or not vigentes.any():
+            return cercana
+        if vigentes.all():
+            arbol, indices = self._arbol, np.arange(len(self.zonas))
+        else:
+            indices = np.flatnonzero(vigentes)
+            arbol = shapely.STRtree(self._planas[indices])
+        # Un punto en varias zonas (o a igual distancia de varias) se mide a la
+        # primera del registro, la misma que encabeza nombres_por_punto
+        i_punto, i_zona = arbol.query_nearest(shapely.points(x[validos], y[validos]), all_matches=True)
+        primera = np.full(len(validos), len(self.zonas), dtype=np.int64)
+        np.minimum.at(primera, i_punto, indices[i_zona])
+        cercana[validos] = primera
+        return cercana
+
+    # Extremos (lat, lng) de un segmento del borde de una zona
+    def extremos(self, zona, segmento):
+        return self.de_zona(zona).extremos(segmento)
+
+    # Igual que Distancias.tabla, con la zona a cuyo borde se mide
+    def tabla(self, lng, lat, fecha=None):
+        lng = np.ravel(np.asarray(lng, dtype=float))
+        lat = np.ravel(np.asarray(lat, dtype=float))
+        zona = self.zona_cercana(lng, lat, fecha)
+        borde = np.full(len(lng), np.nan)
+        segmento = np.full(len(lng), -1, dtype=np.int64)
+        for i in np.unique(zona[zona >= 0]):
+            sel = zona == i
+            borde[sel], segmento[sel] = self.de_zona(i).al_borde(lng[sel], lat[sel], con_segmento=True)
+        cierre = distancias_area().al_cierre(lat)
+        return {
+            'zona_borde': self._nombres[zona],
+            'distancia_borde_m': borde,
+            'distancia_borde_mn': a_millas(borde),
+            'segmento_borde': segmento,
+            'distancia_cierre_m': cierre,
+            'distancia_cierre_mn': a_millas(cierre),
+        }
+
+
+_distancias = None
+_por_registro = {}
+_lock = threading.Lock()
+
+
+# Calculador para el área restringida, compartido en el proceso
+def distancias_area():
+    global _distancias
+    if _distancias is None:
+        _distancias = Distancias()
+    return _distancias
+
+
+# Calculador para las zonas de un registro, compartido por versión (un
+# registro sin versión no se guarda)
+def distancias_registro(registro):
+    if not registro.version:
+        return DistanciasZonas(registro)
+    with _lock:
+        distancias = _por_registro.get(registro.version)
+        if distancias is None:
+            distancias = DistanciasZonas(registro)
+            _por_registro.clear()
+            _por_registro[registro.version] = distancias
+        return distancias
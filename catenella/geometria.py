@@ -0,0 +1,87 @@
+# Geometría del área restringida (parque marino Tic-Toc) y conversión de coordenadas
+import hashlib
+import os
+
+import numpy as np
+import shapely
+import shapely.geometry as geom
+
+from catenella import RAIZ
+from catenella.grilla import grilla_zonas
+
+# Grilla del área guardada entre procesos (ver _grilla_area)
+RUTA_GRILLA_AREA = os.path.join(RAIZ, 'area.grilla.npz')
+
+# Definir los puntos de restricción (coordenadas)
+coords = [
+    (-73.114044, -43.435339),
+    (-73.042636, -43.568214),
+    (-73.043861, -43.642142),
+    (-73.058528, -43.734786),
+    (-73.198778, -43.734714),
+    (-73.513663, -43.664611),
+    (-73.428572, -43.440469),
+    (-73.114044, -43.435339)  # Cierra el polígono
+]
+
+# Crear polígono con shapely para intersecciones
+polygon = geom.Polygon(coords)
+
+# Preparar el polígono (índice interno de GEOS) para consultas repetidas
+shapely.prepare(polygon)
+
+
+# Función para convertir grados y minutos decimales a decimal
+def gm_to_decimal(degrees, minutes, direction):
+    decimal = abs(degrees) + abs(minutes) / 60
+    if (direction in ["S", "W"]) or degrees < 0:
+        decimal = -decimal
+    return decimal
+
+
+# Función para convertir grados, minutos y segundos (DMS) a decimal
+def dms_to_decimal(degrees, minutes, seconds, direction):
+    decimal = degrees + minutes / 60 + seconds / 3600
+    if direction in ["S", "W"]:
+        decimal = -decimal
+    return decimal
+
+
+# Versión vectorizada de gm_to_decimal: acepta arreglos de grados y minutos
+# y una dirección común ("S", "W", ...) o un arreglo de direcciones
+def gm_to_decimal_np(degrees, minutes, direction):
+    degrees = np.asarray(degrees, dtype=float)
+    minutes = np.asarray(minutes, dtype=float)
+    decimal = np.abs(degrees) + np.abs(minutes) / 60
+    negativo = np.isin(np.asarray(direction), ["S", "W"]) | (degrees < 0)
+    return np.where(negativo, -decimal, decimal)
+
+
+# Calcular línea de "cierre compuertas"
+cierre_compuertas_lat = gm_to_decimal(43, 34.88, "S")
+
+
+# Grilla de consulta del área (ver grilla.py), cargada en la primera
+# verificación; responde igual que la geometría exacta. Se guarda en
+# area.grilla.npz con un hash de las coordenadas del polígono como versión,
+# así se reconstruye solo si el polígono cambia.
+_grilla = None
+
+
+def _grilla_area():
+    global _grilla
+    if _grilla is None:
+        version = hashlib.sha1(shapely.get_coordinates(polygon).tobytes()).hexdigest()
+        _grilla = grilla_zonas([polygon], version, RUTA_GRILLA_AREA).grillas[0]
+    return _grilla
+
+
+# Indica, para arreglos de longitudes y latitudes, qué puntos están dentro
+# del área restringida (solo los cercanos al borde consultan a GEOS)
+def dentro_de_area(lng, lat):
+    return _grilla_area().contiene(lng, lat)
+
+
+# Indica si un punto (longitud, latitud) está dentro del área restringida
+def punto_en_area(lng, lat):
+    return bool(_grilla_area().contiene_punto(lng, lat))
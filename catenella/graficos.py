@@ -0,0 +1,52 @@
+# Gráficos plotly de los dashboards
+#
+# plotly.express se importa dentro de cada función: importarlo cuesta varios
+# cientos de milisegundos y solo lo pagan los scripts que llegan a dibujar.
+
+
+# Concentración por estación (datos de monitoreo de app_v2/app_v3). Para
+# historiales largos, reducir antes las series al ancho del gráfico con
+# catenella.reduccion.reducir_series.
+def grafico_concentraciones(df):
+    import plotly.express as px
+
+    return px.line(df, x='fecha', y='concentracion', color='estacion', title='Concentración de Alexandrium catenella')
+
+
+# Casos positivos y negativos por mes (conteo mensual del cubo o de la base)
+def grafico_mensual(conteo_mensual):
+    import plotly.express as px
+
+    # Gráfico de barras
+    fig = px.bar(
+        conteo_mensual.reset_index(),
+        x='nombre_mes',
+        y=conteo_mensual.columns,
+        title='Casos Positivos y Negativos por Mes',
+        labels={'nombre_mes': 'Mes', 'value': 'Número de Casos'},
+        barmode='group'
+    )
+
+    # Personalizar el diseño
+    fig.update_layout(
+        xaxis_title='Mes',
+        yaxis_title='Número de Casos',
+        height=400,
+        width=700
+    )
+    return fig
+
+
+# Positividad móvil de una embarcación (serie de AnaliticaFlota)
+def grafico_positividad(serie, wellboat):
+    import plotly.express as px
+
+    fig = px.line(
+        serie,
+        x='fecha',
+        y=['positividad_7d', 'positividad_30d'],
+        labels={'fecha': 'Fecha', 'value': 'Positividad', 'variable': 'Ventana'},
+        title=f'Positividad móvil de {wellboat}'
+    )
+    fig.update_layout(yaxis_tickformat='.0%', height=350)
+    return fig
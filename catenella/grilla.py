@@ -0,0 +1,183 @@
+# Grilla precalculada para verificar puntos en zonas
+#
+# El rectángulo de cada zona se divide en celdas finas marcadas como fuera,
+# dentro o borde. Un punto en una celda dentro/fuera se responde con una
+# lectura del arreglo; solo los puntos en celdas de borde se verifican con la
+# geometría exacta (shapely.contains_xy), así que las respuestas son las
+# mismas que las de la geometría.
+#
+# Las celdas de borde se marcan con margen: se recorre el contorno con pasos
+# de un cuarto de celda y se dilata MARGEN celdas alrededor, lo que cubre las
+# celdas que el contorno toca, las vecinas y los redondeos al calcular la
+# celda de un punto. Una celda que no es de borde queda entera de un lado del
+# contorno y basta clasificar su centro.
+#
+# La grilla del registro de zonas se guarda en zonas.grilla.npz junto a la
+# versión de las zonas y se reconstruye si estas cambian; la del área
+# restringida, en area.grilla.npz con un hash de las coordenadas del polígono.
+import os
+
+import numpy as np
+import shapely
+
+from catenella import RAIZ
+
+FUERA, DENTRO, BORDE = 0, 1, 2
+
+# Celdas a lo largo del lado mayor del rectángulo de cada zona
+RESOLUCION = 1024
+MARGEN = 3
+
+RUTA_GRILLA = os.path.join(RAIZ, 'zonas.grilla.npz')
+
+
+class GrillaZona:
+    def __init__(self, geometria, origen, tamaño, estado):
+        self.geometria = geometria
+        shapely.prepare(geometria)
+        self.x0, self.y0 = float(origen[0]), float(origen[1])
+        self.tamaño = float(tamaño)
+        self.ny, self.nx = estado.shape
+        # Estado con un marco de celdas FUERA, aplanado para las consultas;
+        # `estado` es una vista de su interior, sin una segunda copia
+        marco = np.pad(estado, 1)
+        self._marco = marco.ravel()
+        self.estado = marco[1:-1, 1:-1]
+
+    @classmethod
+    def construir(cls, geometria, resolucion=RESOLUCION):
+        minx, miny, maxx, maxy = geometria.bounds
+        tamaño = max(maxx - minx, maxy - miny) / resolucion
+        # Rectángulo ampliado en MARGEN celdas por lado
+        x0, y0 = minx - MARGEN * tamaño, miny - MARGEN * tamaño
+        nx = int(np.ceil((maxx - minx) / tamaño)) + 2 * MARGEN + 1
+        ny = int(np.ceil((maxy - miny) / tamaño)) + 2 * MARGEN + 1
+
+        # Centros de todas las celdas, clasificados con la geometría exacta
+        cx = x0 + (np.arange(nx) + 0.5) * tamaño
+        cy = y0 + (np.arange(ny) + 0.5) * tamaño
+        estado = shapely.contains_xy(geometria, *np.meshgrid(cx, cy)).astype(np.uint8)
+
+        # Celdas recorridas por el contorno (anillos exteriores e interiores),
+        # dilatadas MARGEN celdas
+        contorno = shapely.get_coordinates(shapely.segmentize(shapely.boundary(geometria), tamaño / 4))
+        ix = np.floor((contorno[:, 0] - x0) / tamaño).astype(np.int64)
+        iy = np.floor((contorno[:, 1] - y0) / tamaño).astype(np.int64)
+        borde = np.zeros((ny + 2 * MARGEN, nx + 2 * MARGEN), dtype=bool)
+        borde[iy + MARGEN, ix + MARGEN] = True
+        dilatado = np.zeros((ny, nx), dtype=bool)
+        for dy in range(-MARGEN, MARGEN + 1):
+            for dx in range(-MARGEN, MARGEN + 1):
+                dilatado |= borde[MARGEN + dy:MARGEN + dy + ny, MARGEN + dx:MARGEN + dx + nx]
+        estado[dilatado] = BORDE
+        return cls(geometria, (x0, y0), tamaño, estado)
+
+    # Estado de la celda de cada punto. Los índices se desplazan una celda y
+    # se acotan al marco, que recibe los puntos fuera del rectángulo y los no
+    # finitos (fmax/fmin descartan NaN); al ser no negativos, truncar equivale
+    # a redondear hacia abajo.
+    def celdas(self, lng, lat):
+        fx = np.fmin(np.fmax((lng - self.x0) / self.tamaño + 1, 0), self.nx + 1).astype(np.int64)
+        fy = np.fmin(np.fmax((lat - self.y0) / self.tamaño + 1, 0), self.ny + 1).astype(np.int64)
+        return self._marco[fy * (self.nx + 2) + fx]
+
+    # Qué puntos están dentro de la zona (mismo resultado que contains_xy)
+    def contiene(self, lng, lat):
+        forma = np.shape(lng)
+        lng = np.asarray(lng, dtype=float).ravel()
+        lat = np.asarray(lat, dtype=float).ravel()
+        estado = self.celdas(lng, lat)
+        dentro = estado == DENTRO
+        borde = np.flatnonzero(estado == BORDE)
+        if len(borde):
+            dentro[borde] = shapely.contains_xy(self.geometria, lng[borde], lat[borde])
+        return dentro.reshape(forma)
+
+    # Versión escalar, sin arreglos intermedios
+    def contiene_punto(self, lng, lat):
+        fx = (lng - self.x0) / self.tamaño
+        fy = (lat - self.y0) / self.tamaño
+        if not (0 <= fx < self.nx and 0 <= fy < self.ny):
+            return False
+        estado = self.estado[int(fy), int(fx)]
+        if estado == BORDE:
+            return bool(shapely.contains_xy(self.geometria, lng, lat))
+        return estado == DENTRO
+
+    # Fracción de celdas de borde (las únicas que consultan la geometría)
+    def fraccion_borde(self):
+        return float((self.estado == BORDE).mean())
+
+
+# Grillas de todas las zonas de un registro, para la versión de sus archivos
+class GrillaZonas:
+    def __init__(self, grillas, version='', resolucion=RESOLUCION):
+        self.grillas = list(grillas)
+        self.version = version
+        self.resolucion = resolucion
+
+    @classmethod
+    def construir(cls, geometrias, version='', resolucion=RESOLUCION):
+        return cls([GrillaZona.construir(g, resolucion) for g in geometrias], version, resolucion)
+
+    # Pares (índice de punto, índice de zona) con cada punto dentro de una
+    # zona, como RegistroZonas.consultar. Recorre las grillas de todas las
+    # zonas (~1 ms por zona cada 100 mil puntos): el registro solo la usa con
+    # pocas zonas (zonas.MAX_ZONAS_GRILLA) y con más recurre al STRtree.
+    def consultar(self, lng, lat):
+        lng = np.asarray(lng, dtype=float).ravel()
+        lat = np.asarray(lat, dtype=float).ravel()
+        i_punto, i_zona = [], []
+        for i, grilla in enumerate(self.grillas):
+            puntos = np.flatnonzero(grilla.contiene(lng, lat))
+            i_punto.append(puntos)
+            i_zona.append(np.full(len(puntos), i, dtype=np.int64))
+        if not i_punto:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.concatenate(i_punto), np.concatenate(i_zona)
+
+    # Índices de las zonas que contienen un punto
+    def zonas_punto(self, lng, lat):
+        return [i for i, grilla in enumerate(self.grillas) if grilla.contiene_punto(lng, lat)]
+
+
+def _leer_grilla(ruta, version, resolucion, geometrias):
+    try:
+        with np.load(ruta) as archivo:
+            if str(archivo['version']) != version or int(archivo['resolucion']) != resolucion:
+                return None
+            if len(archivo['origenes']) != len(geometrias):
+                return None
+            grillas = []
+            for i, geometria in enumerate(geometrias):
+                grillas.append(GrillaZona(geometria, archivo['origenes'][i], archivo['tamaños'][i], archivo[f'estado_{i}']))
+            return GrillaZonas(grillas, version, resolucion)
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        return None
+
+
+def _escribir_grilla(grilla, ruta):
+    temporal = f"{ruta}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez_compressed(
+            temporal,
+            version=np.array(grilla.version),
+            resolucion=np.array(grilla.resolucion),
+            origenes=np.array([(g.x0, g.y0) for g in grilla.grillas], dtype=float).reshape(-1, 2),
+            tamaños=np.array([g.tamaño for g in grilla.grillas], dtype=float),
+            **{f'estado_{i}': g.estado for i, g in enumerate(grilla.grillas)},
+        )
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# Grilla de las geometrías para la versión dada: desde disco si coincide la
+# versión (y la resolución) o, si no, construida y guardada
+def grilla_zonas(geometrias, version, ruta=RUTA_GRILLA, resolucion=RESOLUCION):
+    grilla = _leer_grilla(ruta, version, resolucion, geometrias)
+    if grilla is None:
+        grilla = GrillaZonas.construir(geometrias, version, resolucion)
+        _escribir_grilla(grilla, ruta)
+    return grilla
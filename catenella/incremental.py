@@ -0,0 +1,233 @@
+# Ingesta incremental de resultados agregados al final de las fuentes
+#
+# Por cada fuente se recuerda hasta qué byte se procesó, un hash del comienzo
+# del archivo y otro de los bytes justo antes de ese punto. Si el archivo solo
+# creció (ambos hashes siguen iguales), se parsean únicamente las líneas
+# nuevas y se suman a los resultados ya unificados; si fue reescrito, se
+# recurre a la reconstrucción completa.
+#
+# Para no duplicar muestras presentes en varias fuentes (ver ingesta.unificar)
+# cada fuente guarda además los conteos de sus muestras de los últimos días.
+# Las filas nuevas con fechas anteriores a esa ventana también fuerzan la
+# reconstrucción completa.
+import hashlib
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from catenella.ingesta import _etiquetas_canonicas, armar_esquema, clave_wellboat, leer_csv, leer_txt
+
+# Bytes usados para reconocer el comienzo del archivo y el punto de corte
+BYTES_CABECERA = 65_536
+BYTES_CORTE = 4_096
+
+# Días hacia atrás (desde la muestra más reciente de cada fuente) en que se
+# aceptan filas nuevas por la vía incremental
+DIAS_VENTANA = 31
+
+_MUESTRA = ['fecha', 'resultado', '_clave']
+
+
+def _hash(ruta, desde, hasta):
+    with open(ruta, 'rb') as f:
+        f.seek(desde)
+        return hashlib.sha1(f.read(hasta - desde)).hexdigest()
+
+
+# Conteo de muestras por (fecha, resultado, clave del wellboat)
+def _conteo_muestras(df):
+    wellboat = df['wellboat'].astype('category')
+    claves = clave_wellboat(wellboat.cat.categories)
+    tabla = pd.DataFrame({
+        'fecha': df['fecha'].to_numpy(),
+        'resultado': df['resultado'].astype(str).to_numpy(),
+        '_clave': claves[wellboat.cat.codes.to_numpy()],
+    })
+    return tabla.groupby(_MUESTRA, sort=False).size()
+
+
+def _filas_ventana(conteo):
+    return [[int(pd.Timestamp(f).value // 1_000_000), r, c, int(n)] for (f, r, c), n in conteo.items()]
+
+
+# Ventana de conteos de una fuente: sus muestras de los últimos DIAS_VENTANA
+def _ventana(df):
+    if not len(df):
+        return None, []
+    inicio = df['fecha'].max() - pd.Timedelta(days=DIAS_VENTANA)
+    return int(inicio.value // 1_000_000), _filas_ventana(_conteo_muestras(df[df['fecha'] >= inicio]))
+
+
+def _serie_ventana(filas):
+    if not filas:
+        return pd.Series(dtype=np.int64, index=pd.MultiIndex.from_tuples([], names=_MUESTRA))
+    tabla = pd.DataFrame(filas, columns=_MUESTRA + ['n'])
+    tabla['fecha'] = pd.to_datetime(tabla['fecha'], unit='ms').astype('datetime64[ms]')
+    return tabla.set_index(_MUESTRA)['n']
+
+
+# Estado de una fuente recién parseada completa
+def estado_fuente(ruta, df):
+    tamaño = os.path.getsize(ruta)
+    with open(ruta, 'rb') as f:
+        f.seek(max(tamaño - 1, 0))
+        completo = f.read(1) == b'\n'
+    inicio_ventana, ventana = _ventana(df)
+    return {
+        'procesado': tamaño,
+        # Si la última línea no termina en salto de línea podría completarse
+        # más tarde: en ese caso no se intenta la vía incremental
+        'completo': completo,
+        'cabecera': _hash(ruta, 0, min(tamaño, BYTES_CABECERA)),
+        'corte': _hash(ruta, max(tamaño - BYTES_CORTE, 0), tamaño),
+        'inicio_ventana': inicio_ventana,
+        'ventana': ventana,
+    }
+
+
+# ¿La fuente solo creció desde que se guardó su estado?
+def solo_agregado(ruta, estado):
+    if not estado or not estado.get('completo'):
+        return False
+    procesado = estado['procesado']
+    try:
+        tamaño = os.path.getsize(ruta)
+    except OSError:
+        return False
+    if tamaño < procesado:
+        return False
+    return (_hash(ruta, 0, min(procesado, BYTES_CABECERA)) == estado['cabecera']
+            and _hash(ruta, max(procesado - BYTES_CORTE, 0), procesado) == estado['corte'])
+
+
+# Parsear solo las líneas completas agregadas después de `desde`.
+# Devuelve las filas (esquema compacto) y el nuevo punto de corte.
+def leer_cola(ruta, desde):
+    with open(ruta, 'rb') as f:
+        cabecera = f.readline()
+        f.seek(desde)
+        cola = f.read()
+    fin = cola.rfind(b'\n') + 1
+    cola = cola[:fin]
+    if not cola.strip():
+        return armar_esquema([], [], []), desde + fin
+    texto = io.StringIO(cabecera.decode('utf-8-sig') + cola.decode('utf-8'))
+    df = leer_txt(texto) if b'\t' in cabecera else leer_csv(texto)
+    return df, desde + fin
+
+
+# Filas de `cola` que son muestras nuevas para los resultados unificados `df`.
+# Para cada muestra: nuevas = max(0, conteo en la fuente - conteo unificado),
+# donde el conteo en la fuente es el de su ventana más el de la cola.
+def _filas_nuevas(df, cola, ventana):
+    if not len(cola):
+        return cola
+    desde = cola['fecha'].min()
+    recientes = df.iloc[np.searchsorted(df['fecha'].to_numpy(), desde.to_datetime64(), 'left'):]
+    unificado = _conteo_muestras(recientes)
+
+    conteo_cola = _conteo_muestras(cola)
+    en_fuente = conteo_cola.add(ventana.reindex(conteo_cola.index, fill_value=0), fill_value=0)
+    faltan = (en_fuente - unificado.reindex(conteo_cola.index, fill_value=0)).clip(lower=0)
+
+    # De cada muestra se toman sus últimas `faltan` apariciones en la cola
+    wellboat = cola['wellboat'].astype('category')
+    claves = clave_wellboat(wellboat.cat.categories)
+    muestras = pd.DataFrame({
+        'fecha': cola['fecha'].to_numpy(),
+        'resultado': cola['resultado'].astype(str).to_numpy(),
+        '_clave': claves[wellboat.cat.codes.to_numpy()],
+    })
+    ocurrencia = muestras.groupby(_MUESTRA, sort=False).cumcount().to_numpy()
+    indice = pd.MultiIndex.from_frame(muestras)
+    total = conteo_cola.reindex(indice).to_numpy()
+    tomar = faltan.reindex(indice).to_numpy()
+    return cola[ocurrencia >= total - tomar]
+
+
+# Llevar las etiquetas de wellboat de `nuevas` a las ya usadas en `df`
+# cuando corresponden a la misma embarcación
+def _etiquetas_existentes(df, nuevas):
+    existentes = df['wellboat'].cat.categories.astype(str)
+    por_clave = dict(zip(clave_wellboat(existentes), existentes))
+    wellboat = nuevas['wellboat'].astype('category')
+    etiquetas = wellboat.cat.categories.astype(str)
+    claves = clave_wellboat(etiquetas)
+    canonicas = _etiquetas_canonicas(etiquetas, claves)
+    finales = np.array([por_clave.get(c, e) for c, e in zip(claves, canonicas)], dtype=object)
+    return finales[wellboat.cat.codes.to_numpy()]
+
+
+# Sumar filas nuevas (ya en el esquema compacto) a los resultados unificados
+# manteniendo categorías ordenadas y el orden por fecha
+def combinar(df, nuevas):
+    if not len(nuevas):
+        return df
+    nuevas = nuevas.sort_values('fecha', kind='stable')
+    combinado = pd.DataFrame({
+        col: (union_categoricals([df[col], nuevas[col]], sort_categories=True)
+              if isinstance(df[col].dtype, pd.CategoricalDtype)
+              else np.concatenate([df[col].to_numpy(), nuevas[col].to_numpy()]))
+        for col in df.columns
+    })
+    # Lo habitual es que las filas nuevas sean las más recientes; si no, se
+    # intercalan en su lugar (ambas partes ya están ordenadas) sin reordenar todo
+    if nuevas['fecha'].iloc[0] < df['fecha'].iloc[-1]:
+        posiciones = np.searchsorted(df['fecha'].to_numpy(), nuevas['fecha'].to_numpy(), 'right')
+        orden = np.insert(np.arange(len(df)), posiciones, np.arange(len(df), len(combinado)))
+        combinado = combinado.take(orden).reset_index(drop=True)
+    return combinado
+
+
+# Intentar actualizar `df` con lo agregado a cada fuente desde `estados`.
+# Devuelve (df actualizado, filas nuevas, estados nuevos) o None si alguna
+# fuente fue reescrita y hace falta la reconstrucción completa.
+def actualizar(df, estados, fuentes):
+    nombres = {os.path.basename(ruta): ruta for ruta in fuentes}
+    if set(nombres) != set(estados):
+        return None
+    if not all(solo_agregado(ruta, estados[nombre]) for nombre, ruta in nombres.items()):
+        return None
+
+    estados = dict(estados)
+    agregadas = []
+    for nombre, ruta in nombres.items():
+        estado = estados[nombre]
+        cola, procesado = leer_cola(ruta, estado['procesado'])
+        if procesado == estado['procesado']:
+            continue
+
+        ventana = _serie_ventana(estado['ventana'])
+        if len(cola) and estado['inicio_ventana'] is not None:
+            if cola['fecha'].min().value // 1_000_000 < estado['inicio_ventana']:
+                return None
+
+        nuevas = _filas_nuevas(df, cola, ventana)
+        if len(nuevas):
+            nuevas = armar_esquema(nuevas['resultado'].astype(str), _etiquetas_existentes(df, nuevas), nuevas['fecha'])
+            df = combinar(df, nuevas)
+            agregadas.append(nuevas)
+
+        # Ventana de la fuente: conteos anteriores más los de la cola
+        conteo = ventana.add(_conteo_muestras(cola), fill_value=0).astype(np.int64) if len(cola) else ventana
+        maximo = conteo.index.get_level_values('fecha').max() if len(conteo) else None
+        inicio = maximo - pd.Timedelta(days=DIAS_VENTANA) if maximo is not None else None
+        if inicio is not None:
+            conteo = conteo[conteo.index.get_level_values('fecha') >= inicio]
+        estados[nombre] = {
+            'procesado': procesado,
+            'completo': True,
+            'cabecera': _hash(ruta, 0, min(procesado, BYTES_CABECERA)),
+            'corte': _hash(ruta, max(procesado - BYTES_CORTE, 0), procesado),
+            'inicio_ventana': int(inicio.value // 1_000_000) if inicio is not None else None,
+            'ventana': _filas_ventana(conteo),
+        }
+
+    if not agregadas:
+        return df, df.iloc[:0], estados
+    nuevas = pd.concat(agregadas, ignore_index=True)
+    nuevas = armar_esquema(nuevas['resultado'].astype(str), nuevas['wellboat'].astype(str), nuevas['fecha'])
+    return df, nuevas, estados
@@ -0,0 +1,257 @@
+# Informes mensuales estáticos por año y por wellboat
+#
+# Para cada año genera el gráfico "Casos Positivos y Negativos por Mes" y su
+# tabla resumen, los mismos del dashboard (cortes del cubo mensual y
+# graficos.grafico_mensual), y lo mismo para cada wellboat con resultados ese
+# año:
+#   informes/<año>/mensual.html, .csv y .png
+#   informes/<año>/wellboats/<wellboat>_<hash>.html, .csv y .png
+# (el hash, del nombre original, distingue nombres que se limpian igual, como
+# 'A/B' y 'A B').
+# Los HTML cargan plotly.js desde informes/plotly.min.js (una sola copia). El
+# PNG requiere el paquete kaleido; sin él solo se escriben HTML y CSV.
+#
+# Los informes se reparten entre procesos (ProcessPoolExecutor). Cada proceso
+# arma la figura de plotly una vez y en cada informe solo cambia los datos de
+# las barras y el título, que es mucho más rápido que volver a llamar a
+# plotly.express. La huella de la tabla de cada informe queda en
+# informes/manifiesto.json: si la tabla no cambió y sus archivos existen, no
+# se vuelve a generar, así que con resultados nuevos solo se rehacen los años
+# y wellboats afectados.
+#
+# Uso:  python -m catenella.informes [--salida DIR] [--procesos N] [--forzar] [--sin-png]
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from catenella import RAIZ
+
+RUTA_INFORMES = os.path.join(RAIZ, 'informes')
+MANIFIESTO = 'manifiesto.json'
+PLOTLY_JS = 'plotly.min.js'
+
+TITULO = 'Casos Positivos y Negativos por Mes'
+
+# Cambiarla obliga a regenerar todos los informes (p. ej. si cambia el gráfico)
+VERSION_INFORMES = 1
+
+# Figura por proceso, según las columnas (resultados) de las tablas
+_figuras = {}
+
+
+def png_disponible():
+    return importlib.util.find_spec('kaleido') is not None
+
+
+# Nombre de archivo de un wellboat: el nombre limpio más 8 caracteres del
+# sha1 del original, para que dos nombres distintos no compartan archivo
+def _nombre_archivo(texto):
+    limpio = re.sub(r'[^\w.-]+', '_', str(texto)).strip('_') or 'sin_nombre'
+    return f"{limpio}_{hashlib.sha1(str(texto).encode('utf-8')).hexdigest()[:8]}"
+
+
+# Informes a generar: uno por año y uno por wellboat con resultados ese año
+def tareas_informes(cubo, formatos):
+    import plotly
+
+    tareas = []
+    for i, año in enumerate(cubo.años):
+        unidades = [(None, f'{año}/mensual', f'{TITULO} — {año}')]
+        con_datos = cubo.conteos[i].sum(axis=(0, 1)) > 0
+        for wellboat, hay in zip(cubo.wellboats, con_datos):
+            if hay:
+                unidades.append((wellboat, f'{año}/wellboats/{_nombre_archivo(wellboat)}',
+                                 f'{TITULO} — {año}, {wellboat}'))
+
+        for wellboat, base, titulo in unidades:
+            tabla = cubo.conteo_mensual(año, wellboat)
+            huella = hashlib.sha1()
+            for parte in (VERSION_INFORMES, plotly.__version__, titulo, formatos, list(tabla.columns)):
+                huella.update(repr(parte).encode('utf-8'))
+            huella.update(tabla.to_numpy().tobytes())
+            tareas.append({
+                'base': base,
+                'titulo': titulo,
+                'tabla': tabla,
+                'formatos': formatos,
+                'huella': huella.hexdigest(),
+            })
+    return tareas
+
+
+# Figura del informe: la del dashboard, armada una vez por proceso y con los
+# datos y el título de cada tabla
+def _figura(tabla, titulo):
+    from catenella.graficos import grafico_mensual
+
+    clave = tuple(tabla.columns)
+    fig = _figuras.get(clave)
+    if fig is None:
+        fig = grafico_mensual(tabla)
+        _figuras[clave] = fig
+    else:
+        for traza, columna in zip(fig.data, tabla.columns):
+            traza.y = tabla[columna].to_numpy()
+    fig.update_layout(title_text=titulo)
+    return fig
+
+
+def _iniciar_proceso():
+    import plotly.express  # noqa: F401  (una importación por proceso)
+
+
+# Generar los archivos de un informe; devuelve (base, huella, archivos, error)
+def generar_informe(tarea, salida):
+    base = os.path.join(salida, *tarea['base'].split('/'))
+    archivos = []
+    try:
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        tabla = tarea['tabla']
+        if 'csv' in tarea['formatos']:
+            tabla.to_csv(base + '.csv', sep=';')
+            archivos.append(base + '.csv')
+        fig = _figura(tabla, tarea['titulo'])
+        if 'html' in tarea['formatos']:
+            # Ruta relativa a informes/plotly.min.js
+            niveles = tarea['base'].count('/')
+            fig.write_html(base + '.html', include_plotlyjs='../' * niveles + PLOTLY_JS)
+            archivos.append(base + '.html')
+        if 'png' in tarea['formatos']:
+            fig.write_image(base + '.png')
+            archivos.append(base + '.png')
+    except Exception as e:
+        return tarea['base'], tarea['huella'], archivos, f"{type(e).__name__}: {e}"
+    return tarea['base'], tarea['huella'], [os.path.relpath(a, salida) for a in archivos], None
+
+
+def _generar_lote(tareas, salida):
+    return [generar_informe(tarea, salida) for tarea in tareas]
+
+
+def _leer_manifiesto(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        return {}
+
+
+def _escribir_manifiesto(manifiesto, ruta):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=1, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _escribir_plotly_js(salida):
+    import plotly
+    from plotly.offline import get_plotlyjs
+
+    ruta = os.path.join(salida, PLOTLY_JS)
+    version = os.path.join(salida, PLOTLY_JS + '.version')
+    try:
+        with open(version, encoding='utf-8') as f:
+            if f.read() == plotly.__version__ and os.path.exists(ruta):
+                return
+    except OSError:
+        pass
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+    with open(version, 'w', encoding='utf-8') as f:
+        f.write(plotly.__version__)
+
+
+# Generar los informes de todos los años y wellboats. Devuelve un resumen con
+# los generados, los que no cambiaron y los errores.
+def generar_informes(cubo=None, salida=RUTA_INFORMES, procesos=None, forzar=False, png=None):
+    if cubo is None:
+        from catenella.agregados import cubo_mensual
+        cubo = cubo_mensual()
+    if png is None:
+        png = png_disponible()
+    formatos = ('csv', 'html', 'png') if png else ('csv', 'html')
+    procesos = procesos or os.cpu_count() or 1
+
+    inicio = time.perf_counter()
+    os.makedirs(salida, exist_ok=True)
+    ruta_manifiesto = os.path.join(salida, MANIFIESTO)
+    anterior = {} if forzar else _leer_manifiesto(ruta_manifiesto)
+    _escribir_plotly_js(salida)
+
+    # Solo los informes cuya tabla cambió o a los que les falta un archivo
+    tareas = tareas_informes(cubo, formatos)
+    pendientes = []
+    manifiesto = {}
+    for tarea in tareas:
+        previo = anterior.get(tarea['base'])
+        if (previo is not None and previo['huella'] == tarea['huella']
+                and all(os.path.exists(os.path.join(salida, a)) for a in previo['archivos'])):
+            manifiesto[tarea['base']] = previo
+        else:
+            pendientes.append(tarea)
+
+    # Informes que ya no corresponden (años o wellboats sin datos)
+    vigentes = {tarea['base'] for tarea in tareas}
+    for base, previo in anterior.items():
+        if base not in vigentes:
+            for archivo in previo['archivos']:
+                if os.path.exists(os.path.join(salida, archivo)):
+                    os.remove(os.path.join(salida, archivo))
+
+    # Lotes de informes por proceso: menos viajes entre procesos que uno a uno
+    if procesos > 1 and len(pendientes) > 1:
+        tamaño = max(1, len(pendientes) // (procesos * 4))
+        lotes = [pendientes[i:i + tamaño] for i in range(0, len(pendientes), tamaño)]
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as ejecutor:
+            resultados = [r for lote in ejecutor.map(_generar_lote, lotes, [salida] * len(lotes)) for r in lote]
+    else:
+        resultados = _generar_lote(pendientes, salida)
+
+    errores = []
+    for base, huella, archivos, error in resultados:
+        if error is None:
+            manifiesto[base] = {'huella': huella, 'archivos': archivos}
+        else:
+            errores.append((base, error))
+    _escribir_manifiesto(manifiesto, ruta_manifiesto)
+
+    return {
+        'informes': len(tareas),
+        'generados': len(resultados) - len(errores),
+        'sin_cambios': len(tareas) - len(pendientes),
+        'errores': errores,
+        'formatos': formatos,
+        'procesos': procesos,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los informes mensuales por año y por wellboat")
+    parser.add_argument('--salida', default=RUTA_INFORMES, help="Directorio de los informes")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar también los informes sin cambios")
+    parser.add_argument('--sin-png', action='store_true', help="No generar imágenes PNG")
+    args = parser.parse_args(argv)
+
+    png = False if args.sin_png else png_disponible()
+    if not png and not args.sin_png:
+        print("Sin el paquete kaleido no se generan PNG (pip install kaleido); se escriben HTML y CSV.")
+
+    resumen = generar_informes(salida=args.salida, procesos=args.procesos, forzar=args.forzar, png=png)
+    print(f"{resumen['informes']} informes ({', '.join(resumen['formatos'])}): {resumen['generados']} generados, "
+          f"{resumen['sin_cambios']} sin cambios, en {resumen['segundos']:.1f} s con {resumen['procesos']} proceso(s)")
+    print(f"Informes en {args.salida}")
+    for base, error in resumen['errores']:
+        print(f"  ERROR {base}: {error}")
+    if resumen['errores']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
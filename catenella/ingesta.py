@@ -0,0 +1,241 @@
+# Ingesta de resultados de laboratorio desde cualquiera de los formatos del repo
+#
+#   plotly_resultados.csv  RESULTADO;WELLBOAT;dia;mes;año          (punto y coma)
+#   plotly_resultados.txt  FECHA MUESTREO<TAB>RESULTADO<TAB>WELLBOAT  (tabulado, UTC)
+#
+# Ambas fuentes se llevan al mismo esquema compacto, se unen sin duplicar las
+# muestras presentes en las dos y se guardan en un único almacén Parquet
+# ordenado por fecha (resultados.parquet).
+#
+# Uso:  python -m catenella.ingesta [fuente ...]
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from catenella.instrumentacion import etapa
+
+# Clave de metadatos del Parquet con la versión de las fuentes de origen
+CLAVE_VERSION = b'catenella_version'
+
+# Clave con el estado de cada fuente para la ingesta incremental
+CLAVE_ESTADO = b'catenella_fuentes'
+
+# Filas por grupo del Parquet: con el archivo ordenado por fecha, las
+# estadísticas de cada grupo permiten saltar grupos en filtros por fecha
+FILAS_POR_GRUPO = 16_384
+
+
+# Normalizar las etiquetas de una columna categórica (espacios y mayúsculas)
+# trabajando sobre las categorías, no sobre cada fila; las variantes que
+# quedan iguales ("Seines" y "SEINES") se funden en una sola categoría
+def normalizar_categorias(columna):
+    columna = columna.astype('category')
+    etiquetas = (columna.cat.categories.astype(str)
+                 .str.strip().str.upper().str.replace(r'\s+', ' ', regex=True))
+    codigos_nuevos, categorias = pd.factorize(etiquetas, sort=True)
+    codigos = columna.cat.codes.to_numpy()
+    codigos = np.where(codigos >= 0, codigos_nuevos[codigos], -1)
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+
+# Armar el esquema compacto a partir de resultado, wellboat y fecha:
+#   resultado, wellboat -> category (etiquetas normalizadas)
+#   dia, mes -> int8 ; año -> int16 ; fecha -> datetime64[ms]
+# Las filas sin fecha válida se descartan.
+def armar_esquema(resultado, wellboat, fecha):
+    fecha = pd.Series(fecha).reset_index(drop=True).astype('datetime64[ms]')
+    validas = fecha.notna().to_numpy()
+    fecha = fecha[validas]
+    return pd.DataFrame({
+        'resultado': normalizar_categorias(pd.Series(resultado).reset_index(drop=True)[validas]),
+        'wellboat': normalizar_categorias(pd.Series(wellboat).reset_index(drop=True)[validas]),
+        'dia': fecha.dt.day.astype(np.int8).to_numpy(),
+        'mes': fecha.dt.month.astype(np.int8).to_numpy(),
+        'año': fecha.dt.year.astype(np.int16).to_numpy(),
+        'fecha': fecha.to_numpy(),
+    })
+
+
+# Leer el CSV con día, mes y año en columnas separadas
+def leer_csv(ruta):
+    # Leer el archivo CSV con punto y coma como separador
+    with etapa('lectura_csv'):
+        df = pd.read_csv(ruta, sep=';')
+
+    with etapa('normalizacion'):
+        # Normalizar nombres de columnas
+        df.columns = [col.lower().strip() for col in df.columns]
+
+        # Convertir día, mes y año a una fecha (vectorizado)
+        fecha = pd.to_datetime(
+            {
+                'year': pd.to_numeric(df['año'], errors='coerce'),
+                'month': pd.to_numeric(df['mes'], errors='coerce'),
+                'day': pd.to_numeric(df['dia'], errors='coerce'),
+            },
+            errors='coerce',
+        )
+        return armar_esquema(df['resultado'], df['wellboat'], fecha)
+
+
+# Leer el archivo tabulado con la marca de tiempo completa de la muestra
+def leer_txt(ruta):
+    with etapa('lectura_txt'):
+        df = pd.read_csv(ruta, sep='\t', dtype=str)
+
+    with etapa('normalizacion'):
+        df.columns = [col.lower().strip() for col in df.columns]
+
+        # Formato fijo "2018-01-12 00:00:00 UTC": parseo vectorizado sin inferencia;
+        # si alguna fila no calza, se recurre al parser ISO8601 general
+        try:
+            fecha = pd.to_datetime(df['fecha muestreo'], format='%Y-%m-%d %H:%M:%S UTC')
+        except ValueError:
+            fecha = pd.to_datetime(df['fecha muestreo'], format='ISO8601', utc=True, errors='coerce')
+            fecha = fecha.dt.tz_convert(None)
+        return armar_esquema(df['resultado'], df['wellboat'], fecha)
+
+
+# Leer una fuente detectando su formato por la cabecera
+def leer_fuente(ruta):
+    with open(ruta, encoding='utf-8-sig') as f:
+        cabecera = f.readline()
+    if '\t' in cabecera:
+        return leer_txt(ruta)
+    return leer_csv(ruta)
+
+
+# Caracteres que delatan una etiqueta con problemas de codificación
+# ("PATAG??N", "R?\xadO DULCE", "DO?‘A CLAUDINA")
+_SOSPECHOSOS = '?\ufffd\xad©‘“'
+
+
+# Clave de comparación de nombres de wellboat: solo letras y dígitos ASCII,
+# de modo que "PATAGÓN VIII" y su versión dañada "PATAG??N VIII" coinciden
+def clave_wellboat(etiquetas):
+    etiquetas = pd.Index(etiquetas).astype(str)
+    claves = (etiquetas.str.upper().str.replace(r'[^A-Z0-9 ]', '', regex=True)
+              .str.replace(r'\s+', ' ', regex=True).str.strip())
+    return np.where(claves == '', etiquetas, claves).astype(object)
+
+
+# Para cada clave, la etiqueta con menos caracteres sospechosos
+def _etiquetas_canonicas(etiquetas, claves):
+    tabla = pd.DataFrame({
+        'etiqueta': np.asarray(etiquetas, dtype=object),
+        'clave': claves,
+        'sospechosos': [sum(c in _SOSPECHOSOS for c in e) for e in etiquetas],
+    })
+    mejores = tabla.sort_values(['sospechosos', 'etiqueta']).drop_duplicates('clave')
+    return tabla['clave'].map(mejores.set_index('clave')['etiqueta']).to_numpy()
+
+
+# Unir varias fuentes ya leídas, sin duplicar muestras y ordenadas por fecha.
+# Una muestra se identifica por fecha, resultado y clave del wellboat. Dentro
+# de una misma fuente dos filas idénticas son muestras distintas (mismo
+# wellboat, mismo día): se conserva, por clave, el máximo de repeticiones que
+# aparezca en alguna fuente en lugar de colapsarlas.
+def unificar(fuentes):
+    fuentes = [df for df in fuentes if len(df)]
+    if not fuentes:
+        return armar_esquema([], [], [])
+
+    todas = pd.concat(
+        [df.assign(_fuente=i, wellboat=df['wellboat'].astype(str), resultado=df['resultado'].astype(str))
+         for i, df in enumerate(fuentes)],
+        ignore_index=True,
+    )
+
+    # Clave y etiqueta canónica calculadas por categoría, no por fila
+    wellboat = todas['wellboat'].astype('category')
+    etiquetas = wellboat.cat.categories
+    claves = clave_wellboat(etiquetas)
+    canonicas = _etiquetas_canonicas(etiquetas, claves)
+    codigos = wellboat.cat.codes.to_numpy()
+    todas['_clave'] = claves[codigos]
+    todas['wellboat'] = canonicas[codigos]
+
+    muestra = ['fecha', 'resultado', '_clave']
+    todas['_ocurrencia'] = todas.groupby(['_fuente'] + muestra, sort=False).cumcount()
+    todas = todas.drop_duplicates(muestra + ['_ocurrencia'])
+    todas = todas.sort_values('fecha', kind='stable')
+    return armar_esquema(todas['resultado'], todas['wellboat'], todas['fecha'])
+
+
+# Leer el almacén Parquet si corresponde a la versión indicada
+def leer_almacen(ruta, version, filtros=None):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    try:
+        esquema = pq.read_schema(ruta)
+    except (FileNotFoundError, OSError):
+        return None
+    if (esquema.metadata or {}).get(CLAVE_VERSION) != version.encode():
+        return None
+    return pq.read_table(ruta, filters=filtros).to_pandas()
+
+
+# Leer el almacén sea cual sea su versión: (versión, DataFrame, estado de las
+# fuentes) o None si no existe. Sirve de punto de partida para la ingesta
+# incremental cuando las fuentes solo crecieron.
+def leer_almacen_con_estado(ruta):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    try:
+        tabla = pq.read_table(ruta)
+    except (FileNotFoundError, OSError):
+        return None
+    metadatos = tabla.schema.metadata or {}
+    if CLAVE_VERSION not in metadatos or CLAVE_ESTADO not in metadatos:
+        return None
+    estado = json.loads(metadatos[CLAVE_ESTADO])
+    return metadatos[CLAVE_VERSION].decode(), tabla.to_pandas(), estado
+
+
+# Escribir el almacén Parquet ordenado por fecha con la versión de las fuentes
+# y, si se indica, el estado de cada una para la ingesta incremental
+def escribir_almacen(df, ruta, version, estado=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return False
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[CLAVE_VERSION] = version.encode()
+    if estado is not None:
+        metadatos[CLAVE_ESTADO] = json.dumps(estado).encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+    # Escribir a un temporal y renombrar para no dejar archivos a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(tabla, temporal, row_group_size=FILAS_POR_GRUPO)
+        os.replace(temporal, ruta)
+        return True
+    except OSError:
+        # Directorio de solo lectura: seguimos solo con la caché en memoria
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+
+def main(argv=None):
+    from catenella.datos import FUENTES_RESULTADOS, RUTA_ALMACEN, cargar_resultados
+
+    parser = argparse.ArgumentParser(description="Une las fuentes de resultados en un almacén ordenado por fecha")
+    parser.add_argument('fuentes', nargs='*', default=FUENTES_RESULTADOS)
+    args = parser.parse_args(argv)
+
+    df = cargar_resultados(tuple(args.fuentes))
+    print(f"{len(df)} muestras entre {df['fecha'].min():%Y-%m-%d} y {df['fecha'].max():%Y-%m-%d} -> {RUTA_ALMACEN}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Medición de tiempos por rerun del dashboard
+#
+# Cada rerun (o rerun de un fragmento) se mide como un registro con sus
+# etapas: duración y variación de memoria del proceso (RSS) de cada una.
+# Las etapas se anidan ("grafico/lectura_csv") y, sin una medición en curso,
+# `etapa` no hace nada, así que puede quedar en el código de forma permanente.
+#
+# Se activa con la variable de entorno CATENELLA_INSTRUMENTACION=1 o desde el
+# dashboard. Los registros se agregan a instrumentacion.jsonl y los últimos
+# quedan en memoria para el panel de diagnóstico. Opcionalmente se puede
+# perfilar un rerun completo con cProfile.
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from catenella import RAIZ
+
+RUTA_REGISTRO = os.path.join(RAIZ, 'instrumentacion.jsonl')
+ACTIVO_POR_ENTORNO = os.environ.get('CATENELLA_INSTRUMENTACION', '') not in ('', '0')
+
+# Últimas mediciones del proceso, para el panel
+ultimas = deque(maxlen=50)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+try:
+    _PAGINA = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGINA = 4096
+
+
+# Memoria residente del proceso en KB (None si no se puede leer)
+def memoria_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGINA // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss // 1024
+    except Exception:
+        return None
+
+
+def _delta(antes, despues):
+    return despues - antes if antes is not None and despues is not None else None
+
+
+def medicion_actual():
+    return getattr(_local, 'medicion', None)
+
+
+# Etapa con nombre dentro de la medición en curso del hilo
+@contextmanager
+def etapa(nombre):
+    medicion = medicion_actual()
+    if medicion is None:
+        yield
+        return
+    pila = medicion['_pila']
+    pila.append(nombre)
+    ruta = '/'.join(pila)
+    memoria = memoria_kb()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion['etapas'].append({
+            'etapa': ruta,
+            'nivel': len(pila) - 1,
+            'segundos': time.perf_counter() - inicio,
+            'memoria_kb': _delta(memoria, memoria_kb()),
+        })
+        pila.pop()
+
+
+# Medir un rerun completo. `contexto` agrega campos al registro (p. ej. la
+# sesión) y con `perfil=True` además se captura un perfil cProfile del hilo
+# que ejecuta el rerun.
+@contextmanager
+def rerun(nombre, activo=False, perfil=False, contexto=None, ruta_registro=RUTA_REGISTRO):
+    if not (activo or ACTIVO_POR_ENTORNO) or medicion_actual() is not None:
+        yield None
+        return
+
+    medicion = {
+        'fecha': datetime.now().isoformat(timespec='milliseconds'),
+        'rerun': nombre,
+        **(contexto or {}),
+        'etapas': [],
+        '_pila': [],
+    }
+    _local.medicion = medicion
+    perfilador = cProfile.Profile() if perfil else None
+    if perfilador is not None:
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Otro perfilador activo en el hilo (cobertura, depurador)
+            perfilador = None
+    memoria = memoria_kb()
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+        medicion['total_s'] = time.perf_counter() - inicio
+        medicion['memoria_kb'] = _delta(memoria, memoria_kb())
+        medicion['memoria_total_kb'] = memoria_kb()
+        del medicion['_pila']
+        _local.medicion = None
+        if perfilador is not None:
+            salida = io.StringIO()
+            pstats.Stats(perfilador, stream=salida).sort_stats('cumulative').print_stats(40)
+            medicion['perfil'] = salida.getvalue()
+        _registrar(medicion, ruta_registro)
+
+
+def _registrar(medicion, ruta_registro):
+    with _lock:
+        ultimas.append(medicion)
+        try:
+            with open(ruta_registro, 'a', encoding='utf-8') as f:
+                registro = {k: v for k, v in medicion.items() if k != 'perfil'}
+                registro['perfilado'] = 'perfil' in medicion
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        except OSError:
+            pass
+
+
+# Últimas mediciones (las más recientes primero), opcionalmente solo las de
+# una sesión
+def ultimas_mediciones(n=20, sesion=None):
+    with _lock:
+        mediciones = [m for m in reversed(ultimas) if sesion is None or m.get('sesion') == sesion]
+    return mediciones[:n]
+
+
+# Decorador para paneles/fragmentos: dentro de un rerun medido es una etapa;
+# cuando el fragmento se vuelve a ejecutar solo, abre su propia medición.
+# `activo` es un booleano o una función que lo devuelve; `contexto`, una
+# función que devuelve los campos extra del registro.
+def instrumentar(nombre, activo=False, contexto=None):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if medicion_actual() is not None:
+                with etapa(nombre):
+                    return funcion(*args, **kwargs)
+            with rerun(nombre, activo() if callable(activo) else activo, contexto=contexto() if contexto else None):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,72 @@
+# Verificación por lote de posiciones en grados y minutos
+#
+# El archivo (CSV o Excel) debe traer las columnas lat_grados, lat_minutos,
+# lng_grados y lng_minutos; el resto de las columnas se conserva tal cual.
+import os
+
+from catenella.distancias import distancias_area, distancias_registro
+from catenella.geometria import dentro_de_area, gm_to_decimal_np
+
+COLUMNAS_REQUERIDAS = ['lat_grados', 'lat_minutos', 'lng_grados', 'lng_minutos']
+
+
+# Detectar el separador (',' o ';') mirando solo la cabecera, para poder
+# usar el parser rápido de pandas en vez del motor de Python
+def detectar_separador(archivo):
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, 'rb') as f:
+            cabecera = f.readline()
+    else:
+        cabecera = archivo.readline()
+        archivo.seek(0)
+    if isinstance(cabecera, bytes):
+        cabecera = cabecera.decode('utf-8', errors='ignore')
+    return ';' if cabecera.count(';') > cabecera.count(',') else ','
+
+
+# Leer un archivo de posiciones subido por el usuario
+def leer_posiciones(archivo, nombre=None):
+    import pandas as pd
+
+    nombre = nombre or getattr(archivo, 'name', str(archivo))
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        df = pd.read_excel(archivo)
+    else:
+        df = pd.read_csv(archivo, sep=detectar_separador(archivo))
+
+    # Normalizar nombres de columnas
+    df.columns = [str(col).lower().strip() for col in df.columns]
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    return df
+
+
+# Agrega latitud/longitud decimales, la marca dentro/fuera y las distancias
+# al borde del área y a la línea de cierre (m y millas náuticas) a cada fila.
+# Con un registro de zonas se agrega además la lista de zonas de cada punto, y
+# la distancia al borde se mide a la zona que lo contiene o a la vigente más
+# cercana (columna 'zona_borde') en lugar de al área restringida.
+def verificar_lote(df, registro=None, fecha=None):
+    resultado = df.copy()
+    resultado['lat'] = gm_to_decimal_np(df['lat_grados'], df['lat_minutos'], "S")
+    resultado['lng'] = gm_to_decimal_np(df['lng_grados'], df['lng_minutos'], "W")
+    if registro is None:
+        resultado['dentro_area'] = dentro_de_area(resultado['lng'], resultado['lat'])
+    else:
+        resultado['zonas'] = registro.nombres_por_punto(resultado['lng'], resultado['lat'], fecha)
+        resultado['dentro_area'] = resultado['zonas'] != ''
+    if registro is None:
+        distancias = distancias_area().tabla(resultado['lng'], resultado['lat'])
+    else:
+        distancias = distancias_registro(registro).tabla(resultado['lng'], resultado['lat'], fecha)
+    for columna, valores in distancias.items():
+        resultado[columna] = valores
+    return resultado
+
+
+# Conteos de resumen de un lote verificado
+def resumen_lote(resultado):
+    dentro = int(resultado['dentro_area'].sum())
+    return {'total': len(resultado), 'dentro': dentro, 'fuera': len(resultado) - dentro}
@@ -0,0 +1,252 @@
+# Mapa de monitoreo: capas base cacheadas y capa dinámica de marcadores
+#
+# El mapa base (zonas y, salvo que se pida sin ellas, el marcador y la línea
+# de cierre de compuertas) se construye y se renderiza una sola vez por
+# versión de la geometría y se comparte entre reruns y sesiones. En cada interacción solo se envía la capa de marcadores,
+# que st_folium agrega al mapa ya montado sin volver a cargarlo.
+#
+# Los conjuntos grandes de puntos (lotes, estaciones) se dibujan según su
+# tamaño (ver capa_puntos): marcadores individuales, grupos armados en el
+# navegador (FastMarkerCluster) o un mapa de calor sobre celdas agregadas.
+# Un folium.Marker por punto generaría cientos de KB de script por cada mil
+# puntos y bloquearía el navegador.
+import json
+import threading
+
+import folium
+import numpy as np
+from folium.plugins import FastMarkerCluster, HeatMap
+from folium.template import Template
+from streamlit_folium import generate_leaflet_string, st_folium
+
+from catenella.geometria import cierre_compuertas_lat
+
+CENTRO = [-43.5, -73.1]
+
+# Modos de la capa de puntos y cantidad máxima de puntos de cada uno en modo
+# automático
+MODOS_CAPA = ('marcadores', 'cluster', 'calor')
+MAX_MARCADORES = 50
+MAX_CLUSTER = 20_000
+
+# Decimales de las coordenadas enviadas (5 ≈ 1 m) y de las celdas del mapa
+# de calor (3 ≈ 100 m, menos que un píxel del calor hasta zoom ~13)
+DECIMALES = 5
+DECIMALES_CALOR = 3
+
+COLOR_DENTRO = 'red'
+COLOR_FUERA = 'blue'
+
+_cache = {}
+_lock = threading.Lock()
+
+
+# Marcador que se puede renderizar varias veces: folium.Marker agrega un
+# SetIcon nuevo en cada render(), lo que en un mapa compartido haría crecer
+# el script (y cambiar la clave del componente) en cada rerun
+class MarcadorFijo(folium.Marker):
+    def render(self):
+        if self.icon:
+            self.add_child(self.SetIcon(marker=self, icon=self.icon), name='set_icon')
+        folium.MacroElement.render(self)
+
+
+def _construir_mapa_base(registro, cierre=True):
+    m = folium.Map(location=CENTRO, zoom_start=8)
+
+    # Dibujar todas las zonas del registro (folium usa el orden lat, lng)
+    for zona in registro.zonas:
+        for parte in getattr(zona.geometria, 'geoms', [zona.geometria]):
+            folium.Polygon(
+                locations=[(y, x) for x, y in parte.exterior.coords],
+                color='blue' if zona.tipo == 'restringida' else 'orange',
+                fill=True,
+                fill_opacity=0.2,
+                tooltip=zona.nombre
+            ).add_to(m)
+
+    if cierre:
+        # Añadir línea de cierre de compuertas
+        MarcadorFijo(
+            location=[cierre_compuertas_lat, -73.1],  # Longitud de ejemplo
+            popup="Cierre de Compuertas",
+            icon=folium.Icon(color='green')
+        ).add_to(m)
+
+        # Añadir línea punteada en la coordenada 43° 34.88' S
+        folium.PolyLine(
+            locations=[(cierre_compuertas_lat, -75.5), (cierre_compuertas_lat, -72.5)],
+            color='red',
+            weight=2,
+            dash_array='5, 5'  # Estilo de línea punteada
+        ).add_to(m)
+
+    # Renderizar la figura una vez; st_folium se llama luego con render=False.
+    # generate_leaflet_string fija los identificadores de los elementos, así el
+    # script (y la clave del componente) es idéntico desde la primera llamada.
+    m.get_root().render()
+    generate_leaflet_string(m)
+    m.render()
+    return m
+
+
+# Mapa base para la versión actual de las zonas (con o sin las capas de
+# cierre de compuertas)
+def mapa_base(registro, cierre=True):
+    clave = (registro.version, cierre)
+    with _lock:
+        m = _cache.get(clave)
+        if m is None:
+            m = _construir_mapa_base(registro, cierre)
+            for anterior in [c for c in _cache if c[0] != registro.version]:
+                del _cache[anterior]
+            _cache[clave] = m
+        return m
+
+
+# Capa dinámica con el marcador de la última coordenada verificada
+def capa_marcador(lat=None, lng=None, color='red'):
+    capa = folium.FeatureGroup(name="Ubicación Ingresada")
+    if lat is not None and lng is not None:
+        folium.Marker(
+            location=[lat, lng],
+            popup="Ubicación Ingresada",
+            icon=folium.Icon(color=color)
+        ).add_to(capa)
+    return capa
+
+
+# Modo de capa para n puntos ('auto' elige según la cantidad)
+def modo_capa(n, modo='auto'):
+    if modo == 'auto':
+        if n <= MAX_MARCADORES:
+            return 'marcadores'
+        return 'cluster' if n <= MAX_CLUSTER else 'calor'
+    if modo not in MODOS_CAPA:
+        raise ValueError(f"Modo de capa desconocido: {modo} (use auto, {', '.join(MODOS_CAPA)})")
+    return modo
+
+
+# Grupos de marcadores armados en el navegador a partir de filas
+# [lat, lng, dentro (0/1)]. Cada punto es un circleMarker, más liviano que el
+# ícono por defecto. Las filas llegan ya validadas y codificadas en JSON por
+# capa_puntos: FastMarkerCluster las validaría de a una y las volvería a
+# codificar en cada render.
+class ClusterPuntos(FastMarkerCluster):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var data = {{ this.filas_json }};
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                for (var i = 0; i < data.length; i++) {
+                    var row = data[i];
+                    L.circleMarker(new L.LatLng(row[0], row[1]), {
+                        radius: 5, weight: 1, fillOpacity: 0.7,
+                        color: row[2] ? {{ this.colores[1]|tojson }} : {{ this.colores[0]|tojson }}
+                    }).addTo(cluster);
+                }
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}""")
+
+    def __init__(self, filas_json, name=None):
+        super().__init__([], name=name, chunkedLoading=True)
+        self.filas_json = filas_json
+        self.colores = (COLOR_FUERA, COLOR_DENTRO)
+
+
+# Mapa de calor a partir de filas [lat, lng, peso] ya validadas y codificadas
+class CalorCeldas(HeatMap):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.heatLayer(
+                {{ this.filas_json }},
+                {{ this.options|tojavascript }}
+            );
+        {% endmacro %}
+        """)
+
+    def __init__(self, filas_json, name=None, **kwargs):
+        super().__init__([], name=name, **kwargs)
+        self.filas_json = filas_json
+
+
+# Capa para un conjunto de puntos (arreglos de lat y lng en grados). Con
+# `dentro` (booleanos) los puntos dentro del área se colorean aparte, salvo
+# en el mapa de calor. Los puntos con coordenadas no finitas se omiten.
+def capa_puntos(lat, lng, dentro=None, modo='auto', nombre="Posiciones"):
+    lat = np.asarray(lat, dtype=float).ravel()
+    lng = np.asarray(lng, dtype=float).ravel()
+    validos = np.isfinite(lat) & np.isfinite(lng)
+    lat, lng = lat[validos], lng[validos]
+    dentro = np.zeros(len(lat), dtype=bool) if dentro is None else np.asarray(dentro, dtype=bool).ravel()[validos]
+
+    capa = folium.FeatureGroup(name=nombre)
+    modo = modo_capa(len(lat), modo)
+    if modo == 'calor':
+        # Una fila por celda ocupada, con la cantidad de puntos como peso:
+        # leaflet.heat suma los pesos por píxel, así que el resultado es el
+        # mismo que enviar cada punto. Las celdas se identifican con una sola
+        # clave entera (fila * columnas + columna) para agruparlas rápido.
+        escala = 10 ** DECIMALES_CALOR
+        fila = np.round(lat * escala).astype(np.int64)
+        columna = np.round(lng * escala).astype(np.int64)
+        fila0, columna0 = (fila.min(), columna.min()) if len(fila) else (0, 0)
+        columnas = int(columna.max() - columna0 + 1) if len(fila) else 1
+        claves, pesos = np.unique((fila - fila0) * columnas + (columna - columna0), return_counts=True)
+        lat_celda = (claves // columnas + fila0) / escala
+        lng_celda = (claves % columnas + columna0) / escala
+        filas = json.dumps(list(zip(lat_celda.tolist(), lng_celda.tolist(), pesos.tolist())))
+        CalorCeldas(filas, name=nombre, radius=12, blur=15, min_opacity=0.3).add_to(capa)
+        return capa
+
+    lat, lng = np.round(lat, DECIMALES).tolist(), np.round(lng, DECIMALES).tolist()
+    if modo == 'cluster':
+        filas = json.dumps(list(zip(lat, lng, dentro.astype(np.int8).tolist())))
+        ClusterPuntos(filas, name=nombre).add_to(capa)
+        return capa
+
+    for y, x, d in zip(lat, lng, dentro.tolist()):
+        folium.CircleMarker(location=[y, x], radius=5, color=COLOR_DENTRO if d else COLOR_FUERA, weight=1,
+                            fill=True, fill_opacity=0.7, tooltip=f"{y:.5f}, {x:.5f}").add_to(capa)
+    return capa
+
+
+# Script que st_folium envía al navegador para una capa (para medir su
+# tamaño), como lo arma en cada rerun: agregar la capa al mapa, renderizarla
+# y generar su script. Con `m` se usa ese mapa, del que la capa se quita al
+# terminar.
+def script_capa(capa, m=None):
+    if m is None:
+        m = folium.Map(location=CENTRO, zoom_start=8)
+    capa.add_to(m)
+    try:
+        capa.render()
+        return generate_leaflet_string(capa, base_id=capa.get_name())
+    finally:
+        m._children.pop(capa.get_name(), None)
+
+
+# Mostrar el mapa base compartido con la capa dinámica indicada (o una lista
+# de capas)
+def mostrar_mapa(registro, capa, key="mapa_monitoreo", width=700, height=500, cierre=True):
+    m = mapa_base(registro, cierre)
+    capas = capa if isinstance(capa, list) else [capa]
+    # st_folium agrega las capas como hijas del mapa durante la llamada; se
+    # quitan al terminar para que el mapa compartido no acumule capas entre
+    # sesiones
+    with _lock:
+        try:
+            return st_folium(
+                m,
+                key=key,
+                width=width,
+                height=height,
+                render=False,
+                feature_group_to_add=capas,
+                returned_objects=[],
+            )
+        finally:
+            for c in capas:
+                m._children.pop(c.get_name(), None)
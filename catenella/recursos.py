@@ -0,0 +1,136 @@
+# Recursos compartidos del proceso y su memoria
+#
+# Los datos parseados, los agregados y la geometría preparada se guardan en
+# cachés de módulo (datos, agregados, consultas, analitica, alertas, zonas,
+# geometria, distancias, mapa): se construyen una vez por proceso y todas las
+# sesiones de Streamlit reciben los mismos objetos, que son de solo lectura.
+# Lo que es propio de cada sesión (st.session_state) son valores chicos:
+# coordenadas, filtros y resultados de una verificación.
+#
+# Este módulo informa qué recursos hay en memoria y cuánto ocupan, junto a la
+# memoria residente del proceso. Solo revisa los módulos ya importados, así
+# que consultarlo no carga nada.
+#
+# Uso:
+#   python -m catenella.recursos              # carga todos los recursos e informa
+import argparse
+import sys
+
+import numpy as np
+
+from catenella.instrumentacion import memoria_kb
+
+# (recurso, módulo, variable con la caché o el objeto compartido)
+RECURSOS = (
+    ('resultados', 'catenella.datos', '_cache'),
+    ('cubo mensual', 'catenella.agregados', '_cache'),
+    ('índice de consultas', 'catenella.consultas', '_cache'),
+    ('analítica de flota', 'catenella.analitica', '_cache'),
+    ('motor de alertas', 'catenella.alertas', '_cache'),
+    ('base embebida', 'catenella.basedatos', '_bases'),
+    ('registro de zonas', 'catenella.zonas', '_cache'),
+    ('grilla del área', 'catenella.geometria', '_grilla'),
+    ('distancias al área', 'catenella.distancias', '_distancias'),
+    ('distancias a las zonas', 'catenella.distancias', '_por_registro'),
+    ('mapa base', 'catenella.mapa', '_cache'),
+)
+
+
+# Bytes aproximados de un objeto: DataFrames, Series y arreglos NumPy, y los
+# que contienen sus atributos, listas y diccionarios. Cada arreglo se cuenta
+# una vez por `vistos` (el índice de consultas, por ejemplo, reutiliza el
+# DataFrame de resultados y no suma de nuevo).
+def _bytes(obj, vistos, nivel=0):
+    if obj is None or isinstance(obj, (str, bytes, int, float, bool)) or nivel > 6:
+        return 0
+    if isinstance(obj, np.ndarray):
+        while isinstance(obj.base, np.ndarray):
+            obj = obj.base
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if pd is not None and isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=False))
+    if isinstance(obj, dict):
+        return sum(_bytes(v, vistos, nivel + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_bytes(v, vistos, nivel + 1) for v in obj)
+    atributos = getattr(obj, '__dict__', None)
+    if atributos is not None and type(obj).__module__.startswith('catenella'):
+        return sum(_bytes(v, vistos, nivel + 1) for v in atributos.values())
+    return 0
+
+
+# Recursos compartidos en memoria: nombre, cantidad de entradas (una por
+# versión o fuente) y bytes aproximados
+def recursos_compartidos():
+    vistos = set()
+    filas = []
+    for nombre, modulo, variable in RECURSOS:
+        cargado = sys.modules.get(modulo)
+        valor = getattr(cargado, variable, None) if cargado is not None else None
+        if not valor:
+            continue
+        entradas = len(valor) if isinstance(valor, dict) else 1
+        filas.append({'recurso': nombre, 'entradas': entradas, 'bytes': _bytes(valor, vistos)})
+    return filas
+
+
+# Memoria del proceso: residente (RSS) y la que ocupan los recursos compartidos
+def memoria_proceso():
+    recursos = recursos_compartidos()
+    return {
+        'memoria_kb': memoria_kb(),
+        'recursos_kb': sum(r['bytes'] for r in recursos) // 1024,
+        'recursos': recursos,
+    }
+
+
+# Cargar todos los recursos compartidos (lo que hace el primer rerun completo
+# del dashboard)
+def precargar():
+    from catenella.agregados import cubo_mensual
+    from catenella.analitica import analitica_flota
+    from catenella.consultas import indice_resultados
+    from catenella.datos import cargar_resultados
+    from catenella.distancias import distancias_area, distancias_registro
+    from catenella.geometria import punto_en_area
+    from catenella.mapa import mapa_base
+    from catenella.zonas import cargar_registro
+
+    cargar_resultados()
+    cubo_mensual()
+    indice_resultados()
+    analitica_flota()
+    registro = cargar_registro()
+    mapa_base(registro)
+    punto_en_area(-73.1, -43.5)
+    distancias_area()
+    distancias_registro(registro).tabla(-73.1, -43.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Informa la memoria del proceso y de los recursos compartidos")
+    parser.add_argument('--sin-precargar', action='store_true', help="no cargar los recursos antes de informar")
+    args = parser.parse_args(argv)
+
+    antes = memoria_kb()
+    if not args.sin_precargar:
+        precargar()
+    memoria = memoria_proceso()
+    for r in memoria['recursos']:
+        print(f"{r['recurso']:<22} {r['entradas']:>3} entradas {r['bytes'] / 2 ** 20:>9.1f} MB")
+    print(f"{'recursos compartidos':<22} {memoria['recursos_kb'] / 1024:>22.1f} MB")
+    if memoria['memoria_kb'] is not None:
+        print(f"{'memoria del proceso':<22} {memoria['memoria_kb'] / 1024:>22.1f} MB"
+              f" (antes de cargar: {(antes or 0) / 1024:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
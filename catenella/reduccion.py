@@ -0,0 +1,114 @@
+# Reducción de series de tiempo para graficar
+#
+# Un gráfico de ~700 px no puede mostrar más de un punto por píxel, así que
+# cada serie se reduce en el servidor a un número de puntos proporcional al
+# ancho, con algoritmos que conservan su forma:
+#   - LTTB (Largest Triangle Three Buckets): en cada tramo elige el punto que
+#     forma el triángulo más grande con el elegido antes y el promedio del
+#     tramo siguiente; conserva picos y tendencias.
+#   - minmax: el mínimo y el máximo de cada tramo; nunca pierde un extremo.
+# Con un rango (zoom) se toman solo las filas de ese rango, de modo que al
+# acercarse se ve la resolución completa y el tamaño del gráfico queda acotado
+# sin importar el largo del historial.
+import numpy as np
+import pandas as pd
+
+METODOS = ('lttb', 'minmax')
+PUNTOS_POR_PIXEL = 1
+
+
+# Puntos por serie para un gráfico de `ancho` píxeles
+def puntos_objetivo(ancho, puntos_por_pixel=PUNTOS_POR_PIXEL):
+    return max(int(ancho * puntos_por_pixel), 10)
+
+
+def _numerico(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+# Índices elegidos por LTTB (x creciente). El primer y el último punto se
+# conservan siempre; el resto se reparte en n - 2 tramos.
+def lttb(x, y, n):
+    largo = len(y)
+    if n >= largo or n < 3:
+        return np.arange(largo)
+    x = _numerico(x)
+    y = np.asarray(y, dtype=float)
+
+    # Límites de los tramos y promedio de cada uno (para el tramo siguiente)
+    limites = (np.arange(n - 1) * ((largo - 2) / (n - 2))).astype(np.int64) + 1
+    acum_x = np.r_[0, np.cumsum(x)]
+    acum_y = np.r_[0, np.cumsum(y)]
+    cantidad = np.diff(limites)
+    media_x = (acum_x[limites[1:]] - acum_x[limites[:-1]]) / cantidad
+    media_y = (acum_y[limites[1:]] - acum_y[limites[:-1]]) / cantidad
+    # El tramo siguiente al último es el punto final
+    media_x = np.r_[media_x[1:], x[-1]]
+    media_y = np.r_[media_y[1:], y[-1]]
+
+    elegidos = np.empty(n, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, largo - 1
+    a = 0
+    for i in range(n - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        # Doble del área del triángulo (a, punto del tramo, media siguiente)
+        area = np.abs((x[a] - media_x[i]) * (y[inicio:fin] - y[a])
+                      - (x[a] - x[inicio:fin]) * (media_y[i] - y[a]))
+        a = inicio + int(np.argmax(area))
+        elegidos[i + 1] = a
+    return elegidos
+
+
+# Índices del mínimo y el máximo de cada tramo (n puntos en n / 2 tramos),
+# en orden
+def minmax(y, n):
+    largo = len(y)
+    if n >= largo or n < 2:
+        return np.arange(largo)
+    y = np.asarray(y, dtype=float)
+    tramo = np.arange(largo) * (n // 2) // largo
+    # Dentro de cada tramo, ordenado por valor: el primero es el mínimo y el
+    # último el máximo
+    orden = np.lexsort((y, tramo))
+    inicio = np.searchsorted(tramo[orden], np.arange(n // 2))
+    fin = np.r_[inicio[1:], largo] - 1
+    return np.unique(np.r_[orden[inicio], orden[fin]])
+
+
+# Reducir las series de un DataFrame (una por valor de `color`) para un
+# gráfico de `ancho` píxeles, opcionalmente solo dentro de `rango` = (desde,
+# hasta) sobre la columna `x`. Devuelve las filas elegidas de cada serie, en
+# orden de x.
+def reducir_series(df, x, y, ancho=700, color=None, rango=None, metodo='lttb'):
+    if metodo not in METODOS:
+        raise ValueError(f"Método de reducción desconocido: {metodo} (use {', '.join(METODOS)})")
+    puntos = puntos_objetivo(ancho)
+
+    grupos = df.groupby(color, sort=False, observed=True) if color else [(None, df)]
+    partes = []
+    for _, serie in grupos:
+        serie = serie[serie[y].notna()]
+        valores_x = serie[x].to_numpy()
+        if not (valores_x[1:] >= valores_x[:-1]).all():
+            serie = serie.sort_values(x, kind='stable')
+            valores_x = serie[x].to_numpy()
+
+        # Rango visible por búsqueda binaria sobre x ordenado
+        if rango is not None:
+            desde, hasta = (np.asarray(v, dtype=valores_x.dtype) for v in rango)
+            a = np.searchsorted(valores_x, desde, 'left')
+            b = np.searchsorted(valores_x, hasta, 'right')
+            serie, valores_x = serie.iloc[a:b], valores_x[a:b]
+
+        if metodo == 'lttb':
+            elegidos = lttb(valores_x, serie[y].to_numpy(), puntos)
+        else:
+            elegidos = minmax(serie[y].to_numpy(), puntos)
+        partes.append(serie.iloc[elegidos])
+
+    if not partes:
+        return df.iloc[:0]
+    return pd.concat(partes)
@@ -0,0 +1,222 @@
+# Servicio HTTP para verificar coordenadas sin pasar por Streamlit
+#
+# Uso:  python -m catenella.servicio --puerto 8000
+#
+# Endpoints (JSON):
+#   GET  /salud                      estado del servicio y zonas cargadas
+#   GET  /verificar?lat=..&lng=..    verificación de un punto (grados decimales)
+#   POST /verificar                  un punto: {"lat", "lng"} o en grados/minutos
+#                                    {"lat_grados", "lat_minutos", "lng_grados", "lng_minutos"}
+#   POST /verificar/lote             varios puntos: {"posiciones": [{...}, ...]}
+#                                    o columnas {"lat": [...], "lng": [...]}
+#
+# El registro de zonas se carga y prepara una sola vez al iniciar el proceso
+# y se comparte entre todas las peticiones.
+import argparse
+import json
+import math
+import traceback
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from catenella.distancias import distancias_registro
+from catenella.geometria import cierre_compuertas_lat, gm_to_decimal, gm_to_decimal_np
+from catenella.zonas import cargar_registro
+
+# Límite de posiciones por petición de lote
+MAX_LOTE = 200_000
+
+# Límite del cuerpo de una petición, en bytes (holgado para MAX_LOTE posiciones)
+MAX_CUERPO = 32 * 2 ** 20
+
+
+class ErrorPeticion(Exception):
+    pass
+
+
+# Latitud/longitud decimales de un punto en cualquiera de los dos formatos
+def _punto_decimal(datos):
+    try:
+        if 'lat' in datos and 'lng' in datos:
+            lat, lng = float(datos['lat']), float(datos['lng'])
+        else:
+            lat = gm_to_decimal(float(datos['lat_grados']), float(datos['lat_minutos']), "S")
+            lng = gm_to_decimal(float(datos['lng_grados']), float(datos['lng_minutos']), "W")
+    except KeyError as e:
+        raise ErrorPeticion(f"Falta el campo {e.args[0]!r}")
+    except (TypeError, ValueError):
+        raise ErrorPeticion("Las coordenadas deben ser numéricas")
+    # NaN o infinito no son posiciones (y no se pueden responder en JSON)
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        raise ErrorPeticion("Las coordenadas deben ser números finitos")
+    return lat, lng
+
+
+# Arreglos de latitud/longitud decimales para un lote
+def _lote_decimal(datos):
+    try:
+        if 'posiciones' in datos:
+            posiciones = datos['posiciones']
+            if posiciones and 'lat' not in posiciones[0]:
+                datos = {clave: [p[clave] for p in posiciones]
+                         for clave in ('lat_grados', 'lat_minutos', 'lng_grados', 'lng_minutos')}
+            else:
+                datos = {'lat': [p['lat'] for p in posiciones], 'lng': [p['lng'] for p in posiciones]}
+        if 'lat_grados' in datos:
+            lat = gm_to_decimal_np(datos['lat_grados'], datos['lat_minutos'], "S")
+            lng = gm_to_decimal_np(datos['lng_grados'], datos['lng_minutos'], "W")
+        else:
+            lat = datos['lat']
+            lng = datos['lng']
+        lat = np.asarray(lat, dtype=float)
+        lng = np.asarray(lng, dtype=float)
+    except KeyError as e:
+        raise ErrorPeticion(f"Falta el campo {e.args[0]!r}")
+    except (TypeError, ValueError):
+        raise ErrorPeticion("Las coordenadas deben ser numéricas")
+    if lat.ndim != 1 or lng.ndim != 1:
+        raise ErrorPeticion("'lat' y 'lng' deben ser listas de números")
+    if lat.shape != lng.shape:
+        raise ErrorPeticion("'lat' y 'lng' deben tener el mismo largo")
+    if not (np.isfinite(lat).all() and np.isfinite(lng).all()):
+        raise ErrorPeticion("Las coordenadas deben ser números finitos")
+    return lat, lng
+
+
+def verificar_punto(registro, lat, lng, fecha=None):
+    zonas = registro.zonas_en(lng, lat, fecha=fecha)
+    distancias = distancias_registro(registro).tabla(lng, lat, fecha)
+    return {
+        'lat': lat,
+        'lng': lng,
+        'dentro_area': bool(zonas),
+        'zonas': [{'nombre': z.nombre, 'tipo': z.tipo} for z in zonas],
+        'al_sur_cierre_compuertas': lat < cierre_compuertas_lat,
+        **{clave: valores.tolist()[0] for clave, valores in distancias.items()},
+    }
+
+
+def verificar_puntos(registro, lat, lng, fecha=None):
+    if len(lat) > MAX_LOTE:
+        raise ErrorPeticion(f"El lote supera el máximo de {MAX_LOTE} posiciones")
+    nombres = registro.nombres_por_punto(lng, lat, fecha)
+    dentro = nombres != ''
+    return {
+        'total': int(len(lat)),
+        'dentro': int(dentro.sum()),
+        'fuera': int(len(lat) - dentro.sum()),
+        'dentro_area': dentro.tolist(),
+        'zonas': nombres.tolist(),
+        'al_sur_cierre_compuertas': (lat < cierre_compuertas_lat).tolist(),
+        **{clave: valores.tolist() for clave, valores in distancias_registro(registro).tabla(lng, lat, fecha).items()},
+    }
+
+
+class ManejadorVerificacion(BaseHTTPRequestHandler):
+    # HTTP/1.1 para mantener la conexión abierta entre peticiones
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo van en escrituras separadas: sin TCP_NODELAY cada
+    # respuesta espera el ACK retardado del cliente (~40 ms)
+    disable_nagle_algorithm = True
+    registro = None
+    registrar_peticiones = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/salud':
+            self._responder(200, {'estado': 'ok', 'zonas': len(self.registro),
+                                  'version_zonas': self.registro.version})
+        elif url.path == '/verificar':
+            consulta = {k: v[0] for k, v in parse_qs(url.query).items()}
+            self._atender(lambda: verificar_punto(self.registro, *_punto_decimal(consulta),
+                                                  fecha=date.today()))
+        else:
+            self._responder(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == '/verificar':
+            self._atender(lambda: verificar_punto(self.registro, *_punto_decimal(self._leer_json()),
+                                                  fecha=date.today()))
+        elif url.path == '/verificar/lote':
+            self._atender(lambda: verificar_puntos(self.registro, *_lote_decimal(self._leer_json()),
+                                                   fecha=date.today()))
+        else:
+            self._responder(404, {'error': 'Ruta no encontrada'})
+
+    def _leer_json(self):
+        try:
+            largo = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            largo = -1
+        if not 0 <= largo <= MAX_CUERPO:
+            # El cuerpo no se lee: la conexión no puede seguir en uso
+            self.close_connection = True
+            raise ErrorPeticion(f"Content-Length inválido (máximo {MAX_CUERPO} bytes)")
+        try:
+            datos = json.loads(self.rfile.read(largo) or b'{}')
+        except ValueError:
+            raise ErrorPeticion("El cuerpo no es JSON válido")
+        if not isinstance(datos, dict):
+            raise ErrorPeticion("Se esperaba un objeto JSON")
+        return datos
+
+    def _atender(self, calcular):
+        try:
+            self._responder(200, calcular())
+        except ErrorPeticion as e:
+            self._responder(400, {'error': str(e)})
+        except Exception:
+            # Un error inesperado no debe cortar la conexión sin respuesta
+            traceback.print_exc()
+            self._responder(500, {'error': 'Error interno del servicio'})
+
+    def _responder(self, estado, cuerpo):
+        # allow_nan=False: NaN o Infinity no son JSON válido; mejor un 500 que
+        # un cuerpo que un cliente estricto no puede leer
+        datos = json.dumps(cuerpo, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        if self.registrar_peticiones:
+            super().log_message(formato, *args)
+
+
+# Crear el servidor con el registro de zonas ya cargado y preparado
+def crear_servidor(host='127.0.0.1', puerto=8000, registro=None, registrar_peticiones=False):
+    if registro is None:
+        registro = cargar_registro()
+    manejador = type('Manejador', (ManejadorVerificacion,), {
+        'registro': registro,
+        'registrar_peticiones': registrar_peticiones,
+    })
+    distancias_registro(registro)
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP de verificación de coordenadas")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--log', action='store_true', help="Registrar cada petición en la consola")
+    args = parser.parse_args(argv)
+
+    servidor = crear_servidor(args.host, args.puerto, registrar_peticiones=args.log)
+    print(f"Servicio de verificación escuchando en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+# Generador de datos sintéticos para pruebas de carga
+#
+# Produce, con NumPy y una semilla fija, resultados de laboratorio con el
+# mismo esquema que plotly_resultados.csv y trayectorias de wellboats en
+# grados y minutos (el formato del verificador por lote y de trayectorias.py).
+# Los datos se generan por bloques, así que se pueden escribir a disco
+# archivos de cualquier tamaño sin tenerlos completos en memoria. Con la
+# misma semilla y el mismo tamaño de bloque la salida es idéntica.
+#
+# Uso:  python -m catenella.sintetico resultados salida.csv --filas 1000000
+#       python -m catenella.sintetico trayectorias posiciones.csv --filas 1000000
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+TAMAÑO_BLOQUE = 1_000_000
+
+# Caja donde se mueven las trayectorias (alrededor del área de Tic-Toc)
+LAT_MIN, LAT_MAX = -44.2, -42.8
+LNG_MIN, LNG_MAX = -74.0, -72.5
+
+
+def nombres_wellboat(n):
+    return [f"WELLBOAT {i:03d}" for i in range(1, n + 1)]
+
+
+# Generador independiente para cada bloque, derivado de la semilla
+def _generadores(semilla, n_bloques):
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(semilla).spawn(n_bloques)]
+
+
+def _bloques(n, tamaño_bloque):
+    for inicio in range(0, n, tamaño_bloque):
+        yield inicio, min(tamaño_bloque, n - inicio)
+
+
+# Resultados por bloques, ordenados por fecha entre `desde` y `hasta`.
+# `positividad` es la fracción media de POSITIVO; con `temporada` los
+# positivos se concentran entre diciembre y marzo, como en los datos reales.
+def bloques_resultados(n, wellboats=40, positividad=0.011, desde='2018-01-01', hasta='2025-03-31',
+                       temporada=True, semilla=0, tamaño_bloque=TAMAÑO_BLOQUE):
+    nombres = np.array(wellboats if isinstance(wellboats, (list, tuple)) else nombres_wellboat(wellboats), dtype=object)
+    d0 = np.datetime64(desde, 'D')
+    dias_totales = int((np.datetime64(hasta, 'D') - d0).astype(np.int64)) + 1
+    n_bloques = -(-n // tamaño_bloque)
+
+    for rng, (inicio, m) in zip(_generadores(semilla, n_bloques), _bloques(n, tamaño_bloque)):
+        # Cada bloque cubre su tramo proporcional del rango de fechas, así el
+        # archivo completo queda ordenado sin ordenar entre bloques
+        primer_dia = inicio * dias_totales // n
+        ultimo_dia = max((inicio + m) * dias_totales // n, primer_dia + 1)
+        fechas = d0 + np.sort(rng.integers(primer_dia, ultimo_dia, m))
+
+        meses = (fechas.astype('datetime64[M]').astype(np.int64) % 12) + 1
+        if temporada:
+            # 80 % de los positivos en dic–mar (4 de 12 meses)
+            en_temporada = (meses == 12) | (meses <= 3)
+            tasa = np.where(en_temporada, positividad * 0.8 * 3, positividad * 0.2 * 1.5)
+        else:
+            tasa = np.full(m, positividad)
+        positivo = rng.random(m) < tasa
+
+        años = fechas.astype('datetime64[Y]').astype(np.int64) + 1970
+        dias = (fechas - fechas.astype('datetime64[M]')).astype(np.int64) + 1
+        yield pd.DataFrame({
+            'RESULTADO': np.where(positivo, 'POSITIVO', 'NEGATIVO'),
+            'WELLBOAT': nombres[rng.integers(0, len(nombres), m)],
+            'dia': dias,
+            'mes': meses,
+            'año': años,
+        })
+
+
+def generar_resultados(n, **opciones):
+    return pd.concat(list(bloques_resultados(n, **opciones)), ignore_index=True)
+
+
+def _reflejar(valores, minimo, maximo):
+    ancho = maximo - minimo
+    y = np.mod(valores - minimo, 2 * ancho)
+    return minimo + np.where(y > ancho, 2 * ancho - y, y)
+
+
+def _grados_minutos(decimal):
+    grados = np.trunc(decimal)
+    return grados.astype(np.int64), np.round(np.abs(decimal - grados) * 60, 4)
+
+
+# Trayectorias por bloques: cada `intervalo` segundos todas las embarcaciones
+# reportan su posición (filas en orden de tiempo). Cada una hace una caminata
+# aleatoria reflejada en los bordes de la caja; el estado se arrastra entre
+# bloques, de modo que las trayectorias son continuas.
+def bloques_trayectorias(n, wellboats=40, desde='2025-01-01', intervalo=60, paso_grados=0.002,
+                         semilla=0, tamaño_bloque=TAMAÑO_BLOQUE):
+    nombres = np.array(wellboats if isinstance(wellboats, (list, tuple)) else nombres_wellboat(wellboats), dtype=object)
+    k = len(nombres)
+    # Bloques con un número entero de reportes de toda la flota
+    tamaño_bloque = max(tamaño_bloque // k, 1) * k
+    n_bloques = -(-n // tamaño_bloque)
+    generadores = _generadores(semilla, n_bloques + 1)
+
+    posicion = np.column_stack([
+        generadores[0].uniform(LAT_MIN, LAT_MAX, k),
+        generadores[0].uniform(LNG_MIN, LNG_MAX, k),
+    ])
+    t0 = np.datetime64(desde, 's')
+
+    for rng, (inicio, m) in zip(generadores[1:], _bloques(n, tamaño_bloque)):
+        pasos = -(-m // k)
+        recorrido = posicion + np.cumsum(rng.normal(0, paso_grados, (pasos, k, 2)), axis=0)
+        posicion = recorrido[-1]
+        recorrido = recorrido.reshape(-1, 2)[:m]
+
+        lat = _reflejar(recorrido[:, 0], LAT_MIN, LAT_MAX)
+        lng = _reflejar(recorrido[:, 1], LNG_MIN, LNG_MAX)
+        lat_grados, lat_minutos = _grados_minutos(lat)
+        lng_grados, lng_minutos = _grados_minutos(lng)
+        fila = np.arange(inicio, inicio + m)
+        yield pd.DataFrame({
+            'fecha': t0 + (fila // k) * np.timedelta64(intervalo, 's'),
+            'wellboat': nombres[fila % k],
+            'lat_grados': lat_grados,
+            'lat_minutos': lat_minutos,
+            'lng_grados': lng_grados,
+            'lng_minutos': lng_minutos,
+        })
+
+
+def generar_trayectorias(n, **opciones):
+    return pd.concat(list(bloques_trayectorias(n, **opciones)), ignore_index=True)
+
+
+# Escribir los bloques a un CSV (separador ';', como los datos del repo).
+# Con pyarrow disponible el formateo es varias veces más rápido que to_csv.
+def escribir_csv(bloques, ruta):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        pa = None
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    filas = 0
+    with open(temporal, 'wb') as f:
+        for i, bloque in enumerate(bloques):
+            if i == 0:
+                f.write((';'.join(bloque.columns) + '\n').encode('utf-8'))
+            if pa is not None:
+                pacsv.write_csv(
+                    pa.Table.from_pandas(bloque, preserve_index=False), f,
+                    write_options=pacsv.WriteOptions(include_header=False, delimiter=';', quoting_style='none'),
+                )
+            else:
+                f.write(bloque.to_csv(sep=';', index=False, header=False).encode('utf-8'))
+            filas += len(bloque)
+    os.replace(temporal, ruta)
+    return filas
+
+
+# Datos de monitoreo simulados de app_v2/app_v3 (estaciones × días), en una
+# sola operación vectorizada
+def generar_monitoreo(dias=30, estaciones=("Estación A", "Estación B", "Estación C", "Estación D"),
+                      hasta=None, semilla=0):
+    rng = np.random.default_rng(semilla)
+    hasta = pd.Timestamp(hasta) if hasta is not None else pd.Timestamp.now()
+    fechas = hasta - pd.to_timedelta(np.arange(dias - 1, -1, -1), unit='D')
+    concentracion = rng.integers(0, 201, (dias, len(estaciones)))
+    return pd.DataFrame({
+        'fecha': np.repeat(fechas, len(estaciones)),
+        'estacion': np.tile(np.array(estaciones, dtype=object), dias),
+        'concentracion': concentracion.ravel(),
+        'nivel_riesgo': np.select(
+            [concentracion.ravel() > 100, concentracion.ravel() > 50], ['Alto', 'Medio'], 'Bajo'),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para pruebas de carga")
+    parser.add_argument('tipo', choices=['resultados', 'trayectorias'])
+    parser.add_argument('salida', help="Archivo CSV de salida")
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--wellboats', type=int, default=40)
+    parser.add_argument('--positividad', type=float, default=0.011, help="Fracción de POSITIVO (solo resultados)")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--bloque', type=int, default=TAMAÑO_BLOQUE, help="Filas por bloque")
+    args = parser.parse_args(argv)
+
+    if args.tipo == 'resultados':
+        bloques = bloques_resultados(args.filas, args.wellboats, args.positividad,
+                                     semilla=args.semilla, tamaño_bloque=args.bloque)
+    else:
+        bloques = bloques_trayectorias(args.filas, args.wellboats, semilla=args.semilla, tamaño_bloque=args.bloque)
+    filas = escribir_csv(bloques, args.salida)
+    print(f"{filas} filas -> {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
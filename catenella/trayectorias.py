@@ -0,0 +1,131 @@
+# Procesamiento por streaming de trayectorias de wellboats
+#
+# Lee un archivo de posiciones ordenado por tiempo en bloques y detecta, para
+# cada embarcación, cuándo entra o sale del área restringida y cuándo cruza la
+# latitud de cierre de compuertas. Solo se guarda en memoria el último estado
+# de cada embarcación, así que el uso de memoria no depende del largo del archivo.
+#
+# Columnas del archivo: fecha, wellboat y la posición en grados decimales
+# (lat, lng) o en grados/minutos (lat_grados, lat_minutos, lng_grados, lng_minutos).
+#
+# Uso:  python -m catenella.trayectorias posiciones.csv --salida eventos.csv
+import argparse
+import csv
+import sys
+
+import numpy as np
+import pandas as pd
+
+from catenella.geometria import cierre_compuertas_lat, dentro_de_area, gm_to_decimal_np
+from catenella.lote import detectar_separador
+
+ENTRADA_AREA = 'entrada_area'
+SALIDA_AREA = 'salida_area'
+CRUCE_CIERRE_SUR = 'cruce_cierre_sur'
+CRUCE_CIERRE_NORTE = 'cruce_cierre_norte'
+
+COLUMNAS_EVENTO = ['fecha', 'wellboat', 'evento', 'lat', 'lng']
+
+# Estado desconocido (primera posición de la embarcación)
+_SIN_ESTADO = -1
+
+
+class DetectorEventos:
+    def __init__(self):
+        # wellboat -> (dentro del área, al sur del cierre) de su última posición
+        self.estado = {}
+
+    # Procesar un bloque de posiciones y devolver sus eventos en orden de fila
+    def procesar_bloque(self, bloque):
+        # Sin wellboat no hay a qué embarcación atribuir la posición
+        bloque = bloque[bloque['wellboat'].notna()]
+        if len(bloque) == 0:
+            return pd.DataFrame(columns=COLUMNAS_EVENTO)
+
+        lat, lng = _posiciones(bloque)
+        dentro = dentro_de_area(lng, lat).astype(np.int8)
+        sur = (lat < cierre_compuertas_lat).astype(np.int8)
+
+        # Agrupar por embarcación manteniendo el orden temporal dentro de cada una
+        codigos, wellboats = pd.factorize(bloque['wellboat'])
+        orden = np.argsort(codigos, kind='stable')
+        c = codigos[orden]
+        d = dentro[orden]
+        s = sur[orden]
+
+        primera = np.r_[True, c[1:] != c[:-1]]
+        ultima = np.r_[c[1:] != c[:-1], True]
+
+        # Estado previo: la fila anterior de la misma embarcación o, para su
+        # primera fila del bloque, el estado arrastrado desde bloques anteriores
+        previos = [self.estado.get(w, (_SIN_ESTADO, _SIN_ESTADO)) for w in wellboats]
+        previo_d = np.r_[_SIN_ESTADO, d[:-1]].astype(np.int8)
+        previo_s = np.r_[_SIN_ESTADO, s[:-1]].astype(np.int8)
+        previo_d[primera] = np.array([p[0] for p in previos], dtype=np.int8)[c[primera]]
+        previo_s[primera] = np.array([p[1] for p in previos], dtype=np.int8)[c[primera]]
+
+        # Actualizar el estado con la última posición de cada embarcación
+        for codigo, d_fin, s_fin in zip(c[ultima], d[ultima], s[ultima]):
+            self.estado[wellboats[codigo]] = (int(d_fin), int(s_fin))
+
+        cambio_d = (previo_d != _SIN_ESTADO) & (previo_d != d)
+        cambio_s = (previo_s != _SIN_ESTADO) & (previo_s != s)
+
+        filas = np.concatenate([orden[cambio_d], orden[cambio_s]])
+        tipos = np.concatenate([
+            np.where(d[cambio_d] == 1, ENTRADA_AREA, SALIDA_AREA),
+            np.where(s[cambio_s] == 1, CRUCE_CIERRE_SUR, CRUCE_CIERRE_NORTE),
+        ])
+        secuencia = np.argsort(filas, kind='stable')
+        filas = filas[secuencia]
+
+        return pd.DataFrame({
+            'fecha': bloque['fecha'].to_numpy()[filas],
+            'wellboat': bloque['wellboat'].to_numpy()[filas],
+            'evento': tipos[secuencia],
+            'lat': lat[filas],
+            'lng': lng[filas],
+        })
+
+
+def _posiciones(bloque):
+    if 'lat' in bloque.columns and 'lng' in bloque.columns:
+        return bloque['lat'].to_numpy(dtype=float), bloque['lng'].to_numpy(dtype=float)
+    return (gm_to_decimal_np(bloque['lat_grados'], bloque['lat_minutos'], "S"),
+            gm_to_decimal_np(bloque['lng_grados'], bloque['lng_minutos'], "W"))
+
+
+# Leer un archivo de posiciones en bloques de tamaño fijo
+def leer_bloques(ruta, tamaño_bloque=250_000):
+    with pd.read_csv(ruta, sep=detectar_separador(ruta), chunksize=tamaño_bloque) as lector:
+        for bloque in lector:
+            bloque.columns = [str(col).lower().strip() for col in bloque.columns]
+            yield bloque
+
+
+# Generador de eventos (un diccionario por evento) para un archivo completo
+def eventos_trayectoria(ruta, tamaño_bloque=250_000, detector=None):
+    detector = detector or DetectorEventos()
+    for bloque in leer_bloques(ruta, tamaño_bloque):
+        yield from detector.procesar_bloque(bloque).to_dict('records')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detecta entradas/salidas del área y cruces del cierre de compuertas")
+    parser.add_argument('archivo', help="CSV de posiciones ordenado por fecha")
+    parser.add_argument('--salida', help="CSV de eventos (por defecto, la salida estándar)")
+    parser.add_argument('--bloque', type=int, default=250_000, help="Filas por bloque")
+    args = parser.parse_args(argv)
+
+    destino = open(args.salida, 'w', newline='', encoding='utf-8') if args.salida else sys.stdout
+    try:
+        escritor = csv.DictWriter(destino, fieldnames=COLUMNAS_EVENTO, delimiter=';')
+        escritor.writeheader()
+        escritor.writerows(eventos_trayectoria(args.archivo, args.bloque))
+    finally:
+        if destino is not sys.stdout:
+            destino.close()
+
+
+if __name__ == '__main__':
+    main()
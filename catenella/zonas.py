@@ -0,0 +1,201 @@
+# Registro de zonas de restricción y monitoreo con índice espacial
+#
+# Las zonas se cargan desde archivos GeoJSON (o Shapefile, si está instalado
+# pyshp) del directorio zonas/. Cada zona tiene nombre, tipo y fechas de
+# vigencia opcionales. Las geometrías se guardan preparadas en un STRtree,
+# de modo que verificar un punto no recorre todos los polígonos. Los registros
+# cargados del directorio con pocas zonas usan en cambio una grilla
+# precalculada (grilla.py) que responde sin geometría los puntos lejos de los
+# bordes; la grilla recorre todas las zonas, así que con más de
+# MAX_ZONAS_GRILLA se usa solo el STRtree y el costo no crece con las zonas.
+import datetime
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import shapely
+import shapely.geometry as geom
+
+from catenella import RAIZ
+from catenella.grilla import grilla_zonas
+
+RUTA_ZONAS = os.path.join(RAIZ, 'zonas')
+
+# Zonas hasta las que se usa la grilla: cada zona suma ~1 MB, ~0.1 s de
+# construcción y ~1 ms por cada 100 mil puntos consultados (el STRtree tarda
+# ~50 ms para 100 mil puntos con pocas o muchas zonas)
+MAX_ZONAS_GRILLA = 16
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class Zona:
+    def __init__(self, nombre, geometria, tipo='restringida', desde=None, hasta=None):
+        self.nombre = nombre
+        self.geometria = geometria
+        self.tipo = tipo
+        self.desde = _fecha(desde)
+        self.hasta = _fecha(hasta)
+
+    # La zona está vigente en la fecha dada (sin fecha: siempre)
+    def vigente(self, fecha=None):
+        if fecha is None:
+            return True
+        fecha = _fecha(fecha)
+        if self.desde is not None and fecha < self.desde:
+            return False
+        if self.hasta is not None and fecha > self.hasta:
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Zona({self.nombre!r}, tipo={self.tipo!r})"
+
+
+def _fecha(valor):
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return datetime.date.fromisoformat(str(valor)[:10])
+
+
+class RegistroZonas:
+    def __init__(self, zonas, version='', grilla=None):
+        self.zonas = list(zonas)
+        self.version = version
+        # Grilla de consulta (GrillaZonas) o None para usar solo el STRtree
+        self.grilla = grilla
+        geometrias = [zona.geometria for zona in self.zonas]
+        shapely.prepare(geometrias)
+        self.arbol = shapely.STRtree(geometrias)
+
+        # Vigencias como arreglos para filtrar resultados vectorizados
+        self._desde = np.array(
+            [z.desde or datetime.date.min for z in self.zonas], dtype='datetime64[D]')
+        self._hasta = np.array(
+            [z.hasta or datetime.date.max for z in self.zonas], dtype='datetime64[D]')
+
+    def __len__(self):
+        return len(self.zonas)
+
+    # Zonas (vigentes en la fecha, si se indica) que contienen el punto
+    def zonas_en(self, lng, lat, fecha=None):
+        if self.grilla is not None:
+            indices = self.grilla.zonas_punto(lng, lat)
+        else:
+            indices = self.arbol.query(geom.Point(lng, lat), predicate='within')
+        return [self.zonas[i] for i in sorted(indices) if self.zonas[i].vigente(fecha)]
+
+    # Consulta vectorizada: devuelve dos arreglos paralelos (índice de punto,
+    # índice de zona) con cada par punto-dentro-de-zona
+    def consultar(self, lng, lat, fecha=None):
+        if self.grilla is not None:
+            i_punto, i_zona = self.grilla.consultar(lng, lat)
+        else:
+            puntos = shapely.points(np.asarray(lng, dtype=float), np.asarray(lat, dtype=float))
+            i_punto, i_zona = self.arbol.query(puntos, predicate='within')
+        if fecha is not None and len(i_zona):
+            dia = np.datetime64(_fecha(fecha), 'D')
+            vigentes = (self._desde[i_zona] <= dia) & (dia <= self._hasta[i_zona])
+            i_punto, i_zona = i_punto[vigentes], i_zona[vigentes]
+        return i_punto, i_zona
+
+    # Nombres de las zonas de cada punto, unidos por ' | ' ('' si no hay)
+    def nombres_por_punto(self, lng, lat, fecha=None):
+        n = len(np.atleast_1d(lng))
+        i_punto, i_zona = self.consultar(lng, lat, fecha)
+        nombres = np.full(n, '', dtype=object)
+        if len(i_punto):
+            orden = np.lexsort((i_zona, i_punto))
+            i_punto, i_zona = i_punto[orden], i_zona[orden]
+            todos = np.array([z.nombre for z in self.zonas], dtype=object)
+            # Primera zona de cada punto en una asignación vectorizada; solo los
+            # puntos que caen en varias zonas a la vez se completan uno a uno
+            primera = np.r_[True, i_punto[1:] != i_punto[:-1]]
+            nombres[i_punto[primera]] = todos[i_zona[primera]]
+            for i, z in zip(i_punto[~primera], i_zona[~primera]):
+                nombres[i] = f"{nombres[i]} | {todos[z]}"
+        return nombres
+
+
+# Leer las zonas de un archivo GeoJSON (Feature o FeatureCollection)
+def leer_geojson(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        datos = json.load(f)
+    features = datos['features'] if datos.get('type') == 'FeatureCollection' else [datos]
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    return [_zona_desde_feature(feature, f"{base}_{i}") for i, feature in enumerate(features)]
+
+
+# Leer las zonas de un Shapefile (requiere el paquete pyshp)
+def leer_shapefile(ruta):
+    try:
+        import shapefile
+    except ImportError:
+        raise ImportError("Para leer Shapefiles se necesita el paquete 'pyshp' (pip install pyshp)")
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    with shapefile.Reader(ruta) as lector:
+        return [
+            _zona_desde_feature(forma.__geo_interface__, f"{base}_{i}")
+            for i, forma in enumerate(lector.shapeRecords())
+        ]
+
+
+def _zona_desde_feature(feature, nombre_defecto):
+    props = {str(k).lower(): v for k, v in (feature.get('properties') or {}).items()}
+    return Zona(
+        nombre=props.get('nombre') or props.get('name') or nombre_defecto,
+        geometria=geom.shape(feature['geometry']),
+        tipo=props.get('tipo') or props.get('type') or 'restringida',
+        desde=props.get('desde') or props.get('vigente_desde'),
+        hasta=props.get('hasta') or props.get('vigente_hasta'),
+    )
+
+
+def _archivos_zonas(directorio):
+    archivos = []
+    for patron in ('*.geojson', '*.json', '*.shp'):
+        archivos.extend(glob.glob(os.path.join(directorio, patron)))
+    return sorted(archivos)
+
+
+# Versión del conjunto de archivos de zonas (cambia si se edita alguno)
+def version_zonas(directorio=RUTA_ZONAS):
+    huella = hashlib.sha1()
+    for ruta in _archivos_zonas(directorio):
+        info = os.stat(ruta)
+        huella.update(f"{os.path.basename(ruta)}:{info.st_mtime_ns}:{info.st_size};".encode())
+    return huella.hexdigest()[:16]
+
+
+# Registro con todas las zonas del directorio, cacheado por versión
+def cargar_registro(directorio=RUTA_ZONAS):
+    version = version_zonas(directorio)
+    with _lock:
+        en_cache = _cache.get(directorio)
+        if en_cache is not None and en_cache.version == version:
+            return en_cache
+
+        zonas = []
+        for ruta in _archivos_zonas(directorio):
+            if ruta.endswith('.shp'):
+                zonas.extend(leer_shapefile(ruta))
+            else:
+                zonas.extend(leer_geojson(ruta))
+
+        # Grilla guardada junto a la versión de las zonas (o construida ahora),
+        # en <directorio>.grilla.npz
+        grilla = None
+        if 0 < len(zonas) <= MAX_ZONAS_GRILLA:
+            ruta_grilla = f"{os.path.normpath(directorio)}.grilla.npz"
+            grilla = grilla_zonas([zona.geometria for zona in zonas], version, ruta_grilla)
+        registro = RegistroZonas(zonas, version, grilla)
+        _cache[directorio] = registro
+        return registro
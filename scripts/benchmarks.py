@@ -0,0 +1,311 @@
+# Benchmarks de los caminos críticos del dashboard sobre datos sintéticos
+#
+# Mide, a 1×, 10× y 100× el tamaño actual de plotly_resultados.csv:
+#   - lectura del CSV y normalización (como en app_v4 original y con catenella.ingesta)
+#   - conteo mensual (groupby/value_counts/unstack original y cubo precalculado)
+#   - polygon.contains y gm_to_decimal para un punto y para lotes (el lote,
+#     con la grilla del área y con shapely.contains_xy)
+#   - zonas de un punto (registro cargado y uno de ZONAS_SINTETICAS zonas) y
+#     punto_en_area
+#   - construcción y serialización del mapa folium, la capa del marcador (solo
+#     la capa, sobre un mapa ya armado) y lo que cuesta el mapa en cada rerun
+#     (mostrar_mapa con el mapa base ya armado)
+# y, a 1k, 10k y 100k posiciones, el tiempo de armar la capa de puntos del
+# mapa en cada modo y el tamaño del script que st_folium envía al navegador.
+#
+# Uso:
+#   python scripts/benchmarks.py                          # guarda benchmarks/resultados.json
+#   python scripts/benchmarks.py --guardar-base           # además lo deja como línea base
+#   python scripts/benchmarks.py --escalas 1 10 --tolerancia 0.3
+#   python scripts/benchmarks.py --puntos 1000 10000
+#
+# Si existe una línea base (benchmarks/linea_base.json) se compara contra ella
+# y el script termina con código 1 si algún caso es más lento que la
+# tolerancia permitida.
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import folium
+import shapely
+import shapely.affinity
+import shapely.geometry as geom
+
+from catenella.agregados import construir_cubo
+from catenella.datos import MESES_NOMBRES
+from catenella.geometria import (cierre_compuertas_lat, coords, dentro_de_area, gm_to_decimal,
+                                 gm_to_decimal_np, polygon, punto_en_area)
+from catenella.ingesta import leer_fuente
+from catenella.mapa import CENTRO, _construir_mapa_base, capa_marcador, capa_puntos, mostrar_mapa, script_capa
+from catenella.sintetico import bloques_resultados, escribir_csv, generar_trayectorias
+from catenella.zonas import RegistroZonas, Zona, cargar_registro
+
+DIRECTORIO = os.path.join(RAIZ, 'benchmarks')
+RUTA_RESULTADOS = os.path.join(DIRECTORIO, 'resultados.json')
+RUTA_BASE = os.path.join(DIRECTORIO, 'linea_base.json')
+
+# Filas de plotly_resultados.csv (escala 1×) y wellboats distintos
+FILAS_BASE = 22_770
+WELLBOATS = 144
+
+# Posiciones de las capas de puntos del mapa; un folium.Marker por punto solo
+# se mide hasta MAX_MARCADOR_POR_PUNTO (10k tardan decenas de segundos)
+PUNTOS_CAPA = (1_000, 10_000, 100_000)
+MAX_MARCADOR_POR_PUNTO = 1_000
+
+# Zonas del registro sintético (más que MAX_ZONAS_GRILLA: solo STRtree)
+ZONAS_SINTETICAS = 200
+
+
+# Tiempo por llamada: como timeit, se ajusta el número de llamadas por
+# repetición para que cada una dure al menos ~0.2 s, y se informa la mediana
+def medir(funcion, repeticiones=5):
+    temporizador = timeit.Timer(funcion)
+    llamadas, _ = temporizador.autorange()
+    tiempos = [t / llamadas for t in temporizador.repeat(repeat=repeticiones, number=llamadas)]
+    return {
+        'mediana_s': statistics.median(tiempos),
+        'minimo_s': min(tiempos),
+        'llamadas': llamadas * repeticiones,
+    }
+
+
+# Lectura y normalización tal como la hacía app_v4 antes del paquete
+def leer_csv_original(ruta):
+    df = pd.read_csv(ruta, sep=';')
+    df.columns = [col.lower().strip() for col in df.columns]
+    df['año'] = pd.to_numeric(df['año'], errors='coerce')
+    df['mes'] = pd.to_numeric(df['mes'], errors='coerce')
+    df['nombre_mes'] = df['mes'].map(MESES_NOMBRES)
+    df['resultado_normalizado'] = df['resultado'].str.strip().str.upper()
+    return df
+
+
+def conteo_mensual_original(df, año):
+    filtrado = df[df['año'] == año]
+    conteo = filtrado.groupby('nombre_mes')['resultado_normalizado'].value_counts().unstack(fill_value=0)
+    return conteo.reindex(MESES_NOMBRES.values(), fill_value=0)
+
+
+# Mapa como lo armaba app_v4 en cada rerun, serializado a HTML
+def mapa_original(lat=None, lng=None):
+    m = folium.Map(location=[-43.5, -73.1], zoom_start=8)
+    folium.Polygon(locations=coords, color='blue', fill=True, fill_opacity=0.2).add_to(m)
+    folium.Marker(location=[cierre_compuertas_lat, -73.1], popup="Cierre de Compuertas",
+                  icon=folium.Icon(color='green')).add_to(m)
+    folium.PolyLine(locations=[(cierre_compuertas_lat, -75.5), (cierre_compuertas_lat, -72.5)],
+                    color='red', weight=2, dash_array='5, 5').add_to(m)
+    if lat is not None:
+        folium.Marker(location=[lat, lng], popup="Ubicación Ingresada", icon=folium.Icon(color='red')).add_to(m)
+    return m.get_root().render()
+
+
+# Capa con un folium.Marker por punto, como el marcador de app_v4
+def capa_marcador_por_punto(lat, lng):
+    capa = folium.FeatureGroup(name="Posiciones")
+    for y, x in zip(lat, lng):
+        folium.Marker(location=[y, x], popup="Ubicación Ingresada", icon=folium.Icon(color='red')).add_to(capa)
+    return capa
+
+
+def casos_escala(escala, directorio):
+    n = FILAS_BASE * escala
+    ruta = os.path.join(directorio, f'resultados_{escala}x.csv')
+    escribir_csv(bloques_resultados(n, WELLBOATS, semilla=escala), ruta)
+    df_original = leer_csv_original(ruta)
+    df = leer_fuente(ruta)
+    año = int(df['año'].iloc[len(df) // 2])
+    cubo = construir_cubo(df)
+
+    posiciones = generar_trayectorias(n, wellboats=WELLBOATS, semilla=escala)
+    lat_g, lat_m = posiciones['lat_grados'].to_numpy(), posiciones['lat_minutos'].to_numpy()
+    lng_g, lng_m = posiciones['lng_grados'].to_numpy(), posiciones['lng_minutos'].to_numpy()
+    lat = gm_to_decimal_np(lat_g, lat_m, "S")
+    lng = gm_to_decimal_np(lng_g, lng_m, "W")
+
+    def cubo_frio():
+        cubo._tablas.clear()
+        return cubo.conteo_mensual(año)
+
+    return {
+        'csv_original': lambda: leer_csv_original(ruta),
+        'csv_ingesta': lambda: leer_fuente(ruta),
+        'mensual_groupby': lambda: conteo_mensual_original(df_original, año),
+        'mensual_cubo_construir': lambda: construir_cubo(df),
+        'mensual_cubo_corte': cubo_frio,
+        'lote_gm_to_decimal': lambda: (gm_to_decimal_np(lat_g, lat_m, "S"), gm_to_decimal_np(lng_g, lng_m, "W")),
+        'lote_contains': lambda: dentro_de_area(lng, lat),
+        'lote_contains_xy': lambda: shapely.contains_xy(polygon, lng, lat),
+    }
+
+
+# Registro con copias desplazadas del área en una grilla de 0.5°
+def registro_sintetico(zonas=ZONAS_SINTETICAS):
+    lado = int(np.ceil(np.sqrt(zonas)))
+    return RegistroZonas([
+        Zona(f'zona_{i}', shapely.affinity.translate(polygon, 0.5 * (i % lado), -0.5 * (i // lado)))
+        for i in range(zonas)
+    ], version='sintetico')
+
+
+def casos_sin_escala():
+    registro = cargar_registro()
+    sintetico = registro_sintetico()
+    # Mapa armado una vez: la capa del marcador se mide sola
+    mapa = folium.Map(location=CENTRO, zoom_start=8)
+    return {
+        'punto_gm_to_decimal': lambda: (gm_to_decimal(-43, 30.0, "S"), gm_to_decimal(-73, 10.0, "W")),
+        'punto_contains': lambda: polygon.contains(geom.Point(-73.2, -43.6)),
+        'punto_en_area': lambda: punto_en_area(-73.2, -43.6),
+        'punto_zonas_en': lambda: registro.zonas_en(-73.2, -43.6),
+        f'punto_zonas_en_{ZONAS_SINTETICAS}_zonas': lambda: sintetico.zonas_en(-73.2, -43.6),
+        'mapa_original_html': lambda: mapa_original(-43.6, -73.2),
+        'mapa_base_construir': lambda: _construir_mapa_base(registro),
+        'capa_marcador': lambda: script_capa(capa_marcador(-43.6, -73.2), mapa),
+        'mapa_rerun': lambda: mostrar_mapa(registro, capa_marcador(-43.6, -73.2)),
+    }
+
+
+# Script de la capa de puntos en cada modo (la función devuelve el script, para
+# medir también su tamaño)
+def casos_capas(puntos):
+    posiciones = generar_trayectorias(puntos, wellboats=WELLBOATS, semilla=puntos)
+    lat = gm_to_decimal_np(posiciones['lat_grados'].to_numpy(), posiciones['lat_minutos'].to_numpy(), "S")
+    lng = gm_to_decimal_np(posiciones['lng_grados'].to_numpy(), posiciones['lng_minutos'].to_numpy(), "W")
+    dentro = dentro_de_area(lng, lat)
+    mapa = folium.Map(location=CENTRO, zoom_start=8)
+
+    casos = {
+        f'capa_{modo}': (lambda modo=modo: script_capa(capa_puntos(lat, lng, dentro, modo=modo), mapa))
+        for modo in ('auto', 'cluster', 'calor')
+    }
+    if puntos <= MAX_MARCADOR_POR_PUNTO:
+        casos['capa_marcador_por_punto'] = lambda: script_capa(capa_marcador_por_punto(lat, lng), mapa)
+    return casos
+
+
+def ejecutar(escalas, repeticiones, puntos_capa=PUNTOS_CAPA):
+    resultados = {}
+    for nombre, funcion in casos_sin_escala().items():
+        resultados[nombre] = medir(funcion, repeticiones)
+        _imprimir(nombre, resultados[nombre])
+
+    for puntos in puntos_capa:
+        for nombre, funcion in casos_capas(puntos).items():
+            clave = f'{nombre}@{puntos}'
+            resultados[clave] = medir(funcion, repeticiones)
+            resultados[clave]['puntos'] = puntos
+            resultados[clave]['bytes'] = len(funcion().encode('utf-8'))
+            _imprimir(clave, resultados[clave])
+
+    directorio = tempfile.mkdtemp(prefix='catenella_bench_')
+    try:
+        for escala in escalas:
+            for nombre, funcion in casos_escala(escala, directorio).items():
+                clave = f'{nombre}@{escala}x'
+                resultados[clave] = medir(funcion, repeticiones)
+                resultados[clave]['filas'] = FILAS_BASE * escala
+                _imprimir(clave, resultados[clave])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'versiones': {'numpy': np.__version__, 'pandas': pd.__version__, 'folium': folium.__version__},
+        'resultados': resultados,
+    }
+
+
+def _formato(segundos):
+    if segundos < 1e-3:
+        return f"{segundos * 1e6:9.1f} µs"
+    if segundos < 1:
+        return f"{segundos * 1e3:9.1f} ms"
+    return f"{segundos:9.2f} s "
+
+
+def _imprimir(clave, resultado):
+    tamaño = f" {resultado['bytes'] / 1024:9.0f} KB" if 'bytes' in resultado else ''
+    print(f"{clave:<34} {_formato(resultado['mediana_s'])}{tamaño}", flush=True)
+
+
+# Comparar contra la línea base; devuelve los casos que empeoraron.
+# Se compara el mínimo de las repeticiones, que es el menos afectado por
+# otros procesos de la máquina.
+def comparar(actual, base, tolerancia):
+    regresiones = []
+    print(f"\n{'caso':<34} {'base':>12} {'actual':>12} {'cambio':>8}")
+    for clave, resultado in actual['resultados'].items():
+        anterior = base['resultados'].get(clave)
+        if anterior is None:
+            continue
+        cambio = resultado['minimo_s'] / anterior['minimo_s'] - 1
+        marca = ''
+        if cambio > tolerancia:
+            marca = '  REGRESIÓN'
+            regresiones.append(clave)
+        print(f"{clave:<34} {_formato(anterior['minimo_s'])} {_formato(resultado['minimo_s'])} {cambio:+7.0%}{marca}")
+    return regresiones
+
+
+def _guardar(datos, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de lectura, agregación, geometría y mapa")
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100],
+                        help="Múltiplos del tamaño actual de plotly_resultados.csv")
+    parser.add_argument('--puntos', type=int, nargs='*', default=list(PUNTOS_CAPA),
+                        help="Posiciones de las capas de puntos del mapa (sin valores, no se miden)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', default=RUTA_RESULTADOS)
+    parser.add_argument('--base', default=RUTA_BASE, help="Resultados contra los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Empeoramiento admitido (0.25 = 25 %%)")
+    parser.add_argument('--guardar-base', action='store_true', help="Guardar estos resultados como línea base")
+    args = parser.parse_args(argv)
+
+    # mostrar_mapa llama a st_folium fuera de un servidor de Streamlit: sin
+    # los avisos de "missing ScriptRunContext" ni el de "streamlit run"
+    from streamlit import config
+    config.set_option('global.showWarningOnDirectExecution', False)
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').disabled = True
+    inicio = time.perf_counter()
+    actual = ejecutar(args.escalas, args.repeticiones, args.puntos)
+    _guardar(actual, args.salida)
+    print(f"\nResultados en {args.salida} ({time.perf_counter() - inicio:.0f} s)")
+
+    regresiones = []
+    if os.path.exists(args.base) and not args.guardar_base:
+        with open(args.base, encoding='utf-8') as f:
+            regresiones = comparar(actual, json.load(f), args.tolerancia)
+    if args.guardar_base:
+        _guardar(actual, args.base)
+        print(f"Línea base guardada en {args.base}")
+
+    if regresiones:
+        print(f"\n{len(regresiones)} caso(s) más lentos que la línea base: {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Prueba de carga local del servicio de verificación (catenella.servicio)
+#
+# Uso:
+#   python scripts/carga_servicio.py --iniciar                 # levanta el servicio en este proceso
+#   python scripts/carga_servicio.py --url http://127.0.0.1:8000 --peticiones 5000 --concurrencia 16
+#   python scripts/carga_servicio.py --iniciar --lote 1000     # prueba el endpoint de lote
+#
+# Reporta peticiones por segundo y latencias p50/p99.
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Cuerpos de prueba con posiciones aleatorias alrededor del área Tic-Toc
+def _cuerpos(n, lote, semilla):
+    rng = np.random.default_rng(semilla)
+    cuerpos = []
+    for _ in range(min(n, 256)):
+        lat = rng.uniform(-43.8, -43.4, lote or 1)
+        lng = rng.uniform(-73.6, -73.0, lote or 1)
+        if lote:
+            cuerpos.append(json.dumps({'lat': lat.tolist(), 'lng': lng.tolist()}).encode())
+        else:
+            cuerpos.append(json.dumps({'lat': lat[0], 'lng': lng[0]}).encode())
+    return cuerpos
+
+
+def _trabajador(host, puerto, ruta, cuerpos, cantidad, latencias, errores):
+    conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+    cabeceras = {'Content-Type': 'application/json'}
+    for i in range(cantidad):
+        cuerpo = cuerpos[i % len(cuerpos)]
+        inicio = time.perf_counter()
+        try:
+            conexion.request('POST', ruta, body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status != 200:
+                errores.append(respuesta.status)
+        except (OSError, http.client.HTTPException) as e:
+            errores.append(repr(e))
+            conexion.close()
+            conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    conexion.close()
+
+
+def ejecutar(url, peticiones, concurrencia, lote=0, semilla=0):
+    partes = urlsplit(url)
+    ruta = '/verificar/lote' if lote else '/verificar'
+    cuerpos = _cuerpos(peticiones, lote, semilla)
+
+    latencias, errores = [], []
+    por_hilo = [peticiones // concurrencia + (i < peticiones % concurrencia) for i in range(concurrencia)]
+    hilos = [
+        threading.Thread(target=_trabajador,
+                         args=(partes.hostname, partes.port or 80, ruta, cuerpos, n, latencias, errores))
+        for n in por_hilo
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1000
+    return {
+        'ruta': ruta,
+        'peticiones': len(latencias),
+        'errores': len(errores),
+        'concurrencia': concurrencia,
+        'posiciones_por_peticion': lote or 1,
+        'duracion_s': round(duracion, 3),
+        'peticiones_por_s': round(len(latencias) / duracion, 1) if duracion else 0.0,
+        'p50_ms': round(float(np.percentile(ms, 50)), 3) if len(ms) else None,
+        'p99_ms': round(float(np.percentile(ms, 99)), 3) if len(ms) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de verificación")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--lote', type=int, default=0, help="Posiciones por petición (0 = punto único)")
+    parser.add_argument('--iniciar', action='store_true', help="Levantar el servicio en este mismo proceso")
+    args = parser.parse_args(argv)
+
+    servidor = None
+    url = args.url
+    if args.iniciar:
+        from catenella.servicio import crear_servidor
+        servidor = crear_servidor('127.0.0.1', 0)
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    try:
+        print(json.dumps(ejecutar(url, args.peticiones, args.concurrencia, args.lote), indent=2))
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Nombres de archivo de los informes por wellboat
+#
+# Genera los informes de un cubo con wellboats cuyos nombres se limpian igual
+# ('A/B', 'A B', 'A:B') en un directorio temporal y revisa que cada uno
+# quede en su propio archivo y que el CSV de cada wellboat tenga sus propios
+# conteos, en lugar de que un informe pise al otro.
+#
+# Uso:  python scripts/informes_nombres.py
+#
+# Termina con código 1 si dos wellboats comparten archivo o un CSV no
+# corresponde a su wellboat.
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from catenella.agregados import CuboMensual  # noqa: E402
+from catenella.informes import _nombre_archivo, generar_informes  # noqa: E402
+
+AÑO = 2024
+WELLBOATS = ['A/B', 'A B', 'A:B']
+
+
+# Cubo de un año en que cada wellboat tiene un total de positivos distinto
+def cubo_prueba():
+    conteos = np.zeros((1, 12, 2, len(WELLBOATS)), dtype=np.int64)
+    for i in range(len(WELLBOATS)):
+        conteos[0, 0, 1, i] = i + 1
+    return CuboMensual([AÑO], ['NEGATIVO', 'POSITIVO'], WELLBOATS, conteos, 'prueba')
+
+
+def ejecutar():
+    problemas = []
+    nombres = [_nombre_archivo(w) for w in WELLBOATS]
+    if len(set(nombres)) != len(nombres):
+        problemas.append(f"nombres repetidos: {nombres}")
+
+    with tempfile.TemporaryDirectory() as salida:
+        informe = generar_informes(cubo_prueba(), salida=salida, procesos=1, png=False)
+        if informe['errores']:
+            problemas.append(f"errores al generar: {informe['errores']}")
+        for i, (wellboat, nombre) in enumerate(zip(WELLBOATS, nombres)):
+            ruta = os.path.join(salida, str(AÑO), 'wellboats', f'{nombre}.csv')
+            if not os.path.exists(ruta):
+                falla = "sin archivo"
+            else:
+                positivos = int(pd.read_csv(ruta, sep=';')['POSITIVO'].sum())
+                falla = None if positivos == i + 1 else f"{positivos} positivos, se esperaban {i + 1}"
+            print(f"{wellboat:<6} {nombre:<20} {'OK' if falla is None else 'ERROR'}")
+            if falla is not None:
+                problemas.append(f"{wellboat}: {falla}")
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nombres de archivo distintos para wellboats que se limpian igual")
+    parser.parse_args(argv)
+
+    problemas = ejecutar()
+    for problema in problemas:
+        print(f"  ERROR {problema}")
+    if problemas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
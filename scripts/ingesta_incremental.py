@@ -0,0 +1,212 @@
+# Comprobación de la ingesta incremental (catenella/incremental.py)
+#
+# Copia las fuentes de resultados a un directorio temporal y les aplica una
+# serie de cambios: filas del mismo día, la misma muestra en las dos fuentes,
+# filas con fecha anterior (dentro y fuera de la ventana), una línea
+# incompleta y una reescritura. Después de cada cambio compara lo que queda
+# en memoria por la vía incremental (resultados, cubo mensual, base SQLite y
+# motor de alertas) con una reconstrucción completa desde las fuentes, y
+# revisa que se haya tomado la vía esperada: incremental o reconstrucción.
+#
+# Uso:  python scripts/ingesta_incremental.py
+#
+# Termina con código 1 si alguna comparación no coincide.
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from catenella.agregados import construir_cubo, cubo_mensual  # noqa: E402
+from catenella.alertas import MotorAlertas, actualizar_alertas  # noqa: E402
+from catenella.basedatos import base_resultados, construir_base  # noqa: E402
+from catenella.datos import (FUENTES_RESULTADOS, cargar_resultados, filas_agregadas,  # noqa: E402
+                             liberar_resultados, version_datos)
+from catenella.ingesta import leer_fuente, unificar  # noqa: E402
+
+CSV, TXT = (os.path.basename(ruta) for ruta in FUENTES_RESULTADOS)
+
+INCREMENTAL = 'incremental'
+COMPLETA = 'reconstrucción'
+
+
+def _fila_csv(fecha, resultado, wellboat):
+    return f"{resultado};{wellboat};{fecha.day};{fecha.month};{fecha.year}\n"
+
+
+def _fila_txt(fecha, resultado, wellboat):
+    return f"{fecha:%Y-%m-%d} 00:00:00 UTC\t{resultado}\t{wellboat}\r\n"
+
+
+def _agregar(directorio, nombre, texto):
+    with open(os.path.join(directorio, nombre), 'a', encoding='utf-8', newline='') as f:
+        f.write(texto)
+
+
+def _reescribir(directorio, nombre):
+    ruta = os.path.join(directorio, nombre)
+    with open(ruta, encoding='utf-8-sig', newline='') as f:
+        lineas = f.readlines()
+    # Cambiar el resultado de la primera muestra
+    campos = lineas[1].split(';')
+    campos[0] = 'NEGATIVO' if campos[0] == 'POSITIVO' else 'POSITIVO'
+    lineas[1] = ';'.join(campos)
+    with open(ruta, 'w', encoding='utf-8-sig', newline='') as f:
+        f.writelines(lineas)
+
+
+# Cambios a aplicar, en orden: (nombre, función(directorio), vía esperada)
+def cambios(ultima):
+    anterior = ultima - pd.Timedelta(days=10)
+    antigua = ultima - pd.Timedelta(days=400)
+    return [
+        ("mismo día", lambda d: (
+            _agregar(d, CSV, _fila_csv(ultima, 'POSITIVO', 'QUEILEN')),
+            _agregar(d, TXT, _fila_txt(ultima, 'NEGATIVO', 'PANIAHUE')),
+        ), INCREMENTAL),
+        # La misma muestra en ambas fuentes (con otra escritura del nombre) se
+        # cuenta una vez; repetida en una fuente son dos muestras
+        ("entre fuentes", lambda d: (
+            _agregar(d, CSV, _fila_csv(ultima, 'POSITIVO', 'Seigull') * 2),
+            _agregar(d, TXT, _fila_txt(ultima, 'POSITIVO', ' SEIGULL ')),
+        ), INCREMENTAL),
+        ("fecha anterior", lambda d: (
+            _agregar(d, CSV, _fila_csv(anterior, 'POSITIVO', 'QUEILEN')),
+            _agregar(d, TXT, _fila_txt(anterior, 'NEGATIVO', 'Ronia Pioneer')),
+        ), INCREMENTAL),
+        # Una racha interrumpida y un positivo atrasado que la completa: las
+        # alertas deben ser las de reprocesar todo en orden de fecha
+        ("alertas: racha", lambda d: _agregar(d, CSV, ''.join([
+            _fila_csv(ultima - pd.Timedelta(days=20), 'POSITIVO', 'PRUEBA ALERTAS'),
+            _fila_csv(ultima - pd.Timedelta(days=19), 'POSITIVO', 'PRUEBA ALERTAS'),
+            _fila_csv(ultima - pd.Timedelta(days=5), 'NEGATIVO', 'PRUEBA ALERTAS'),
+        ])), INCREMENTAL),
+        ("alertas: atrasada", lambda d: _agregar(d, CSV, _fila_csv(ultima - pd.Timedelta(days=18), 'POSITIVO',
+                                                                   'PRUEBA ALERTAS')), INCREMENTAL),
+        ("línea incompleta", lambda d: _agregar(d, CSV, f"POSITIVO;PANIAHUE;{ultima.day};"), INCREMENTAL),
+        ("línea completada", lambda d: _agregar(d, CSV, f"{ultima.month};{ultima.year}\n"), INCREMENTAL),
+        ("fuera de la ventana", lambda d: _agregar(d, CSV, _fila_csv(antigua, 'POSITIVO', 'QUEILEN')), COMPLETA),
+        ("reescritura", lambda d: _reescribir(d, CSV), COMPLETA),
+    ]
+
+
+def _muestras(df):
+    return sorted(zip(df['fecha'].astype(str), df['wellboat'].astype(str), df['resultado'].astype(str)))
+
+
+def _conteos_sql(base):
+    return sorted(base._consultar(
+        "SELECT fecha, wellboat, resultado, COUNT(*) FROM resultados GROUP BY fecha, wellboat, resultado"))
+
+
+def _alertas(alertas):
+    return sorted(json.dumps(alerta, sort_keys=True, ensure_ascii=False) for alerta in alertas)
+
+
+def _leer_alertas(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def _cubos_iguales(a, b):
+    return (a.años == b.años and a.resultados == b.resultados and a.wellboats == b.wellboats
+            and np.array_equal(a.conteos, b.conteos))
+
+
+# Estado completo desde cero para las fuentes de `directorio`
+def _reconstruir(fuentes, directorio):
+    df = unificar([leer_fuente(ruta) for ruta in fuentes])
+    ruta_sql = os.path.join(directorio, 'completa.sqlite')
+    # construir_base toma los resultados de datos.cargar_resultados, que aquí
+    # debe partir de las fuentes y no de lo cargado antes
+    liberar_resultados(fuentes)
+    almacen = os.path.join(directorio, 'completa.parquet')
+    if os.path.exists(almacen):
+        os.remove(almacen)
+    cargar_resultados(fuentes, almacen)
+    construir_base(fuentes, 'sqlite', ruta_sql)
+    liberar_resultados(fuentes)
+    return df, construir_cubo(df), base_resultados('sqlite', fuentes, ruta_sql)
+
+
+def ejecutar(fuentes=FUENTES_RESULTADOS):
+    problemas = []
+    with tempfile.TemporaryDirectory() as directorio:
+        # Dos copias de las fuentes con los mismos cambios: una se mantiene
+        # al día por la vía incremental y la otra se reconstruye cada vez
+        copias = {}
+        for lado in (INCREMENTAL, COMPLETA):
+            os.makedirs(os.path.join(directorio, lado))
+            copias[lado] = tuple(shutil.copy(ruta, os.path.join(directorio, lado)) for ruta in fuentes)
+        inc = copias[INCREMENTAL]
+        almacen = os.path.join(directorio, 'incremental.parquet')
+        ruta_cubo = os.path.join(directorio, 'incremental.cubo.npz')
+        ruta_sql = os.path.join(directorio, 'incremental.sqlite')
+        ruta_alertas = os.path.join(directorio, 'incremental.alertas.jsonl')
+        ruta_estado = os.path.join(directorio, 'incremental.alertas.estado.json')
+
+        df = cargar_resultados(inc, almacen)
+        cubo_mensual(inc, ruta_cubo)
+        base_resultados('sqlite', inc, ruta_sql)
+        actualizar_alertas(inc, ruta_alertas, ruta_estado)
+        version = version_datos(inc)
+
+        for nombre, aplicar, esperada in cambios(df['fecha'].max()):
+            for lado in (INCREMENTAL, COMPLETA):
+                aplicar(os.path.join(directorio, lado))
+
+            df = cargar_resultados(inc, almacen)
+            # Se llegó por la vía incremental si hay filas agregadas desde la
+            # versión anterior
+            via = INCREMENTAL if filas_agregadas(inc, version) is not None else COMPLETA
+            version = version_datos(inc)
+            cubo = cubo_mensual(inc, ruta_cubo)
+            base = base_resultados('sqlite', inc, ruta_sql)
+            motor = actualizar_alertas(inc, ruta_alertas, ruta_estado)
+            df_completo, cubo_completo, base_completa = _reconstruir(copias[COMPLETA],
+                                                                     os.path.join(directorio, COMPLETA))
+
+            # Las alertas se comparan con reprocesar los resultados en memoria:
+            # dos resultados del mismo wellboat y el mismo día no tienen un orden
+            # propio, y la reconstrucción los ordena por fuente
+            motor_completo = MotorAlertas()
+            alertas_completas = motor_completo.procesar(df)
+
+            fallas = []
+            if via != esperada:
+                fallas.append(f"vía {via}, se esperaba {esperada}")
+            if _muestras(df) != _muestras(df_completo):
+                fallas.append(f"resultados: {len(df)} filas contra {len(df_completo)}")
+            if not _cubos_iguales(cubo, cubo_completo):
+                fallas.append("cubo mensual distinto")
+            if _conteos_sql(base) != _conteos_sql(base_completa):
+                fallas.append("conteos SQL distintos")
+            if (_alertas(_leer_alertas(ruta_alertas)) != _alertas(alertas_completas)
+                    or motor.a_json()['estado'] != motor_completo.a_json()['estado']):
+                fallas.append("alertas distintas de reprocesar todo")
+
+            print(f"{nombre:<22} {via:<15} {len(df):>7} filas  {'OK' if not fallas else 'ERROR'}")
+            problemas.extend(f"{nombre}: {falla}" for falla in fallas)
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara la ingesta incremental con la reconstrucción completa")
+    parser.parse_args(argv)
+
+    problemas = ejecutar()
+    for problema in problemas:
+        print(f"  ERROR {problema}")
+    if problemas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Memoria del proceso con 1 a 50 sesiones del dashboard
+#
+# Abre sesiones de Streamlit (AppTest) en este mismo proceso, como las
+# atendería un servidor, y las mantiene vivas. Después de cada tramo informa
+# la memoria residente y los recursos compartidos. Como los datos, agregados
+# y geometría se construyen una vez por proceso, la memoria debe quedar plana:
+# cada sesión solo agrega su estado y el árbol de elementos de AppTest.
+#
+# Uso:
+#   python scripts/memoria_sesiones.py                      # app_v4, hasta 50 sesiones
+#   python scripts/memoria_sesiones.py --app app_v3.py --sesiones 20
+#   python scripts/memoria_sesiones.py --diagnostico        # con el panel de diagnóstico
+#
+# Termina con código 1 si alguna sesión falla, si un recurso compartido tiene
+# más de una entrada o si la memoria crece más de --tolerancia MB por sesión.
+import argparse
+import gc
+import logging
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from catenella.recursos import memoria_proceso  # noqa: E402
+
+TRAMOS = (1, 2, 5, 10, 25, 50)
+
+
+def _sesion(app, diagnostico):
+    at = AppTest.from_file(os.path.join(RAIZ, app), default_timeout=120)
+    if diagnostico:
+        at.query_params['diagnostico'] = '1'
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"La sesión terminó con error: {at.exception[0].message}")
+    return at
+
+
+def ejecutar(app='app_v4.py', sesiones=50, diagnostico=False):
+    tramos = sorted({t for t in TRAMOS if t < sesiones} | {sesiones})
+    abiertas = []
+    filas = []
+    for tramo in tramos:
+        while len(abiertas) < tramo:
+            abiertas.append(_sesion(app, diagnostico))
+        gc.collect()
+        memoria = memoria_proceso()
+        filas.append({
+            'sesiones': tramo,
+            'memoria_mb': (memoria['memoria_kb'] or 0) / 1024,
+            'recursos_mb': memoria['recursos_kb'] / 1024,
+            'recursos': memoria['recursos'],
+        })
+        print(f"{tramo:>4} sesiones  memoria {filas[-1]['memoria_mb']:7.1f} MB"
+              f"  recursos compartidos {filas[-1]['recursos_mb']:6.1f} MB", flush=True)
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria del proceso al abrir de 1 a N sesiones del dashboard")
+    parser.add_argument('--app', default='app_v4.py', help="script del dashboard (relativo a la raíz)")
+    parser.add_argument('--sesiones', type=int, default=50)
+    parser.add_argument('--diagnostico', action='store_true', help="abrir las sesiones con ?diagnostico=1")
+    parser.add_argument('--tolerancia', type=float, default=1.0,
+                        help="crecimiento máximo de memoria por sesión, en MB (por defecto 1)")
+    args = parser.parse_args(argv)
+
+    # Sin los avisos de "missing ScriptRunContext" que Streamlit emite fuera
+    # de un servidor
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').disabled = True
+    filas = ejecutar(args.app, args.sesiones, args.diagnostico)
+    primera, ultima = filas[0], filas[-1]
+    por_sesion = (ultima['memoria_mb'] - primera['memoria_mb']) / max(ultima['sesiones'] - primera['sesiones'], 1)
+    print(f"\nCrecimiento desde la primera sesión: {ultima['memoria_mb'] - primera['memoria_mb']:+.1f} MB"
+          f" ({por_sesion:+.2f} MB por sesión)")
+
+    problemas = [f"{r['recurso']}: {r['entradas']} entradas" for r in ultima['recursos'] if r['entradas'] > 1]
+    if por_sesion > args.tolerancia:
+        problemas.append(f"la memoria crece {por_sesion:.2f} MB por sesión (tolerancia {args.tolerancia} MB)")
+    for problema in problemas:
+        print(f"  REVISAR {problema}")
+    if problemas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
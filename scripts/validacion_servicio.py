@@ -0,0 +1,106 @@
+# Validación de coordenadas en el servicio de verificación
+#
+# Levanta el servicio en un puerto libre de este mismo proceso y envía
+# coordenadas NaN o infinitas, en cada formato, a /verificar y
+# /verificar/lote: todas deben responderse con 400 y un cuerpo JSON válido
+# (sin tokens NaN/Infinity). También revisa que una petición válida siga
+# respondiendo 200 y que las distancias de un punto no finito queden en NaN
+# con segmento -1 en lugar de un valor sin sentido.
+#
+# Uso:  python scripts/validacion_servicio.py
+#
+# Termina con código 1 si algún caso no responde lo esperado.
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from catenella.distancias import distancias_area  # noqa: E402
+from catenella.servicio import crear_servidor  # noqa: E402
+
+NO_FINITOS = ('NaN', 'Infinity', '-Infinity')
+
+
+# (método, ruta, cuerpo JSON como texto o None, estado esperado)
+def casos():
+    lista = [
+        ('GET', '/verificar?lat=-43.5&lng=-73.1', None, 200),
+        ('POST', '/verificar/lote', '{"lat": [-43.5, -43.6], "lng": [-73.1, -73.2]}', 200),
+    ]
+    for valor in NO_FINITOS:
+        texto = valor.lower().replace('infinity', 'inf')
+        lista += [
+            ('GET', f'/verificar?lat={texto}&lng=-73.1', None, 400),
+            ('GET', f'/verificar?lat=-43.5&lng={texto}', None, 400),
+            ('POST', '/verificar', f'{{"lat": {valor}, "lng": -73.1}}', 400),
+            ('POST', '/verificar', f'{{"lat_grados": 43, "lat_minutos": {valor}, '
+                                   f'"lng_grados": 73, "lng_minutos": 6}}', 400),
+            ('POST', '/verificar/lote', f'{{"lat": [-43.5, {valor}], "lng": [-73.1, -73.2]}}', 400),
+            ('POST', '/verificar/lote', f'{{"posiciones": [{{"lat": -43.5, "lng": {valor}}}]}}', 400),
+            ('POST', '/verificar/lote', f'{{"lat_grados": [43], "lat_minutos": [30], '
+                                        f'"lng_grados": [{valor}], "lng_minutos": [6]}}', 400),
+        ]
+    return lista
+
+
+# JSON estricto: un NaN o Infinity en la respuesta es un error
+def _json_estricto(datos):
+    def rechazar(token):
+        raise ValueError(f"token no válido en JSON: {token}")
+    return json.loads(datos, parse_constant=rechazar)
+
+
+def ejecutar():
+    servidor = crear_servidor(puerto=0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    problemas = []
+    try:
+        conexion = http.client.HTTPConnection('127.0.0.1', servidor.server_address[1], timeout=30)
+        for metodo, ruta, cuerpo, esperado in casos():
+            conexion.request(metodo, ruta, body=cuerpo)
+            respuesta = conexion.getresponse()
+            datos = respuesta.read()
+            falla = None
+            if respuesta.status != esperado:
+                falla = f"estado {respuesta.status}, se esperaba {esperado}"
+            else:
+                try:
+                    _json_estricto(datos)
+                except ValueError as e:
+                    falla = f"cuerpo no es JSON válido ({e})"
+            print(f"{metodo:<5} {ruta:<40} {(cuerpo or '')[:48]:<48} {respuesta.status}"
+                  f"  {'OK' if falla is None else 'ERROR'}")
+            if falla is not None:
+                problemas.append(f"{metodo} {ruta} {cuerpo or ''}: {falla}")
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    tabla = distancias_area().tabla(np.array([-73.1, np.nan, np.inf]), np.array([-43.5, -43.5, -43.5]))
+    if not (np.isnan(tabla['distancia_borde_m'][1:]).all() and (tabla['segmento_borde'][1:] == -1).all()
+            and np.isfinite(tabla['distancia_borde_m'][0])):
+        problemas.append("distancias: un punto no finito no queda con distancia NaN y segmento -1")
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coordenadas no finitas en el servicio de verificación")
+    parser.parse_args(argv)
+
+    problemas = ejecutar()
+    for problema in problemas:
+        print(f"  ERROR {problema}")
+    if problemas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
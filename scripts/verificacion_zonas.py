@@ -0,0 +1,108 @@
+# Distancias al borde con un registro de varias zonas
+#
+# Arma un registro con el área Tic-Toc y una segunda zona (Tic-Toc trasladada
+# al norte, fuera de ella) y verifica un lote con un punto dentro de cada zona
+# y uno fuera de ambas. Cada punto debe quedar con la zona a cuyo borde se
+# mide ('zona_borde') y con la distancia y el segmento de esa zona, tanto en
+# lote.verificar_lote como en la respuesta del servicio. Revisa también que un
+# registro sin zonas vigentes deje las distancias al borde en NaN.
+#
+# Uso:  python scripts/verificacion_zonas.py
+#
+# Termina con código 1 si algún caso no coincide.
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import shapely
+import shapely.affinity
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from catenella.distancias import Distancias, distancias_registro  # noqa: E402
+from catenella.geometria import polygon  # noqa: E402
+from catenella.lote import verificar_lote  # noqa: E402
+from catenella.servicio import verificar_puntos  # noqa: E402
+from catenella.zonas import RegistroZonas, Zona  # noqa: E402
+
+# Traslado de la segunda zona, en grados de latitud
+DESPLAZAMIENTO = 1.5
+
+
+def registro_prueba():
+    norte = shapely.affinity.translate(polygon, yoff=DESPLAZAMIENTO)
+    return RegistroZonas([
+        Zona('Tic-Toc', polygon),
+        Zona('Zona norte', norte, tipo='monitoreo', hasta='2020-12-31'),
+    ])
+
+
+# (nombre del caso, lng, lat, zona esperada en 'zona_borde')
+def puntos():
+    centro = polygon.representative_point()
+    return [
+        ('dentro de Tic-Toc', centro.x, centro.y, 'Tic-Toc'),
+        ('dentro de la zona norte', centro.x, centro.y + DESPLAZAMIENTO, 'Zona norte'),
+        ('fuera, cerca de la zona norte', centro.x, centro.y + DESPLAZAMIENTO + 1.0, 'Zona norte'),
+    ]
+
+
+def _grados_minutos(valor):
+    grados = np.trunc(np.abs(valor))
+    return grados, (np.abs(valor) - grados) * 60
+
+
+def ejecutar():
+    registro = registro_prueba()
+    casos = puntos()
+    lng = np.array([c[1] for c in casos])
+    lat = np.array([c[2] for c in casos])
+    lat_g, lat_m = _grados_minutos(lat)
+    lng_g, lng_m = _grados_minutos(lng)
+    df = pd.DataFrame({'lat_grados': lat_g, 'lat_minutos': lat_m, 'lng_grados': lng_g, 'lng_minutos': lng_m})
+
+    lote = verificar_lote(df, registro, fecha='2020-06-01')
+    servicio = verificar_puntos(registro, lote['lat'].to_numpy(), lote['lng'].to_numpy(), fecha='2020-06-01')
+    por_zona = {z.nombre: Distancias(z.geometria) for z in registro.zonas}
+
+    problemas = []
+    for i, (nombre, _, _, esperada) in enumerate(casos):
+        borde, segmento = por_zona[esperada].al_borde(lote['lng'].iloc[i], lote['lat'].iloc[i], con_segmento=True)
+        fallas = []
+        if lote['zona_borde'].iloc[i] != esperada or servicio['zona_borde'][i] != esperada:
+            fallas.append(f"zona {lote['zona_borde'].iloc[i]!r}, se esperaba {esperada!r}")
+        if not (np.isclose(lote['distancia_borde_m'].iloc[i], borde[0])
+                and np.isclose(servicio['distancia_borde_m'][i], borde[0])
+                and lote['segmento_borde'].iloc[i] == segmento[0] == servicio['segmento_borde'][i]):
+            fallas.append(f"distancia {lote['distancia_borde_m'].iloc[i]:.1f} m, se esperaba {borde[0]:.1f} m")
+        print(f"{nombre:<32} {lote['zona_borde'].iloc[i]:<12} {lote['distancia_borde_m'].iloc[i]:>10.1f} m"
+              f"  {'OK' if not fallas else 'ERROR'}")
+        problemas.extend(f"{nombre}: {falla}" for falla in fallas)
+
+    # Con la zona norte vencida, el punto dentro de ella se mide a Tic-Toc
+    vencida = distancias_registro(registro).tabla(lng[1], lat[1], fecha='2021-06-01')
+    if vencida['zona_borde'][0] != 'Tic-Toc':
+        problemas.append(f"zona vencida: se midió a {vencida['zona_borde'][0]!r} y no a 'Tic-Toc'")
+
+    vacio = distancias_registro(RegistroZonas([])).tabla(lng, lat)
+    if not (np.isnan(vacio['distancia_borde_m']).all() and (vacio['zona_borde'] == '').all()):
+        problemas.append("registro sin zonas: las distancias al borde no quedan en NaN")
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distancias al borde con un registro de varias zonas")
+    parser.parse_args(argv)
+
+    problemas = ejecutar()
+    for problema in problemas:
+        print(f"  ERROR {problema}")
+    if problemas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()